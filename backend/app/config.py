@@ -24,6 +24,38 @@ class Settings(BaseSettings):
     SUPABASE_KEY: str  # service_role key for backend operations
     SUPABASE_ANON_KEY: str = ""  # anon key for user-authenticated queries (respects RLS) - REQUIRED for login to work
     SUPABASE_JWT_SECRET: str
+    JWT_AUDIENCE: str = "authenticated"  # Supabase access tokens carry aud=authenticated
+    JWT_VERIFY_CACHE_SIZE: int = 10000  # Max verified tokens kept in memory
+    JWT_MAX_LIFETIME_SECONDS: int = 3600  # Supabase JWT expiry setting (revocation window)
+    
+    # User profile cache (get_current_user)
+    PROFILE_CACHE_TTL_SECONDS: int = 60
+    PROFILE_CACHE_MAX_SIZE: int = 5000
+    
+    # KPI aggregates (incrementally maintained current snapshot)
+    KPI_AGGREGATE_RECONCILE_HOURS: int = 6  # Full recompute in the background when older than this
+    
+    # Daily KPI snapshot scheduler (runs inside the API process)
+    KPI_SCHEDULER_ENABLED: bool = True
+    KPI_SNAPSHOT_RUN_TIME: str = "00:15"  # HH:MM, server local time (UTC on Render)
+    KPI_SCHEDULER_CONCURRENCY: int = 4  # Organizations processed at once
+    KPI_SCHEDULER_START_JITTER_SECONDS: int = 120  # Random delay before each run (spreads workers)
+    KPI_SCHEDULER_ORG_JITTER_SECONDS: float = 2.0  # Random delay before each organization
+    KPI_SCHEDULER_LEASE_SECONDS: int = 900  # Lease TTL; renewed while the run is in progress
+    
+    # Dashboard response cache (per organization, invalidated by employee/change writes)
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2000  # 0 disables caching and ETags
+    RESPONSE_CACHE_TTL_SECONDS: int = 300  # Upper bound for changes made outside the API
+    
+    # Background export jobs (POST /api/exports)
+    EXPORT_JOB_WORKERS: int = 2  # Exports running at once per process
+    EXPORT_JOB_DIR: str = ""  # Where finished files are written (default: <tmp>/zomi_exports)
+    EXPORT_JOB_TTL_SECONDS: int = 3600  # Finished files are kept (and reused) for this long
+    EXPORT_JOB_MAX_PENDING_PER_ORG: int = 5  # Queued/running jobs allowed per organization
+    
+    # Bulk employee import (POST /api/employees/import)
+    EMPLOYEE_IMPORT_CHUNK_SIZE: int = 500  # Employees per insert request
+    EMPLOYEE_IMPORT_MAX_ROWS: int = 10000  # Rows accepted per uploaded file
     
     # Frontend URL
     FRONTEND_URL: str
@@ -36,6 +68,12 @@ class Settings(BaseSettings):
     
     # Encryption (Field-level PII encryption)
     ENCRYPTION_KEY: str  # Fernet key for AES-256 encryption
+    BLIND_INDEX_KEY: str = ""  # HMAC key for searchable blind indexes (must differ from ENCRYPTION_KEY)
+    
+    # Decrypted-value cache (per process; DECRYPT_CACHE_MAX_ENTRIES=0 disables it)
+    DECRYPT_CACHE_MAX_ENTRIES: int = 100000
+    DECRYPT_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    DECRYPT_CACHE_TTL_SECONDS: float = 600
     
     # Password Requirements
     MIN_PASSWORD_LENGTH: int = 8
@@ -1,7 +1,7 @@
 """
 Main FastAPI application entry point
 """
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
@@ -16,8 +16,13 @@ import base64
 import json
 
 from app.config import settings
-from app.routes import auth, forms, public_forms, companies, employees, form_submissions, form_templates, form_analytics, audit_logs, kpi_stats, change_information, user_profiles, team_management, lookups
+from app.routes import auth, forms, public_forms, companies, employees, form_submissions, form_templates, form_analytics, audit_logs, kpi_stats, change_information, user_profiles, team_management, lookups, exports
 from app.middleware import ActivityTrackingMiddleware, SecurityHeadersMiddleware
+from app.services.database_service import db_service
+from app.services.encryption_service import shutdown_decrypt_pool
+from app.services.kpi_scheduler_service import kpi_snapshot_scheduler
+from app.services.export_job_service import export_job_service
+from app.routes.auth import get_current_user
 
 # Configure logging
 logging.basicConfig(
@@ -106,8 +111,10 @@ app.add_middleware(
         "Accept",
         "Origin",
         "X-Requested-With",
+        "Range",
+        "If-Range",
     ],  # Specific headers only - NO wildcard
-    expose_headers=["Content-Length", "X-Total-Count"],
+    expose_headers=["Content-Length", "X-Total-Count", "X-Next-Cursor", "ETag", "Content-Range", "Accept-Ranges"],
     max_age=600,  # Cache preflight requests for 10 minutes (reduced from 1 hour)
 )
 
@@ -145,6 +152,7 @@ app.include_router(kpi_stats.router, prefix="/api/kpi", tags=["KPI Statistics"])
 app.include_router(user_profiles.router, prefix="/api/user-profiles", tags=["User Profiles"])
 app.include_router(team_management.router, prefix="/api/team", tags=["Team Management"])
 app.include_router(lookups.router, prefix="/api/lookups", tags=["Lookups"])
+app.include_router(exports.router, prefix="/api/exports", tags=["Exports"])
 
 # =====================================================
 # Health Check
@@ -159,6 +167,25 @@ async def health_check():
         "version": "1.0.0"
     }
 
+async def require_admin(current_user: dict = Depends(get_current_user)) -> dict:
+    """Admins and owners only - detailed health metrics include errors and host names"""
+    if current_user.get("role") not in ["admin", "owner"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins and owners can view service metrics"
+        )
+    return current_user
+
+@app.get("/health/scheduler", tags=["Health"])
+async def scheduler_health(current_user: dict = Depends(require_admin)):
+    """Daily KPI snapshot scheduler metrics (admin/owner only)"""
+    return kpi_snapshot_scheduler.metrics()
+
+@app.get("/health/exports", tags=["Health"])
+async def exports_health(current_user: dict = Depends(require_admin)):
+    """Background export job queue metrics (admin/owner only)"""
+    return export_job_service.stats()
+
 @app.get("/", tags=["Root"])
 async def root():
     """Root endpoint"""
@@ -178,7 +205,13 @@ async def startup_event():
     logger.info(f"📍 Frontend URL: {settings.FRONTEND_URL}")
     logger.info(f"🔧 Commit: {os.getenv('RENDER_GIT_COMMIT', 'unknown')}")
     logger.info(f"🔧 Pydantic: {pydantic.__version__}")
+    kpi_snapshot_scheduler.start()
+    export_job_service.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("👋 Shutting down Zomi Wealth Portal API")
+    await kpi_snapshot_scheduler.stop()
+    await export_job_service.stop()
+    await db_service.aclose()
+    shutdown_decrypt_pool()
@@ -77,7 +77,7 @@ async def get_audit_logs(
         organization_id = current_user["organization_id"]
         
         # Build query - fetch audit logs only (user_profiles join doesn't work as FK points to auth.users)
-        query = db_service.client.table("audit_logs").select("*").eq("organization_id", organization_id)
+        query = db_service.table("audit_logs").select("*").eq("organization_id", organization_id)
         
         # Apply filters
         if action:
@@ -95,7 +95,7 @@ async def get_audit_logs(
         # Apply limit
         query = query.limit(limit)
         
-        response = query.execute()
+        response = await query.execute()
         logs = response.data
         
         # Build a lookup of user display info without relying on Supabase Admin Auth APIs.
@@ -105,7 +105,7 @@ async def get_audit_logs(
         if user_ids:
             # Prefer RPC that safely joins auth.users (SECURITY DEFINER) if available.
             try:
-                rpc_response = db_service.client.rpc(
+                rpc_response = await db_service.rpc(
                     "get_user_emails_for_organization",
                     {"org_id": organization_id},
                 ).execute()
@@ -119,7 +119,7 @@ async def get_audit_logs(
             # Ensure we at least have full_name from user_profiles for any missing users.
             missing_ids = [uid for uid in user_ids if uid not in user_lookup]
             if missing_ids:
-                profiles_response = db_service.client.table("user_profiles").select(
+                profiles_response = await db_service.table("user_profiles").select(
                     "id, full_name"
                 ).in_("id", missing_ids).execute()
                 for profile in (profiles_response.data or []):
@@ -196,19 +196,19 @@ async def get_audit_stats(
         organization_id = current_user["organization_id"]
         
         # Total logs count
-        total_response = db_service.client.table("audit_logs").select(
+        total_response = await db_service.table("audit_logs").select(
             "id", count="exact"
         ).eq("organization_id", organization_id).execute()
         
         # Recent activity (last 24 hours)
         from datetime import timedelta
         yesterday = (datetime.utcnow() - timedelta(days=1)).isoformat()
-        recent_response = db_service.client.table("audit_logs").select(
+        recent_response = await db_service.table("audit_logs").select(
             "id", count="exact"
         ).eq("organization_id", organization_id).gte("created_at", yesterday).execute()
         
         # Actions breakdown
-        actions_response = db_service.client.table("audit_logs").select(
+        actions_response = await db_service.table("audit_logs").select(
             "action"
         ).eq("organization_id", organization_id).execute()
         
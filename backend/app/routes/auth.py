@@ -11,6 +11,8 @@ import logging
 from app.models.user import UserCreate, UserLogin, TokenRefresh
 from app.viewmodels.auth_viewmodel import auth_viewmodel
 from app.services.auth_service import AuthService
+from app.services.token_verification_service import token_verification_service
+from app.services.profile_cache import user_profile_cache
 from app.config import settings
 from app.middleware import (
     check_session_activity, 
@@ -70,21 +72,18 @@ async def get_current_user(authorization: Optional[str] = Header(None), request:
     # Verify Supabase JWT token and get user
     try:
         # Import here to avoid circular dependency
-        from app.services.database_service import create_anon_auth_client, create_user_auth_client
+        from app.services.database_service import db_service
         
-        # Create fresh client for token validation (prevents JWT contamination)
-        auth_client = create_anon_auth_client()
-        
-        # Verify token with Supabase
-        response = auth_client.auth.get_user(token)
+        # Verify token locally (signature, expiry, audience) - no Supabase Auth round trip
+        claims = await token_verification_service.verify(token)
         
-        if not response.user:
+        if not claims:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token",
             )
         
-        user_id = response.user.id
+        user_id = claims["sub"]
         
         # Check session activity (15 min timeout)
         if not check_session_activity(user_id):
@@ -97,22 +96,24 @@ async def get_current_user(authorization: Optional[str] = Header(None), request:
         # Update activity timestamp
         update_session_activity(user_id)
         
-        # Get user profile using authenticated client (respects RLS)
-        user_client = create_user_auth_client(token)
-        
-        profile_response = user_client.table("user_profiles").select("*").eq("id", user_id).execute()
-        profile = profile_response.data[0] if profile_response.data else None
-        
-        if not profile:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User profile not found",
-            )
+        # Get user profile - cached briefly, otherwise via authenticated client (respects RLS)
+        profile = user_profile_cache.get(user_id)
+        if profile is None:
+            profile_response = await db_service.as_user(token).table("user_profiles").select("*").eq("id", user_id).execute()
+            profile = profile_response.data[0] if profile_response.data else None
+            
+            if not profile:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="User profile not found",
+                )
+            
+            user_profile_cache.set(user_id, profile)
         
         # Return user data
         user_data = {
             "id": user_id,
-            "email": response.user.email,
+            "email": claims.get("email"),
             "role": profile.get("role"),
             "organization_id": profile.get("organization_id"),
         }
@@ -412,9 +413,10 @@ async def logout(token_data: TokenRefresh) -> Dict[str, Any]:
             user_id = response.session.user.id
             access_token = response.session.access_token
             
-            # Clear activity tracking
+            # Clear activity tracking and stop trusting the user's tokens locally
             if user_id:
                 clear_session_activity(user_id)
+                token_verification_service.require_remote_check(user_id)
                 security_logger.info({
                     'event': 'logout',
                     'user_id': user_id
@@ -503,6 +505,11 @@ async def reset_password(
         auth_service = AuthService()
         await auth_service.update_user_password(token, new_password)
         
+        # Existing sessions must be re-checked with Supabase after a password change
+        claims = await token_verification_service.verify(token)
+        if claims:
+            token_verification_service.require_remote_check(claims["sub"])
+        
         security_logger.info({
             'event': 'password_reset_completed',
             'ip': request.client.host if request.client else 'unknown'
@@ -1,36 +1,60 @@
 """
 Change Information Routes - CRUD operations for change of information requests
 """
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from fastapi.responses import StreamingResponse
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import logging
-import io
-import csv
 
 from app.services.database_service import db_service
 from app.services.audit_service import audit_service
 from app.services.encryption_service import get_encryption_service
+from app.services.column_projection import build_select
+from app.services.response_cache_service import response_cache
+from app.services.export_service import (
+    export_service,
+    change_information_values,
+    encode_csv_rows,
+    file_size,
+    iter_file,
+    normalize_export_format,
+    write_xlsx,
+    CHANGE_INFORMATION_EXPORT_COLUMNS,
+    XLSX_MEDIA_TYPE,
+)
 from app.routes.auth import get_current_user
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Columns that can be requested with ?fields= (company_name comes from the companies join)
+CHANGE_INFORMATION_FIELDS = frozenset({
+    "id", "organization_id", "company_id", "company_name",
+    "first_name", "surname", "date_of_birth", "date_of_effect", "change_type", "other_reason",
+    "new_name", "new_address", "new_salary", "new_employee_contribution", "new_employer_contribution",
+    "source_form_id", "submission_token", "submitted_via", "ip_address", "user_agent",
+    "created_by_user_id", "processing_status", "created_at", "updated_at",
+})
+
 
 @router.get("", status_code=status.HTTP_200_OK)
-async def get_change_information(current_user: dict = Depends(get_current_user)) -> List[Dict[str, Any]]:
+async def get_change_information(
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (default: all)"),
+    current_user: dict = Depends(get_current_user)
+) -> List[Dict[str, Any]]:
     """
     Get all change of information requests for the user's organization
     Includes company name from companies table
     Decrypts sensitive fields (new_name, new_address, new_salary, new_employee_contribution)
+    Only decrypts the encrypted fields included in ?fields= when it is given
     """
     try:
         organization_id = current_user["organization_id"]
         
-        # Join with companies table to get company name
-        response = db_service.client.table("change_information").select(
-            "*, companies(name)"
+        # Join with companies table to get company name (when selected)
+        response = await db_service.table("change_information").select(
+            build_select(fields, CHANGE_INFORMATION_FIELDS, required=("id", "created_at"))
         ).eq(
             "organization_id", organization_id
         ).order("created_at", desc=True).execute()
@@ -80,7 +104,9 @@ async def get_change_information(current_user: dict = Depends(get_current_user))
             change_requests.append(item)
         
         return change_requests
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to fetch change information: {str(e)}")
         raise HTTPException(
@@ -99,7 +125,7 @@ async def get_change_information_stats(current_user: dict = Depends(get_current_
         organization_id = current_user["organization_id"]
         
         # Get all change requests for organization
-        response = db_service.client.table("change_information").select(
+        response = await db_service.table("change_information").select(
             "id, change_type, processing_status"
         ).eq(
             "organization_id", organization_id
@@ -137,6 +163,7 @@ async def get_change_information_stats(current_user: dict = Depends(get_current_
 @router.get("/{change_id}", status_code=status.HTTP_200_OK)
 async def get_change_information_by_id(
     change_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (default: all)"),
     current_user: dict = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """
@@ -146,8 +173,8 @@ async def get_change_information_by_id(
     try:
         organization_id = current_user["organization_id"]
         
-        response = db_service.client.table("change_information").select(
-            "*, companies(name)"
+        response = await db_service.table("change_information").select(
+            build_select(fields, CHANGE_INFORMATION_FIELDS)
         ).eq(
             "id", change_id
         ).eq(
@@ -239,9 +266,10 @@ async def create_change_information(
         insert_data.pop("company_name", None)
         
         # Insert into database
-        response = db_service.client.table("change_information").insert(
+        response = await db_service.table("change_information").insert(
             insert_data
         ).execute()
+        response_cache.bump(organization_id)
         
         if not response.data:
             raise HTTPException(
@@ -291,7 +319,7 @@ async def update_change_information(
         user_id = current_user["id"]
         
         # Verify ownership
-        existing = db_service.client.table("change_information").select(
+        existing = await db_service.table("change_information").select(
             "id"
         ).eq(
             "id", change_id
@@ -319,11 +347,12 @@ async def update_change_information(
         update_data.pop("company_name", None)
         
         # Update in database
-        response = db_service.client.table("change_information").update(
+        response = await db_service.table("change_information").update(
             update_data
         ).eq(
             "id", change_id
         ).execute()
+        response_cache.bump(organization_id)
         
         if not response.data:
             raise HTTPException(
@@ -371,7 +400,7 @@ async def delete_change_information(
         user_id = current_user["id"]
         
         # Verify ownership before deleting
-        existing = db_service.client.table("change_information").select(
+        existing = await db_service.table("change_information").select(
             "id"
         ).eq(
             "id", change_id
@@ -386,9 +415,10 @@ async def delete_change_information(
             )
         
         # Delete from database
-        db_service.client.table("change_information").delete().eq(
+        await db_service.table("change_information").delete().eq(
             "id", change_id
         ).execute()
+        response_cache.bump(organization_id)
         
         # Log audit trail
         try:
@@ -436,7 +466,7 @@ async def bulk_delete_change_information(
             )
         
         # Verify all records belong to user's organization
-        existing = db_service.client.table("change_information").select(
+        existing = await db_service.table("change_information").select(
             "id"
         ).in_(
             "id", ids
@@ -451,12 +481,13 @@ async def bulk_delete_change_information(
         
         # Delete verified records
         if verified_ids:
-            db_service.client.table("change_information").delete().in_(
+            await db_service.table("change_information").delete().in_(
                 "id", verified_ids
             ).execute()
+            response_cache.bump(organization_id)
 
             # Confirm what remains
-            remaining = db_service.client.table("change_information").select(
+            remaining = await db_service.table("change_information").select(
                 "id"
             ).in_(
                 "id", verified_ids
@@ -515,54 +546,64 @@ async def bulk_delete_change_information(
 
 @router.get("/export/csv", status_code=status.HTTP_200_OK)
 async def export_change_information_csv(
+    format: str = Query("csv", description="csv or xlsx"),
     current_user: dict = Depends(get_current_user)
 ) -> StreamingResponse:
     """
-    Export all change of information requests to CSV
+    Export all change of information requests to CSV (streamed page by page)
+    or XLSX (format=xlsx, typed date cells, write-only workbook)
     """
     try:
         organization_id = current_user["organization_id"]
         
-        # Get all change requests with company names
-        response = db_service.client.table("change_information").select(
-            "*, companies(name)"
-        ).eq(
-            "organization_id", organization_id
-        ).order("created_at", desc=True).execute()
+        try:
+            export_format = normalize_export_format(format)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
         
-        # Prepare CSV data
-        output = io.StringIO()
+        pages = export_service.iter_change_information_pages(organization_id)
+        filename = f"change_information_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{export_format}"
         
-        if response.data:
-            # Extract company names
-            for item in response.data:
-                if item.get("companies"):
-                    item["company_name"] = item["companies"].get("name")
-                    del item["companies"]
-            
-            # Define CSV columns
-            fieldnames = [
-                "id", "company_name", "first_name", "surname", "date_of_birth",
-                "date_of_effect", "change_type", "other_reason", "processing_status",
-                "created_at", "updated_at"
-            ]
-            
-            writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction='ignore')
-            writer.writeheader()
+        if export_format == "xlsx":
+            async def typed_rows():
+                async for page in pages:
+                    yield [change_information_values(item, typed=True) for item in page]
             
-            for item in response.data:
-                writer.writerow(item)
+            workbook = await write_xlsx("Change Information", CHANGE_INFORMATION_EXPORT_COLUMNS, typed_rows())
+            return StreamingResponse(
+                iter_file(workbook),
+                media_type=XLSX_MEDIA_TYPE,
+                headers={
+                    "Content-Disposition": f"attachment; filename={filename}",
+                    "Content-Length": str(file_size(workbook))
+                }
+            )
+        
+        # Fetch the first page before responding so query errors still return a 500
+        first_page = await anext(pages, None)
         
-        output.seek(0)
+        async def stream_csv():
+            # Header only when there is data (as before)
+            page = first_page
+            if page is not None:
+                yield encode_csv_rows([CHANGE_INFORMATION_EXPORT_COLUMNS])
+            while page is not None:
+                yield encode_csv_rows(change_information_values(item) for item in page)
+                page = await anext(pages, None)
         
         return StreamingResponse(
-            iter([output.getvalue()]),
+            stream_csv(),
             media_type="text/csv",
             headers={
-                "Content-Disposition": f"attachment; filename=change_information_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
+                "Content-Disposition": f"attachment; filename={filename}"
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to export change information CSV: {str(e)}")
         raise HTTPException(
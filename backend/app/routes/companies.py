@@ -27,7 +27,7 @@ async def get_companies(
             )
         
         # Query companies table with RLS
-        response = db_service.client.table("companies").select("*").eq("organization_id", org_id).execute()
+        response = await db_service.table("companies").select("*").eq("organization_id", org_id).execute()
         
         # Return empty array if no data
         return response.data if response.data else []
@@ -48,7 +48,7 @@ async def get_company(
     """
     try:
         # Query with RLS
-        response = db_service.client.table("companies").select("*").eq("id", company_id).execute()
+        response = await db_service.table("companies").select("*").eq("id", company_id).execute()
         
         if not response.data:
             raise HTTPException(
@@ -1,28 +1,71 @@
 """
 Employee Routes - CRUD operations for employee management
 """
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response, UploadFile, File, Form
 from fastapi.responses import StreamingResponse
 from typing import Dict, Any, List, Optional
 from datetime import datetime
+import asyncio
+import base64
+import json
 import logging
 import httpx
 import os
-import io
-import csv
 
 from app.services.database_service import db_service
 from app.services.encryption_service import get_encryption_service
 from app.services.audit_service import audit_service
+from app.services.column_projection import build_select
+from app.services.blind_index_service import blind_index_service, strip_index_columns
+from app.services.kpi_aggregate_service import kpi_aggregate_service, KPI_AGGREGATE_COLUMNS
+from app.services.employee_import_service import employee_import_service, import_format
+from app.services.export_service import (
+    export_service,
+    encode_csv_rows,
+    file_size,
+    io_template_values,
+    iter_file,
+    normalize_export_format,
+    write_xlsx,
+    IO_TEMPLATE_HEADERS,
+    IO_TEMPLATE_SELECT,
+    XLSX_MEDIA_TYPE,
+)
 from app.routes.auth import get_current_user
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Export audit writes in flight (referenced so a client disconnect cannot drop them)
+_export_audit_tasks: set = set()
+
 # Edge Function configuration from environment variables
 EDGE_FUNCTION_URL = os.getenv("EDGE_FUNCTION_URL", "")
 EDGE_FUNCTION_SECRET = os.getenv("EDGE_FUNCTION_SECRET", "")
 
+# Pagination for GET /api/employees
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+EMPLOYEE_SORT_FIELDS = {"created_at", "updated_at", "surname", "first_name", "employment_start_date", "pension_start_date"}
+
+# Columns that can be requested with ?fields= (company_name comes from the companies join)
+EMPLOYEE_FIELDS = frozenset({
+    "id", "organization_id", "company_id", "company_name", "source_form_id",
+    "created_at", "updated_at", "created_by_user_id",
+    "title", "first_name", "surname", "ni_number", "date_of_birth", "legal_gender", "marital_status",
+    "address_line_1", "address_line_2", "address_line_3", "address_line_4",
+    "city_town", "county", "country", "postcode",
+    "email_address", "home_number", "mobile_number", "uk_resident", "nationality",
+    "pensionable_salary", "pensionable_salary_start_date", "salary_post_sacrifice",
+    "employment_start_date", "date_joined_scheme", "job_title", "other",
+    "pension_investment_approach", "policy_number", "split_template_group_name", "split_template_group_source",
+    "service_status", "client_category", "pension_start_date", "io_upload_status",
+    "is_pension_active", "is_smart_pension", "send_pension_pack", "pension_provider_info",
+    "scheme_ref", "advice_type", "selling_adviser_id",
+    "has_group_life", "has_gci", "has_gip", "has_bupa", "operational_notes",
+    "submission_token", "submitted_via", "ip_address", "user_agent",
+})
+
 
 async def notify_edge_function(employee: Dict[str, Any], company_name: str, recipient_email: str):
     """
@@ -66,35 +109,218 @@ async def notify_edge_function(employee: Dict[str, Any], company_name: str, reci
         # Don't raise - we don't want email failures to break employee creation
 
 
+async def notify_edge_function_import(employees: List[Dict[str, Any]], company_name: str, recipient_email: str):
+    """
+    Call Edge Function once to send a single email notification for a bulk import.
+    
+    The payload carries every imported employee under "records" (same fields as
+    notify_edge_function's "record") plus "employee_count".
+    
+    Args:
+        employees: The inserted employee records
+        company_name: Name of the company
+        recipient_email: Email address to send notification to
+    """
+    try:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.post(
+                EDGE_FUNCTION_URL,
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {EDGE_FUNCTION_SECRET}"
+                },
+                json={
+                    "employee_count": len(employees),
+                    "records": [
+                        {
+                            "first_name": employee.get("first_name"),
+                            "surname": employee.get("surname"),
+                            "company_name": company_name,
+                            "recipient_email": recipient_email,
+                            "job_title": employee.get("job_title"),
+                            "employment_start_date": employee.get("employment_start_date")
+                        }
+                        for employee in employees
+                    ]
+                }
+            )
+            
+            if response.status_code == 200:
+                logger.info(f"Import notification sent successfully for {len(employees)} employees")
+            else:
+                error_data = response.json() if response.text else {}
+                logger.warning(f"Edge Function returned status {response.status_code}: {error_data}")
+    
+    except httpx.TimeoutException:
+        logger.warning(f"Timeout calling Edge Function for import of {len(employees)} employees")
+    except Exception as e:
+        logger.error(f"Failed to call Edge Function: {str(e)}")
+        # Don't raise - we don't want email failures to break the import
+
+
+async def _ensure_unique_ni_number(ni_number: Any, organization_id: str, exclude_id: Optional[str] = None) -> None:
+    """409 if another employee of the organization has this NI number (needs BLIND_INDEX_KEY)"""
+    if not ni_number:
+        return
+    existing = await blind_index_service.find_existing("ni_number", [ni_number], organization_id, exclude_id)
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="An employee with this NI number already exists"
+        )
+
+
+def _encode_cursor(sort_by: str, sort_order: str, sort_value: Any, employee_id: str) -> str:
+    """Encode the last row's (sort value, id) as an opaque page cursor"""
+    payload = json.dumps({"s": sort_by, "o": sort_order, "v": sort_value, "id": employee_id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("utf-8")
+
+
+def _decode_cursor(cursor: str, sort_by: str, sort_order: str) -> Dict[str, Any]:
+    """Decode a page cursor, rejecting cursors issued for a different sort"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("utf-8")).decode("utf-8"))
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    
+    if payload.get("s") != sort_by or payload.get("o") != sort_order or not payload.get("id"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor does not match the requested sort"
+        )
+    
+    return payload
+
+
+def _quote_filter_value(value: Any) -> str:
+    """Quote a value for a PostgREST logic tree (or=/and=) filter"""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def _keyset_filter(sort_by: str, descending: bool, sort_value: Any, employee_id: str) -> str:
+    """
+    Build the PostgREST or= filter selecting rows after (sort_value, employee_id)
+    
+    Rows are ordered by (sort_by, id) with NULL sort values last.
+    """
+    op = "lt" if descending else "gt"
+    quoted_id = _quote_filter_value(employee_id)
+    
+    if sort_value is None:
+        # Already inside the trailing NULL block - only the id decides
+        return f"and({sort_by}.is.null,id.{op}.{quoted_id})"
+    
+    quoted_value = _quote_filter_value(sort_value)
+    return (
+        f"{sort_by}.{op}.{quoted_value},"
+        f"and({sort_by}.eq.{quoted_value},id.{op}.{quoted_id}),"
+        f"{sort_by}.is.null"
+    )
+
+
 @router.get("", status_code=status.HTTP_200_OK)
-async def get_employees(current_user: dict = Depends(get_current_user)) -> List[Dict[str, Any]]:
+async def get_employees(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size (omit to return all employees)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    sort_by: str = Query("created_at", description="Sort field"),
+    sort_order: str = Query("desc", description="Sort order (asc/desc)"),
+    company_id: Optional[str] = Query(None, description="Filter by company"),
+    service_status: Optional[str] = Query(None, description="Filter by service status"),
+    advice_type: Optional[str] = Query(None, description="Filter by advice type"),
+    io_upload_status: Optional[bool] = Query(None, description="Filter by IO upload status"),
+    include_total: bool = Query(False, description="Return the filtered total in X-Total-Count"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (default: all)"),
+    current_user: dict = Depends(get_current_user)
+) -> List[Dict[str, Any]]:
     """
-    Get all employees for the user's organization
+    Get employees for the user's organization
     Decrypts sensitive PII fields before returning
     Includes company name from companies table
+    
+    Pagination (keyset on (sort_by, id)):
+    - Pass limit to get one page; the X-Next-Cursor response header holds the
+      cursor for the next page and is absent on the last page
+    - Without limit (or cursor) all matching employees are returned
+    - include_total=true adds the filtered row count in X-Total-Count
+    
+    fields=first_name,surname,... returns only those columns (plus id and the
+    sort field); unselected PII columns are never fetched or decrypted.
     """
     try:
         organization_id = current_user["organization_id"]
         
-        # Join with companies table to get company name
-        response = db_service.client.table("employees").select(
-            "*, companies(name)"
-        ).eq(
-            "organization_id", organization_id
-        ).order("created_at", desc=True).execute()
-        
-        # Decrypt PII fields for all employees
-        encryption = get_encryption_service()
-        decrypted_employees = []
-        for employee in response.data:
-            decrypted = encryption.decrypt_employee_pii(employee)
+        if sort_by not in EMPLOYEE_SORT_FIELDS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid sort field. Must be one of: {', '.join(sorted(EMPLOYEE_SORT_FIELDS))}"
+            )
+        sort_order = sort_order.lower()
+        if sort_order not in ("asc", "desc"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Sort order must be 'asc' or 'desc'"
+            )
+        descending = sort_order == "desc"
+        
+        if cursor and not limit:
+            limit = DEFAULT_PAGE_SIZE
+        
+        def apply_filters(query):
+            query = query.eq("organization_id", organization_id)
+            if company_id:
+                query = query.eq("company_id", company_id)
+            if service_status:
+                query = query.eq("service_status", service_status)
+            if advice_type:
+                query = query.eq("advice_type", advice_type)
+            if io_upload_status is not None:
+                query = query.eq("io_upload_status", io_upload_status)
+            return query
+        
+        # Join with companies table to get company name (when selected)
+        select = build_select(fields, EMPLOYEE_FIELDS, required=("id", sort_by))
+        query = apply_filters(db_service.table("employees").select(select))
+        
+        if cursor:
+            position = _decode_cursor(cursor, sort_by, sort_order)
+            query = query.or_(_keyset_filter(sort_by, descending, position["v"], position["id"]))
+        
+        query = query.order(sort_by, desc=descending, nullsfirst=False).order("id", desc=descending)
+        
+        if limit:
+            # Fetch one extra row to know whether another page exists
+            query = query.limit(limit + 1)
+        
+        if include_total:
+            count_query = apply_filters(db_service.table("employees").select("id", count="exact", head=True))
+            result, count_result = await asyncio.gather(query.execute(), count_query.execute())
+            response.headers["X-Total-Count"] = str(count_result.count or 0)
+        else:
+            result = await query.execute()
+        
+        rows = result.data
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            response.headers["X-Next-Cursor"] = _encode_cursor(sort_by, sort_order, last.get(sort_by), last["id"])
+        
+        # Decrypt PII fields for all employees (batched, off the event loop)
+        decrypted_employees = await get_encryption_service().decrypt_many(rows)
+        for decrypted in decrypted_employees:
+            strip_index_columns(decrypted)
             # Extract company name from nested object
-            if employee.get("companies"):
-                decrypted["company_name"] = employee["companies"].get("name")
-            decrypted_employees.append(decrypted)
+            if decrypted.get("companies"):
+                decrypted["company_name"] = decrypted["companies"].get("name")
         
         return decrypted_employees
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to fetch employees: {str(e)}")
         raise HTTPException(
@@ -103,8 +329,59 @@ async def get_employees(current_user: dict = Depends(get_current_user)) -> List[
         )
 
 
+@router.get("/search", status_code=status.HTTP_200_OK)
+async def search_employees(
+    q: str,
+    current_user: dict = Depends(get_current_user)
+) -> List[Dict[str, Any]]:
+    """
+    Search employees by name, email, NI number or date of birth
+    
+    Names and emails match partially (ILIKE). NI number, email and date of
+    birth also match exactly through their blind indexes, since the
+    encrypted columns themselves cannot be searched.
+    """
+    try:
+        organization_id = current_user["organization_id"]
+        term = q.strip()
+        if not term:
+            return []
+        
+        # Search using ILIKE for case-insensitive partial matching
+        pattern = _quote_filter_value(f"%{term}%")
+        conditions = [
+            f"first_name.ilike.{pattern}",
+            f"surname.ilike.{pattern}",
+            f"email_address.ilike.{pattern}",
+        ]
+        conditions.extend(blind_index_service.search_conditions(term, organization_id))
+        
+        response = await db_service.table("employees").select("*, companies(name)").eq(
+            "organization_id", organization_id
+        ).or_(",".join(conditions)).execute()
+        
+        employees = await get_encryption_service().decrypt_many(response.data)
+        for employee in employees:
+            strip_index_columns(employee)
+            if employee.get("companies"):
+                employee["company_name"] = employee["companies"].get("name")
+        
+        return employees
+        
+    except Exception as e:
+        logger.error(f"Failed to search employees: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to search employees"
+        )
+
+
 @router.get("/{employee_id}", status_code=status.HTTP_200_OK)
-async def get_employee(employee_id: str, current_user: dict = Depends(get_current_user)) -> Dict[str, Any]:
+async def get_employee(
+    employee_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (default: all)"),
+    current_user: dict = Depends(get_current_user)
+) -> Dict[str, Any]:
     """
     Get a single employee by ID
     Decrypts sensitive PII fields before returning
@@ -113,9 +390,9 @@ async def get_employee(employee_id: str, current_user: dict = Depends(get_curren
     try:
         organization_id = current_user["organization_id"]
         
-        # Join with companies table to get company name
-        response = db_service.client.table("employees").select(
-            "*, companies(name)"
+        # Join with companies table to get company name (when selected)
+        response = await db_service.table("employees").select(
+            build_select(fields, EMPLOYEE_FIELDS)
         ).eq(
             "id", employee_id
         ).eq("organization_id", organization_id).execute()
@@ -128,7 +405,7 @@ async def get_employee(employee_id: str, current_user: dict = Depends(get_curren
         
         # Decrypt PII fields before returning
         encryption = get_encryption_service()
-        employee = encryption.decrypt_employee_pii(response.data[0])
+        employee = strip_index_columns(encryption.decrypt_employee_pii(response.data[0]))
         
         # Extract company name from nested object
         if response.data[0].get("companies"):
@@ -172,12 +449,17 @@ async def create_employee(employee_data: Dict[str, Any], current_user: dict = De
         if "submitted_via" not in employee_data:
             employee_data["submitted_via"] = "manual"
         
+        await _ensure_unique_ni_number(employee_data.get("ni_number"), organization_id)
+        
+        # Blind indexes are computed from plaintext, so before encryption
+        employee_data = blind_index_service.index_employee(employee_data, organization_id)
+        
         # **ENCRYPT PII FIELDS BEFORE DATABASE INSERT**
         encryption = get_encryption_service()
         employee_data = encryption.encrypt_employee_pii(employee_data)
         logger.info(f"Encrypted PII for new employee (org: {organization_id})")
         
-        response = db_service.client.table("employees").insert(employee_data).execute()
+        response = await db_service.table("employees").insert(employee_data).execute()
         
         if not response.data:
             raise HTTPException(
@@ -187,6 +469,9 @@ async def create_employee(employee_data: Dict[str, Any], current_user: dict = De
         
         employee = response.data[0]
         
+        # Keep running KPI counters in sync
+        await kpi_aggregate_service.record_change(organization_id, None, employee)
+        
         # Audit log - employee created
         await audit_service.log_employee_create(
             employee_id=employee["id"],
@@ -196,13 +481,13 @@ async def create_employee(employee_data: Dict[str, Any], current_user: dict = De
         )
         
         # Decrypt PII for response (user needs to see what they created)
-        employee = encryption.decrypt_employee_pii(employee)
+        employee = strip_index_columns(encryption.decrypt_employee_pii(employee))
         
         # Fetch company name for email notification
         company_name = "Unknown Company"
         if employee.get("company_id"):
             try:
-                company_response = db_service.client.table("companies").select("name").eq(
+                company_response = await db_service.table("companies").select("name").eq(
                     "id", employee["company_id"]
                 ).execute()
                 if company_response.data:
@@ -243,7 +528,7 @@ async def update_employee(
         organization_id = current_user["organization_id"]
         
         # Verify employee exists and belongs to user's organization
-        existing = db_service.client.table("employees").select("id").eq(
+        existing = await db_service.table("employees").select("id").eq(
             "id", employee_id
         ).eq("organization_id", organization_id).execute()
         
@@ -253,7 +538,7 @@ async def update_employee(
                 detail="Employee not found"
             )
                 # Fetch existing employee data for audit log
-        existing_employee = db_service.client.table("employees").select("*").eq(
+        existing_employee = await db_service.table("employees").select("*").eq(
             "id", employee_id
         ).execute()
         old_employee_data = existing_employee.data[0] if existing_employee.data else {}
@@ -261,6 +546,11 @@ async def update_employee(
         employee_data.pop("id", None)
         employee_data.pop("organization_id", None)
         
+        await _ensure_unique_ni_number(employee_data.get("ni_number"), organization_id, exclude_id=employee_id)
+        
+        # Keep blind indexes in sync with any indexed field in the update
+        employee_data = blind_index_service.index_employee(employee_data, organization_id)
+        
         # **ENCRYPT PII FIELDS IF PRESENT IN UPDATE**
         encryption = get_encryption_service()
         employee_data = encryption.encrypt_employee_pii(employee_data)
@@ -270,7 +560,7 @@ async def update_employee(
         employee_data.pop("created_by_user_id", None)
         
         # Update employee
-        response = db_service.client.table("employees").update(
+        response = await db_service.table("employees").update(
             employee_data
         ).eq("id", employee_id).execute()
         
@@ -282,6 +572,9 @@ async def update_employee(
         
         employee = response.data[0]
         
+        # Keep running KPI counters in sync
+        await kpi_aggregate_service.record_change(organization_id, old_employee_data, employee)
+        
         # Audit log - employee updated
         await audit_service.log_employee_update(
             employee_id=employee_id,
@@ -292,7 +585,7 @@ async def update_employee(
         )
         
         # Decrypt PII for response
-        updated_employee = encryption.decrypt_employee_pii(employee)
+        updated_employee = strip_index_columns(encryption.decrypt_employee_pii(employee))
         
         return updated_employee
         
@@ -315,7 +608,7 @@ async def delete_employee(employee_id: str, current_user: dict = Depends(get_cur
         organization_id = current_user["organization_id"]
         
         # Fetch employee data before deletion for audit log
-        existing = db_service.client.table("employees").select("*").eq(
+        existing = await db_service.table("employees").select("*").eq(
             "id", employee_id
         ).eq("organization_id", organization_id).execute()
         
@@ -328,7 +621,10 @@ async def delete_employee(employee_id: str, current_user: dict = Depends(get_cur
         employee_data = existing.data[0]
         
         # Delete the employee
-        db_service.client.table("employees").delete().eq("id", employee_id).execute()
+        await db_service.table("employees").delete().eq("id", employee_id).execute()
+        
+        # Keep running KPI counters in sync
+        await kpi_aggregate_service.record_change(organization_id, employee_data, None)
         
         # Audit log - employee deleted
         await audit_service.log_employee_delete(
@@ -367,8 +663,9 @@ async def bulk_delete_employees(
             )
         
         # Verify which employees exist in this organization first.
-        existing = db_service.client.table("employees").select(
-            "id"
+        # (KPI columns are fetched too, to update the running counters)
+        existing = await db_service.table("employees").select(
+            KPI_AGGREGATE_COLUMNS
         ).in_(
             "id", employee_ids
         ).eq(
@@ -383,14 +680,14 @@ async def bulk_delete_employees(
 
         # Perform delete only for verified ids.
         if verified_ids:
-            db_service.client.table("employees").delete().in_(
+            await db_service.table("employees").delete().in_(
                 "id", verified_ids
             ).eq("organization_id", organization_id).execute()
 
         # Confirm what remains (PostgREST can return 200 even if 0 rows affected).
         remaining_ids: List[str] = []
         if verified_ids:
-            remaining = db_service.client.table("employees").select(
+            remaining = await db_service.table("employees").select(
                 "id"
             ).in_(
                 "id", verified_ids
@@ -403,6 +700,12 @@ async def bulk_delete_employees(
         deleted_ids = [eid for eid in verified_ids if eid not in remaining_set]
         not_deleted_ids = [eid for eid in verified_ids if eid in remaining_set]
         
+        # Keep running KPI counters in sync (confirmed deletions only)
+        deleted_set = set(deleted_ids)
+        await kpi_aggregate_service.record_changes(organization_id, [
+            (row, None) for row in (existing.data or []) if row.get("id") in deleted_set
+        ])
+        
         # Audit log - bulk delete (log only confirmed deletions)
         await audit_service.log_bulk_delete(
             table_name="employees",
@@ -429,32 +732,97 @@ async def bulk_delete_employees(
         )
 
 
-@router.get("/search", status_code=status.HTTP_200_OK)
-async def search_employees(
-    q: str,
+@router.post("/import", status_code=status.HTTP_200_OK)
+async def import_employees(
+    file: UploadFile = File(...),
+    company_id: str = Form(...),
+    dry_run: bool = Form(False),
     current_user: dict = Depends(get_current_user)
-) -> List[Dict[str, Any]]:
+) -> Dict[str, Any]:
     """
-    Search employees by name, email, or NI number
+    Bulk create employees from the SW New Member upload template
+    
+    Form fields:
+    - file: The template as .csv or .xlsx (the "Input" sheet is read)
+    - company_id: Company (Master Rulebook entry) the employees join; its
+      settings are auto-filled and its postponement period sets pension_start_date
+    - dry_run: Validate only, write nothing
+    
+    Every row is validated against the template's accepted values first; if
+    any row is invalid nothing is imported and 422 lists the errors by row.
+    Valid files are inserted in chunks of EMPLOYEE_IMPORT_CHUNK_SIZE, with one
+    audit insert and one email notification for the whole import.
     """
     try:
         organization_id = current_user["organization_id"]
         
-        # Search using ILIKE for case-insensitive partial matching
-        response = db_service.client.table("employees").select("*").eq(
-            "organization_id", organization_id
-        ).or_(
-            f"first_name.ilike.%{q}%,surname.ilike.%{q}%,email_address.ilike.%{q}%,ni_number.ilike.%{q}%"
-        ).execute()
+        try:
+            file_format = import_format(file.filename)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
         
-        return response.data
+        company_response = await db_service.table("companies").select("*").eq(
+            "id", company_id
+        ).eq("organization_id", organization_id).execute()
         
+        if not company_response.data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Company not found"
+            )
+        
+        company = company_response.data[0]
+        
+        try:
+            report, employees = await employee_import_service.import_file(
+                file.file,
+                file_format,
+                company,
+                current_user,
+                dry_run=dry_run,
+                file_name=file.filename
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        
+        if report["error_count"]:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=report
+            )
+        
+        # One notification for the whole import (non-blocking)
+        if employees:
+            recipient_email = current_user.get("email")
+            if recipient_email:
+                await notify_edge_function_import(employees, company["name"], recipient_email)
+            else:
+                logger.warning(f"No email found for user {current_user['id']}")
+        
+        if report.get("error"):
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=report["error"]
+            )
+        
+        return report
+        
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Failed to search employees: {str(e)}")
+        logger.error(f"Failed to import employees: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to search employees"
+            detail=f"Failed to import employees: {str(e)}"
         )
+    finally:
+        await file.close()
 
 
 @router.get("/export/io-template", status_code=status.HTTP_200_OK)
@@ -478,145 +846,111 @@ async def export_employees_io_template(
     - service_status: Filter by service status (e.g., "Active", "Inactive")
     - from_date/to_date: Filter by created_at date range (when employee record was added)
     
-    Returns CSV file with IO Bulk Upload Template headers (30 columns)
+    Returns the IO Bulk Upload Template (30 columns) as:
+    - format=csv: CSV streamed page by page (EXPORT_PAGE_SIZE rows fetched,
+      decrypted and encoded at a time)
+    - format=xlsx (or excel): XLSX with typed date/amount cells, built with a
+      write-only workbook and sent once complete
     """
     try:
         organization_id = current_user["organization_id"]
         
-        # Build query with filters
-        query = db_service.client.table("employees").select("*").eq(
-            "organization_id", organization_id
-        )
+        try:
+            export_format = normalize_export_format(format)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
         
-        # First, get total count without date filters for debugging
-        total_query = db_service.client.table("employees").select("id", count="exact").eq(
-            "organization_id", organization_id
-        )
-        total_response = total_query.execute()
-        total_count = total_response.count if hasattr(total_response, 'count') else len(total_response.data)
-        logger.info(f"Total employees in organization before filters: {total_count}")
-        
-        # Apply filters
-        if company_id:
-            query = query.eq("company_id", company_id)
-        if advice_type:
-            query = query.eq("advice_type", advice_type)
-        if pension_provider:
-            query = query.ilike("pension_provider_info", f"%{pension_provider}%")
-        if service_status:
-            query = query.eq("service_status", service_status)
-        
-        # Date filtering using created_at (timestamp with timezone)
-        # Need to ensure date format is compatible with timestamp comparison
-        if from_date and to_date:
-            # Add time to make it inclusive of the full day
-            from_datetime = f"{from_date}T00:00:00"
-            to_datetime = f"{to_date}T23:59:59"
-            query = query.gte("created_at", from_datetime).lte("created_at", to_datetime)
-            logger.info(f"Applying date range filter: {from_datetime} to {to_datetime}")
-        elif from_date:
-            from_datetime = f"{from_date}T00:00:00"
-            query = query.gte("created_at", from_datetime)
-            logger.info(f"Applying from_date filter: {from_datetime}")
-        elif to_date:
-            to_datetime = f"{to_date}T23:59:59"
-            query = query.lte("created_at", to_datetime)
-            logger.info(f"Applying to_date filter: {to_datetime}")
-        
-        logger.info(f"Export filters: company_id={company_id}, advice_type={advice_type}, pension_provider={pension_provider}, service_status={service_status}, from_date={from_date}, to_date={to_date}")
-        
-        response = query.order("created_at", desc=True).execute()
-        
-        logger.info(f"Fetched {len(response.data)} employees from database after applying filters")
-        
-        # Decrypt PII fields
-        encryption = get_encryption_service()
-        employees = [encryption.decrypt_employee_pii(emp) for emp in response.data]
-        
-        # Transform to IO Bulk Upload Template format
-        io_template_rows = []
-        for emp in employees:
-            row = {
-                'Surname*': emp.get('surname', ''),
-                'FirstName*': emp.get('first_name', ''),
-                'SchemeRef*': emp.get('scheme_ref', ''),
-                'CategoryName': emp.get('client_category', ''),
-                'Title': emp.get('title', ''),
-                'AddressLine1': emp.get('address_line_1', ''),
-                'AddressLine2': emp.get('address_line_2', ''),
-                'AddressLine3': emp.get('address_line_3', ''),
-                'AddressLine4': emp.get('address_line_4', ''),
-                'CityTown': emp.get('city_town', ''),
-                'County': emp.get('county', ''),
-                'Country': emp.get('country', ''),
-                'PostCode': emp.get('postcode', ''),
-                'AdviceType*': emp.get('advice_type', ''),
-                'DateJoinedScheme': emp.get('date_joined_scheme', ''),
-                'DateofBirth*': emp.get('date_of_birth', ''),
-                'EmailAddress': emp.get('email_address', ''),
-                'Gender': emp.get('legal_gender', ''),
-                'HomeNumber': emp.get('home_number', ''),
-                'MobileNumber': emp.get('mobile_number', ''),
-                'NINumber': emp.get('ni_number', ''),
-                'PensionableSalary': str(emp.get('pensionable_salary', '')) if emp.get('pensionable_salary') else '',
-                'PensionableSalaryStartDate': emp.get('pensionable_salary_start_date', ''),
-                'SalaryPostSacrifice': str(emp.get('salary_post_sacrifice', '')) if emp.get('salary_post_sacrifice') else '',
-                'PolicyNumber': emp.get('policy_number', ''),
-                'SellingAdviserId*': emp.get('selling_adviser_id', ''),
-                'SplitTemplateGroupName': emp.get('split_template_group_name', ''),
-                'SplitTemplateGroupSource': emp.get('split_template_group_source', ''),
-                'ServiceStatus': emp.get('service_status', ''),
-                'ClientCategory': emp.get('client_category', '')
-            }
-            io_template_rows.append(row)
-        
-        # Generate CSV - Always include headers
-        output = io.StringIO()
-        fieldnames = [
-            'Surname*', 'FirstName*', 'SchemeRef*', 'CategoryName', 'Title',
-            'AddressLine1', 'AddressLine2', 'AddressLine3', 'AddressLine4',
-            'CityTown', 'County', 'Country', 'PostCode', 'AdviceType*',
-            'DateJoinedScheme', 'DateofBirth*', 'EmailAddress', 'Gender',
-            'HomeNumber', 'MobileNumber', 'NINumber', 'PensionableSalary',
-            'PensionableSalaryStartDate', 'SalaryPostSacrifice', 'PolicyNumber',
-            'SellingAdviserId*', 'SplitTemplateGroupName', 'SplitTemplateGroupSource',
-            'ServiceStatus', 'ClientCategory'
-        ]
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
+        filters = {
+            "company_id": company_id,
+            "advice_type": advice_type,
+            "pension_provider": pension_provider,
+            "service_status": service_status,
+            "from_date": from_date,
+            "to_date": to_date
+        }
         
-        # Write data rows if any
-        if io_template_rows:
-            writer.writerows(io_template_rows)
+        logger.info(f"Export filters: {filters}, format: {export_format}")
         
-        logger.info(f"Exporting {len(io_template_rows)} employees to CSV")
+        pages = export_service.iter_employee_pages(organization_id, filters, IO_TEMPLATE_SELECT)
+        filename = f"employee_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
         
-        # Audit log - data export
-        await audit_service.log_export(
-            table_name="employees",
-            user_id=current_user["id"],
-            organization_id=organization_id,
-            filters={
-                "company_id": company_id,
-                "advice_type": advice_type,
-                "pension_provider": pension_provider,
-                "service_status": service_status,
-                "from_date": from_date,
-                "to_date": to_date
-            },
-            record_count=len(io_template_rows)
-        )
+        async def log_export(record_count: int, completed: bool):
+            logger.info(
+                f"Exported {record_count} employees to {export_format.upper()}"
+                f"{'' if completed else ' (partial - stream stopped early)'}"
+            )
+            
+            # Audit log - data export; runs as its own task and is shielded so
+            # cancelling the response (client disconnect) cannot skip it
+            task = asyncio.create_task(audit_service.log_export(
+                table_name="employees",
+                user_id=current_user["id"],
+                organization_id=organization_id,
+                filters=filters,
+                record_count=record_count,
+                completed=completed
+            ))
+            _export_audit_tasks.add(task)
+            task.add_done_callback(_export_audit_tasks.discard)
+            await asyncio.shield(task)
+        
+        if export_format == "xlsx":
+            record_count = 0
+            
+            async def typed_rows():
+                nonlocal record_count
+                async for page in pages:
+                    record_count += len(page)
+                    yield [io_template_values(emp, typed=True) for emp in page]
+            
+            workbook = await write_xlsx("Employees", IO_TEMPLATE_HEADERS, typed_rows())
+            await log_export(record_count, completed=True)
+            
+            return StreamingResponse(
+                iter_file(workbook),
+                media_type=XLSX_MEDIA_TYPE,
+                headers={
+                    'Content-Disposition': f'attachment; filename="{filename}"',
+                    'Content-Length': str(file_size(workbook))
+                }
+            )
         
-        # Create response
-        output.seek(0)
-        filename = f"employee_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        # Fetch the first page before responding so query errors still return a 500
+        first_page = await anext(pages, None)
+        
+        async def stream_csv():
+            """
+            Header, then one CSV chunk per page
+
+            The export is audited when the stream ends, with the rows actually
+            sent and whether it completed (disconnects and failed page queries
+            are logged as partial).
+            """
+            record_count = 0
+            completed = False
+            try:
+                yield encode_csv_rows([IO_TEMPLATE_HEADERS])
+                
+                page = first_page
+                while page is not None:
+                    record_count += len(page)
+                    yield encode_csv_rows(io_template_values(emp) for emp in page)
+                    page = await anext(pages, None)
+                completed = True
+            finally:
+                await log_export(record_count, completed)
         
         return StreamingResponse(
-            io.BytesIO(output.getvalue().encode('utf-8')),
+            stream_csv(),
             media_type='text/csv',
             headers={'Content-Disposition': f'attachment; filename="{filename}"'}
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to export employees: {str(e)}")
         raise HTTPException(
@@ -0,0 +1,121 @@
+"""
+Export Routes - Background export jobs with progress and resumable downloads
+"""
+from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import FileResponse
+from typing import Dict, Any, List
+import logging
+
+from app.services.export_job_service import export_job_service, ExportQueueFullError
+from app.services.export_service import XLSX_MEDIA_TYPE
+from app.routes.auth import get_current_user
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def _require_organization(current_user: Dict[str, Any]) -> str:
+    """Organization of the current user, or 400"""
+    org_id = current_user.get("organization_id")
+    if not org_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User not associated with an organization"
+        )
+    return org_id
+
+
+def _get_job(org_id: str, job_id: str) -> Dict[str, Any]:
+    """The organization's job, or 404"""
+    job = export_job_service.get(org_id, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export job not found"
+        )
+    return job
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def create_export(
+    export_request: Dict[str, Any],
+    current_user: dict = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Queue an export job
+
+    Body:
+    - type: io_template, change_information, form_submissions or audit_logs
+    - format: csv (default) or xlsx
+    - filters: Optional filters for the type
+      - io_template: company_id, advice_type, pension_provider, service_status, from_date, to_date
+      - form_submissions: form_id (required), status, from_date, to_date
+      - audit_logs: action, resource, from_date, to_date
+
+    Returns the job; poll GET /api/exports/{id} for progress and download the
+    file from GET /api/exports/{id}/download once completed. An identical
+    request over unchanged data returns the existing job ("reused": true).
+    """
+    org_id = _require_organization(current_user)
+
+    try:
+        return await export_job_service.submit(
+            org_id,
+            current_user["id"],
+            export_request.get("type", ""),
+            export_request.get("format") or "csv",
+            export_request.get("filters") or {}
+        )
+    except ExportQueueFullError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many exports in progress, please wait for one to finish"
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Failed to queue export: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to queue export: {str(e)}"
+        )
+
+
+@router.get("", status_code=status.HTTP_200_OK)
+async def list_exports(current_user: dict = Depends(get_current_user)) -> List[Dict[str, Any]]:
+    """Export jobs of the organization that have not expired, newest first"""
+    org_id = _require_organization(current_user)
+    return export_job_service.list(org_id)
+
+
+@router.get("/{job_id}", status_code=status.HTTP_200_OK)
+async def get_export(job_id: str, current_user: dict = Depends(get_current_user)) -> Dict[str, Any]:
+    """Status and progress of an export job"""
+    org_id = _require_organization(current_user)
+    return export_job_service.public(_get_job(org_id, job_id))
+
+
+@router.get("/{job_id}/download")
+async def download_export(job_id: str, current_user: dict = Depends(get_current_user)) -> FileResponse:
+    """
+    Download a completed export
+
+    Supports Range / If-Range requests, so interrupted downloads can resume.
+    """
+    org_id = _require_organization(current_user)
+    job = _get_job(org_id, job_id)
+
+    if job["status"] != "completed":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Export is {job['status']}"
+        )
+
+    return FileResponse(
+        job["path"],
+        media_type=XLSX_MEDIA_TYPE if job["format"] == "xlsx" else "text/csv",
+        filename=job["file_name"]
+    )
@@ -37,7 +37,7 @@ async def get_token_analytics(
         org_id = current_user.get("organization_id")
         
         # Fetch token with analytics
-        token_response = db_service.client.table("form_tokens").select(
+        token_response = await db_service.table("form_tokens").select(
             "*"
         ).eq("id", token_id).execute()
         
@@ -50,7 +50,7 @@ async def get_token_analytics(
         token = token_response.data[0]
         
         # Verify token's form belongs to user's org
-        form_response = db_service.client.table("forms").select(
+        form_response = await db_service.table("forms").select(
             "organization_id"
         ).eq("id", token["form_id"]).execute()
         
@@ -61,7 +61,7 @@ async def get_token_analytics(
             )
         
         # Get submissions count for this token
-        submissions_response = db_service.client.table("form_submissions").select(
+        submissions_response = await db_service.table("form_submissions").select(
             "id", count="exact"
         ).eq("token_id", token_id).execute()
         
@@ -109,7 +109,7 @@ async def get_form_analytics(
         org_id = current_user.get("organization_id")
         
         # Verify form belongs to user's org
-        form_response = db_service.client.table("forms").select(
+        form_response = await db_service.table("forms").select(
             "*"
         ).eq("id", form_id).eq("organization_id", org_id).execute()
         
@@ -120,12 +120,12 @@ async def get_form_analytics(
             )
         
         # Get all tokens for this form
-        tokens_response = db_service.client.table("form_tokens").select(
+        tokens_response = await db_service.table("form_tokens").select(
             "*"
         ).eq("form_id", form_id).execute()
         
         # Get all submissions for this form
-        submissions_response = db_service.client.table("form_submissions").select(
+        submissions_response = await db_service.table("form_submissions").select(
             "*", count="exact"
         ).eq("form_id", form_id).execute()
         
@@ -155,7 +155,7 @@ async def get_form_analytics(
                 expired_links += 1
             
             # Get submissions for this specific token
-            token_submissions = db_service.client.table("form_submissions").select(
+            token_submissions = await db_service.table("form_submissions").select(
                 "id", count="exact"
             ).eq("token_id", token["id"]).execute()
             
@@ -215,7 +215,7 @@ async def track_token_click(
     """
     try:
         # Fetch current analytics
-        token_response = db_service.client.table("form_tokens").select(
+        token_response = await db_service.table("form_tokens").select(
             "analytics"
         ).eq("id", token_id).execute()
         
@@ -232,7 +232,7 @@ async def track_token_click(
         analytics["last_clicked_at"] = datetime.utcnow().isoformat()
         
         # Update token
-        db_service.client.table("form_tokens").update({
+        await db_service.table("form_tokens").update({
             "analytics": analytics
         }).eq("id", token_id).execute()
         
@@ -264,7 +264,7 @@ async def update_token(
         org_id = current_user.get("organization_id")
         
         # Verify token's form belongs to user's org
-        token_response = db_service.client.table("form_tokens").select(
+        token_response = await db_service.table("form_tokens").select(
             "form_id"
         ).eq("id", token_id).execute()
         
@@ -275,7 +275,7 @@ async def update_token(
             )
         
         form_id = token_response.data[0]["form_id"]
-        form_response = db_service.client.table("forms").select(
+        form_response = await db_service.table("forms").select(
             "organization_id"
         ).eq("id", form_id).execute()
         
@@ -298,7 +298,7 @@ async def update_token(
             update_data["settings"] = token_data["settings"]
         
         # Update token
-        response = db_service.client.table("form_tokens").update(
+        response = await db_service.table("form_tokens").update(
             update_data
         ).eq("id", token_id).execute()
         
@@ -333,7 +333,7 @@ async def deactivate_token(
         org_id = current_user.get("organization_id")
         
         # Verify token's form belongs to user's org
-        token_response = db_service.client.table("form_tokens").select(
+        token_response = await db_service.table("form_tokens").select(
             "form_id"
         ).eq("id", token_id).execute()
         
@@ -344,7 +344,7 @@ async def deactivate_token(
             )
         
         form_id = token_response.data[0]["form_id"]
-        form_response = db_service.client.table("forms").select(
+        form_response = await db_service.table("forms").select(
             "organization_id"
         ).eq("id", form_id).execute()
         
@@ -355,7 +355,7 @@ async def deactivate_token(
             )
         
         # Deactivate token
-        response = db_service.client.table("form_tokens").update({
+        response = await db_service.table("form_tokens").update({
             "deactivated_at": datetime.utcnow().isoformat(),
             "deactivated_by_user_id": user_id
         }).eq("id", token_id).execute()
@@ -390,7 +390,7 @@ async def reactivate_token(
         org_id = current_user.get("organization_id")
         
         # Verify token's form belongs to user's org
-        token_response = db_service.client.table("form_tokens").select(
+        token_response = await db_service.table("form_tokens").select(
             "form_id"
         ).eq("id", token_id).execute()
         
@@ -401,7 +401,7 @@ async def reactivate_token(
             )
         
         form_id = token_response.data[0]["form_id"]
-        form_response = db_service.client.table("forms").select(
+        form_response = await db_service.table("forms").select(
             "organization_id"
         ).eq("id", form_id).execute()
         
@@ -412,7 +412,7 @@ async def reactivate_token(
             )
         
         # Reactivate token
-        response = db_service.client.table("form_tokens").update({
+        response = await db_service.table("form_tokens").update({
             "deactivated_at": None,
             "deactivated_by_user_id": None
         }).eq("id", token_id).execute()
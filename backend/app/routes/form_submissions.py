@@ -1,21 +1,36 @@
 """
 Form Submissions Routes - CRUD operations for form submissions
 """
-from fastapi import APIRouter, HTTPException, status, Depends, Response
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, List, Optional
 from uuid import UUID
 from datetime import datetime
+import asyncio
 import logging
-import csv
-import io
 
 from app.services.database_service import db_service
 from app.services.encryption_service import get_encryption_service
+from app.services.export_service import (
+    export_service,
+    encode_csv_rows,
+    form_submission_values,
+    FORM_SUBMISSION_BASE_HEADERS,
+)
+from app.services.column_projection import build_select
 from app.routes.auth import get_current_user
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Columns that can be requested with ?fields= (submission_data is encrypted)
+FORM_SUBMISSION_FIELDS = frozenset({
+    "id", "form_id", "form_version", "submission_data", "status",
+    "submitted_at", "submitted_by_user_id", "submitted_via", "token_id",
+    "organization_id", "company_id", "employee_id", "ip_address", "user_agent",
+    "notes", "reviewed_at", "reviewed_by_user_id", "created_at", "updated_at",
+})
+
 
 # ============================================================================
 # FORM SUBMISSION ENDPOINTS
@@ -39,7 +54,7 @@ async def create_submission(
         org_id = current_user.get("organization_id")
         
         # Create submission record
-        response = db_service.client.table("form_submissions").insert({
+        response = await db_service.table("form_submissions").insert({
             "form_id": submission_data.get("form_id"),
             "form_version": submission_data.get("form_version", 1),
             "submission_data": submission_data.get("submission_data"),
@@ -79,10 +94,12 @@ async def list_submissions(
     employee_id: Optional[str] = None,
     limit: int = 50,
     offset: int = 0,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (default: all)"),
     current_user: dict = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """
     List form submissions with filters
+    Only decrypts submission_data when it is included in ?fields=
     
     Query params:
     - form_id: Filter by form
@@ -91,13 +108,14 @@ async def list_submissions(
     - employee_id: Filter by employee
     - limit: Number of results (default 50)
     - offset: Pagination offset
+    - fields: Comma-separated columns to return, e.g. id,status,submitted_at
     """
     try:
         org_id = current_user.get("organization_id")
         
         # Build query
-        query = db_service.client.table("form_submissions").select(
-            "*",
+        query = db_service.table("form_submissions").select(
+            build_select(fields, FORM_SUBMISSION_FIELDS, required=("id", "submitted_at")),
             count="exact"
         ).eq("organization_id", org_id)
         
@@ -116,7 +134,7 @@ async def list_submissions(
         # Apply pagination and ordering
         query = query.order("submitted_at", desc=True).range(offset, offset + limit - 1)
         
-        response = query.execute()
+        response = await query.execute()
         
         # Decrypt submission_data for each submission
         encryption = get_encryption_service()
@@ -138,6 +156,8 @@ async def list_submissions(
             "offset": offset
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to list submissions: {str(e)}")
         raise HTTPException(
@@ -168,7 +188,7 @@ async def get_submission(
         return submission
         org_id = current_user.get("organization_id")
         
-        response = db_service.client.table("form_submissions").select("*").eq(
+        response = await db_service.table("form_submissions").select("*").eq(
             "id", submission_id
         ).eq("organization_id", org_id).execute()
         
@@ -226,7 +246,7 @@ async def update_submission_status(
         if status_data.get("notes"):
             update_data["notes"] = status_data["notes"]
         
-        response = db_service.client.table("form_submissions").update(
+        response = await db_service.table("form_submissions").update(
             update_data
         ).eq("id", submission_id).eq("organization_id", org_id).execute()
         
@@ -259,7 +279,7 @@ async def delete_submission(
     try:
         org_id = current_user.get("organization_id")
         
-        response = db_service.client.table("form_submissions").delete().eq(
+        response = await db_service.table("form_submissions").delete().eq(
             "id", submission_id
         ).eq("organization_id", org_id).execute()
         
@@ -285,80 +305,64 @@ async def delete_submission(
 async def export_submissions_csv(
     form_id: str,
     status_filter: Optional[str] = None,
+    from_date: Optional[str] = Query(None, description="Submitted on or after, YYYY-MM-DD"),
+    to_date: Optional[str] = Query(None, description="Submitted on or before, YYYY-MM-DD"),
     current_user: dict = Depends(get_current_user)
-) -> Response:
+) -> StreamingResponse:
     """
     Export form submissions as CSV
     
     Query params:
     - form_id: Required - form to export
     - status_filter: Optional - filter by status
+    - from_date/to_date: Optional - submitted_at date range (inclusive)
+    
+    Columns are the submission fields followed by one column per field of the
+    form definition. Submissions are fetched EXPORT_PAGE_SIZE at a time, their
+    submission_data decrypted in a worker pool and written out as CSV while
+    the next page is being fetched.
     """
     try:
         org_id = current_user.get("organization_id")
         
-        # Fetch submissions
-        query = db_service.client.table("form_submissions").select(
-            "*"
-        ).eq("organization_id", org_id).eq("form_id", form_id)
-        
-        if status_filter:
-            query = query.eq("status", status_filter)
-        
-        response = query.order("submitted_at", desc=True).execute()
-        
-        if not response.data:
+        # Field names come from the form definition (read once)
+        field_names = await export_service.get_form_field_names(org_id, form_id)
+        if field_names is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail="No submissions found"
+                detail="Form not found"
             )
         
-        # Get form structure to extract field names
-        form_response = db_service.client.table("forms").select(
-            "form_data"
-        ).eq("id", form_id).execute()
+        filters = {"form_id": form_id, "status": status_filter, "from_date": from_date, "to_date": to_date}
+        pages = export_service.iter_form_submission_pages(org_id, filters)
         
-        if not form_response.data:
+        # Fetch the first page before responding so errors still return 404/500
+        first_page = await anext(pages, None)
+        if first_page is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail="Form not found"
+                detail="No submissions found"
             )
         
-        form_fields = form_response.data[0].get("form_data", {}).get("fields", [])
-        field_names = [field.get("name") for field in form_fields]
-        
-        # Create CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        header = ["Submission ID", "Status", "Submitted At", "Employee ID", "Company ID"] + field_names
-        writer.writerow(header)
-        
-        # Write data rows
-        for submission in response.data:
-            submission_data = submission.get("submission_data", {})
-            row = [
-                submission.get("id"),
-                submission.get("status"),
-                submission.get("submitted_at"),
-                submission.get("employee_id", ""),
-                submission.get("company_id", "")
-            ]
-            
-            # Add field values
-            for field_name in field_names:
-                row.append(submission_data.get(field_name, ""))
+        async def stream_csv():
+            yield encode_csv_rows([list(FORM_SUBMISSION_BASE_HEADERS) + field_names])
             
-            writer.writerow(row)
-        
-        # Get CSV content
-        csv_content = output.getvalue()
-        output.close()
+            page = first_page
+            next_page = None
+            try:
+                while page is not None:
+                    # Fetch and decrypt the next page while this one is encoded and sent
+                    next_page = asyncio.ensure_future(anext(pages, None))
+                    yield encode_csv_rows(form_submission_values(submission, field_names) for submission in page)
+                    page = await next_page
+                    next_page = None
+            finally:
+                if next_page is not None:
+                    next_page.cancel()
         
         # Return as downloadable file
-        return Response(
-            content=csv_content,
+        return StreamingResponse(
+            stream_csv(),
             media_type="text/csv",
             headers={
                 "Content-Disposition": f"attachment; filename=form_submissions_{form_id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
@@ -33,7 +33,7 @@ async def list_templates(
         org_id = current_user.get("organization_id")
         
         # Query forms marked as templates
-        query = db_service.client.table("forms").select(
+        query = db_service.table("forms").select(
             "*"
         ).eq("organization_id", org_id).eq("is_template", True)
         
@@ -42,7 +42,7 @@ async def list_templates(
             tag_list = [tag.strip() for tag in tags.split(",")]
             query = query.contains("tags", tag_list)
         
-        response = query.order("created_at", desc=True).execute()
+        response = await query.order("created_at", desc=True).execute()
         
         return response.data
         
@@ -74,7 +74,7 @@ async def mark_as_template(
             "tags": template_data.get("tags", [])
         }
         
-        response = db_service.client.table("forms").update(
+        response = await db_service.table("forms").update(
             update_data
         ).eq("id", form_id).eq("organization_id", org_id).execute()
         
@@ -115,7 +115,7 @@ async def duplicate_form(
         org_id = current_user.get("organization_id")
         
         # Fetch original form
-        original_response = db_service.client.table("forms").select(
+        original_response = await db_service.table("forms").select(
             "*"
         ).eq("id", form_id).eq("organization_id", org_id).execute()
         
@@ -150,7 +150,7 @@ async def duplicate_form(
         }
         
         # Insert duplicated form
-        response = db_service.client.table("forms").insert(duplicate_form).execute()
+        response = await db_service.table("forms").insert(duplicate_form).execute()
         
         if not response.data:
             raise HTTPException(
@@ -184,7 +184,7 @@ async def list_form_duplicates(
         org_id = current_user.get("organization_id")
         
         # Get the original form's duplicate count
-        original_response = db_service.client.table("forms").select(
+        original_response = await db_service.table("forms").select(
             "duplicate_count"
         ).eq("id", form_id).eq("organization_id", org_id).execute()
         
@@ -195,7 +195,7 @@ async def list_form_duplicates(
             )
         
         # Get all duplicates
-        duplicates_response = db_service.client.table("forms").select(
+        duplicates_response = await db_service.table("forms").select(
             "*"
         ).eq("parent_form_id", form_id).eq("organization_id", org_id).order(
             "created_at", desc=True
@@ -236,7 +236,7 @@ async def create_from_template(
         org_id = current_user.get("organization_id")
         
         # Fetch template
-        template_response = db_service.client.table("forms").select(
+        template_response = await db_service.table("forms").select(
             "*"
         ).eq("id", form_id).eq("organization_id", org_id).eq("is_template", True).execute()
         
@@ -271,7 +271,7 @@ async def create_from_template(
             "tags": []  # Start with no tags
         }
         
-        response = db_service.client.table("forms").insert(new_form).execute()
+        response = await db_service.table("forms").insert(new_form).execute()
         
         if not response.data:
             raise HTTPException(
@@ -303,7 +303,7 @@ async def list_form_versions(
         org_id = current_user.get("organization_id")
         
         # Verify form belongs to user's organization
-        form_response = db_service.client.table("forms").select(
+        form_response = await db_service.table("forms").select(
             "id"
         ).eq("id", form_id).eq("organization_id", org_id).execute()
         
@@ -314,7 +314,7 @@ async def list_form_versions(
             )
         
         # Get all versions
-        versions_response = db_service.client.table("form_versions").select(
+        versions_response = await db_service.table("form_versions").select(
             "*"
         ).eq("form_id", form_id).order("version_number", desc=True).execute()
         
@@ -343,7 +343,7 @@ async def get_form_version(
         org_id = current_user.get("organization_id")
         
         # Verify form belongs to user's organization
-        form_response = db_service.client.table("forms").select(
+        form_response = await db_service.table("forms").select(
             "id"
         ).eq("id", form_id).eq("organization_id", org_id).execute()
         
@@ -354,7 +354,7 @@ async def get_form_version(
             )
         
         # Get specific version
-        version_response = db_service.client.table("form_versions").select(
+        version_response = await db_service.table("form_versions").select(
             "*"
         ).eq("form_id", form_id).eq("version_number", version_number).execute()
         
@@ -1,7 +1,7 @@
 """
 Form Management Routes - Authenticated endpoints for form CRUD and token management
 """
-from fastapi import APIRouter, HTTPException, status, Depends, Request
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Query
 from typing import Dict, Any, List, Optional
 from uuid import UUID
 from datetime import datetime, timedelta
@@ -9,11 +9,20 @@ import secrets
 import logging
 
 from app.services.database_service import db_service
+from app.services.column_projection import build_select
 from app.routes.auth import get_current_user
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Columns that can be requested with ?fields= (form_data holds the full field definitions)
+FORM_FIELDS = frozenset({
+    "id", "organization_id", "created_by_user_id", "linked_company_id",
+    "template_type", "form_data", "processing_status", "version", "is_template", "tags",
+    "parent_form_id", "duplicate_count", "submitted_via", "ip_address", "user_agent",
+    "created_at", "updated_at",
+})
+
 
 # ============================================================================
 # FORM CRUD ENDPOINTS
@@ -72,7 +81,7 @@ async def create_form(
         logger.info(f"Creating form with template_type: {insert_data['template_type']}")
         
         # Create form in database
-        response = db_service.client.table("forms").insert(insert_data).execute()
+        response = await db_service.table("forms").insert(insert_data).execute()
         
         if not response.data:
             raise HTTPException(
@@ -98,6 +107,7 @@ async def create_form(
 async def list_forms(
     organization_id: Optional[str] = None,
     template_type: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (default: all)"),
     current_user: dict = Depends(get_current_user)
 ) -> List[Dict[str, Any]]:
     """
@@ -106,12 +116,15 @@ async def list_forms(
     Query params:
     - organization_id: Filter by organization
     - template_type: Filter by template type
+    - fields: Comma-separated columns to return, e.g. id,template_type,created_at
     """
     try:
         # Use user's organization if not specified
         org_id = organization_id or current_user.get("organization_id")
         
-        query = db_service.client.table("forms").select("*")
+        query = db_service.table("forms").select(
+            build_select(fields, FORM_FIELDS, required=("id", "created_at"))
+        )
         
         if org_id:
             query = query.eq("organization_id", org_id)
@@ -119,11 +132,13 @@ async def list_forms(
         if template_type:
             query = query.eq("template_type", template_type)
         
-        response = query.order("created_at", desc=True).execute()
+        response = await query.order("created_at", desc=True).execute()
         
         # Return array directly for frontend compatibility
         return response.data if response.data else []
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -138,7 +153,7 @@ async def get_form(
 ) -> Dict[str, Any]:
     """Get a specific form by ID"""
     try:
-        response = db_service.client.table("forms").select("*").eq("id", form_id).execute()
+        response = await db_service.table("forms").select("*").eq("id", form_id).execute()
         
         if not response.data:
             raise HTTPException(
@@ -168,7 +183,7 @@ async def refresh_form_template(
     """
     try:
         # Get the form to check it exists
-        form_response = db_service.client.table("forms").select("*").eq("id", form_id).execute()
+        form_response = await db_service.table("forms").select("*").eq("id", form_id).execute()
         
         if not form_response.data:
             raise HTTPException(
@@ -214,7 +229,7 @@ async def refresh_form_template(
         }
         
         # Update the form
-        response = db_service.client.table("forms").update({
+        response = await db_service.table("forms").update({
             "form_data": updated_template,
             "updated_at": datetime.utcnow().isoformat()
         }).eq("id", form_id).execute()
@@ -271,7 +286,7 @@ async def update_form(
         if "tags" in form_data:
             update_data["tags"] = form_data["tags"]
         
-        response = db_service.client.table("forms").update(update_data).eq("id", form_id).execute()
+        response = await db_service.table("forms").update(update_data).eq("id", form_id).execute()
         
         if not response.data:
             raise HTTPException(
@@ -302,7 +317,7 @@ async def delete_form(
     RLS policy enforces creator-only delete
     """
     try:
-        response = db_service.client.table("forms").delete().eq("id", form_id).execute()
+        response = await db_service.table("forms").delete().eq("id", form_id).execute()
         
         if not response.data:
             raise HTTPException(
@@ -356,7 +371,7 @@ async def generate_token(
         expires_at = (datetime.utcnow() + timedelta(minutes=expiry_minutes)).isoformat()
         
         # Create token record
-        response = db_service.client.table("form_tokens").insert({
+        response = await db_service.table("form_tokens").insert({
             "form_id": form_id,
             "company_id": token_data["company_id"],
             "organization_id": org_id,
@@ -379,9 +394,9 @@ async def generate_token(
         
         # Update form's linked_company_id only if not already set
         try:
-            form_check = db_service.client.table("forms").select("linked_company_id").eq("id", form_id).execute()
+            form_check = await db_service.table("forms").select("linked_company_id").eq("id", form_id).execute()
             if form_check.data and not form_check.data[0].get("linked_company_id"):
-                db_service.client.table("forms").update({
+                await db_service.table("forms").update({
                     "linked_company_id": token_data["company_id"]
                 }).eq("id", form_id).execute()
         except Exception as e:
@@ -416,7 +431,7 @@ async def list_tokens(
 ) -> List[Dict[str, Any]]:
     """List all tokens for a specific form"""
     try:
-        response = db_service.client.table("form_tokens").select(
+        response = await db_service.table("form_tokens").select(
             "*, companies(name)"
         ).eq("form_id", form_id).order("created_at", desc=True).execute()
         
@@ -451,7 +466,7 @@ async def update_token(
         if "max_submissions" in token_data:
             update_data["max_submissions"] = token_data["max_submissions"]
         
-        response = db_service.client.table("form_tokens").update(
+        response = await db_service.table("form_tokens").update(
             update_data
         ).eq("id", token_id).execute()
         
@@ -483,7 +498,7 @@ async def get_form_submissions(
     """
     try:
         # Get all employees submitted via this form's tokens
-        response = db_service.client.table("employees").select(
+        response = await db_service.table("employees").select(
             "*, form_tokens!inner(form_id)"
         ).eq("form_tokens.form_id", form_id).execute()
         
@@ -2,22 +2,40 @@
 KPI Statistics API endpoints for Executive Dashboard
 Uses historical snapshots for accurate trend tracking
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from datetime import datetime, timedelta, date
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
+import asyncio
+import bisect
 import logging
 
 from app.services.database_service import db_service
-from app.services.encryption_service import get_encryption_service
 from app.services.kpi_snapshot_service import kpi_snapshot_service
+from app.services.kpi_aggregate_service import kpi_aggregate_service
+from app.services.kpi_backfill_service import kpi_backfill_service
+from app.services.response_cache_service import response_cache
+from app.services.single_flight import single_flight
 from app.routes.auth import get_current_user
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def _require_organization(current_user: Dict) -> str:
+    """Organization of the current user (400 if missing)"""
+    org_id = current_user.get("organization_id")
+    if not org_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Organization ID not found"
+        )
+    return org_id
+
+
 @router.get("/workforce")
 async def get_workforce_kpis(
+    request: Request,
+    response: Response,
     start_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format"),
     end_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format"),
     current_user: Dict = Depends(get_current_user)
@@ -32,14 +50,17 @@ async def get_workforce_kpis(
     Trends are calculated by comparing end date with equivalent prior period
     If no dates provided, defaults to comparing today vs 7 days ago
     """
+    org_id = _require_organization(current_user)
+    return await response_cache.serve(
+        request, response, org_id, "workforce",
+        {"start_date": start_date, "end_date": end_date},
+        lambda: _workforce_kpis(org_id, start_date, end_date)
+    )
+
+
+async def _workforce_kpis(org_id: str, start_date: Optional[str], end_date: Optional[str]) -> Dict[str, Any]:
+    """Compute the /workforce response"""
     try:
-        org_id = current_user.get("organization_id")
-        if not org_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Organization ID not found"
-            )
-        
         # Parse dates or use defaults
         if end_date:
             target_end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
@@ -56,36 +77,33 @@ async def get_workforce_kpis(
         comparison_end_date = target_start_date - timedelta(days=1)
         comparison_start_date = comparison_end_date - timedelta(days=period_days)
         
-        # Get or create snapshot for end date
-        today_snapshot = kpi_snapshot_service.get_snapshot(org_id, target_end_date)
-        if not today_snapshot:
-            logger.info(f"No snapshot for {target_end_date}, calculating now for org {org_id}")
-            today_snapshot = await kpi_snapshot_service.calculate_and_store_snapshot(org_id, target_end_date)
+        # Today's figures come from the running KPI counters (O(1) read);
+        # past end dates use the stored snapshot (or calculate one if missing)
+        if target_end_date == date.today():
+            today_snapshot = await kpi_aggregate_service.current_snapshot(org_id, target_end_date)
+        else:
+            today_snapshot = await kpi_snapshot_service.get_snapshot(org_id, target_end_date)
+            if not today_snapshot:
+                logger.info(f"No snapshot for {target_end_date}, calculating now for org {org_id}")
+                today_snapshot = await kpi_snapshot_service.calculate_and_store_snapshot(org_id, target_end_date)
         
         # Get snapshot from comparison period (or closest available)
-        comparison_snapshot = kpi_snapshot_service.get_snapshot(org_id, comparison_end_date)
+        comparison_snapshot = await kpi_snapshot_service.get_snapshot(org_id, comparison_end_date)
         
-        # If no comparison snapshot, look for the most recent one in the comparison range
+        # If no comparison snapshot, use the oldest one in the comparison range
         if not comparison_snapshot:
-            snapshots = kpi_snapshot_service.get_snapshots_range(org_id, comparison_start_date, comparison_end_date)
-            comparison_snapshot = snapshots[-1] if snapshots else None
+            comparison_snapshot = await kpi_snapshot_service.get_oldest_snapshot(
+                org_id, comparison_end_date, start_date=comparison_start_date
+            )
         
-        # If still no comparison snapshot (limited historical data), use oldest available snapshot
+        # If still no comparison snapshot (limited historical data), use the oldest
+        # available snapshot - unless that is the end date's own snapshot, in which
+        # case no comparison is possible
         if not comparison_snapshot:
-            all_snapshots = kpi_snapshot_service.get_snapshots_range(
-                org_id, 
-                date(2000, 1, 1),  # Far back date to get all snapshots
-                target_end_date
-            )
-            # Snapshots are returned in DESC order, so [-1] is oldest, [0] is newest
-            # We need at least 2 snapshots: one for today and one for comparison
-            if len(all_snapshots) >= 2:
-                # Use the oldest snapshot (last in DESC list) for comparison
-                comparison_snapshot = all_snapshots[-1]
+            oldest_snapshot = await kpi_snapshot_service.get_oldest_snapshot(org_id, target_end_date)
+            if oldest_snapshot and oldest_snapshot["snapshot_date"] != target_end_date.isoformat():
+                comparison_snapshot = oldest_snapshot
                 logger.info(f"Using oldest available snapshot from {comparison_snapshot.get('snapshot_date')} for comparison")
-            elif len(all_snapshots) == 1:
-                # Only one snapshot exists (today's), no comparison possible
-                comparison_snapshot = None
         
         # Calculate trends
         if comparison_snapshot:
@@ -128,7 +146,7 @@ async def get_workforce_kpis(
             pension_packs_trend = {"value": 0.0, "is_positive": True}
         
         # Get nearest upcoming pension start date (requires live query)
-        pending_response = db_service.client.table("employees")\
+        pending_response = await db_service.table("employees")\
             .select("pension_start_date")\
             .eq("organization_id", org_id)\
             .eq("service_status", "Active")\
@@ -183,8 +201,31 @@ async def get_workforce_kpis(
         )
 
 
+# How far from a target date a snapshot series point may be, per resolution
+NEAREST_SNAPSHOT_MAX_DAYS = {"day": 5, "week": 5, "month": 16}
+
+
+def _nearest_snapshot(
+    snapshots: List[Dict[str, Any]],
+    snapshot_dates: List[date],
+    target: date,
+    max_days: int = 5
+) -> Optional[Dict[str, Any]]:
+    """Snapshot closest to target (ties go to the later one) from a date-sorted series"""
+    index = bisect.bisect_left(snapshot_dates, target)
+    best = None
+    for candidate in (index, index - 1):
+        if 0 <= candidate < len(snapshot_dates):
+            distance = abs((snapshot_dates[candidate] - target).days)
+            if distance <= max_days and (best is None or distance < best[0]):
+                best = (distance, candidate)
+    return snapshots[best[1]] if best else None
+
+
 @router.get("/time-series")
 async def get_time_series_data(
+    request: Request,
+    response: Response,
     start_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format"),
     end_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format"),
     current_user: Dict = Depends(get_current_user)
@@ -196,14 +237,17 @@ async def get_time_series_data(
     
     If no dates provided, defaults to last 16 weeks and 12 months
     """
+    org_id = _require_organization(current_user)
+    return await response_cache.serve(
+        request, response, org_id, "time-series",
+        {"start_date": start_date, "end_date": end_date},
+        lambda: _time_series_data(org_id, start_date, end_date)
+    )
+
+
+async def _time_series_data(org_id: str, start_date: Optional[str], end_date: Optional[str]) -> Dict[str, Any]:
+    """Compute the /time-series response"""
     try:
-        org_id = current_user.get("organization_id")
-        if not org_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Organization ID not found"
-            )
-        
         # Parse dates or use defaults
         if end_date:
             target_end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
@@ -216,69 +260,68 @@ async def get_time_series_data(
             # Default to 16 weeks back
             target_start_date = target_end_date - timedelta(weeks=16)
         
-        # Check if we have any historical snapshots, and limit date range to available data
-        all_snapshots = kpi_snapshot_service.get_snapshots_range(
-            org_id, 
-            date(2000, 1, 1),  # Far back date to get all snapshots
-            target_end_date
+        # Oldest snapshot (to limit the range to available data) and the snapshot
+        # series for growth rates, fetched together. Long ranges read weekly or
+        # monthly rollups instead of every daily snapshot. Monthly comparisons
+        # reach at most 5 days before the requested start.
+        oldest_snapshot_date, (resolution, snapshot_series) = await asyncio.gather(
+            kpi_snapshot_service.get_oldest_snapshot_date(org_id, target_end_date),
+            kpi_snapshot_service.get_snapshot_rollups(
+                org_id,
+                target_start_date - timedelta(days=5),
+                target_end_date + timedelta(days=5),
+                columns="snapshot_date, total_active_employees"
+            )
         )
         
-        if all_snapshots:
-            # Snapshots are in DESC order, so [-1] is the oldest
-            oldest_snapshot_date = datetime.strptime(all_snapshots[-1]["snapshot_date"], '%Y-%m-%d').date()
-            if target_start_date < oldest_snapshot_date:
-                logger.info(f"Adjusting start date from {target_start_date} to {oldest_snapshot_date} (oldest snapshot)")
-                target_start_date = oldest_snapshot_date
+        if oldest_snapshot_date and target_start_date < oldest_snapshot_date:
+            logger.info(f"Adjusting start date from {target_start_date} to {oldest_snapshot_date} (oldest snapshot)")
+            target_start_date = oldest_snapshot_date
         
         # Calculate number of weeks in the period
         period_days = (target_end_date - target_start_date).days
         num_weeks = max(1, period_days // 7)
         
-        # Calculate new hires per week for the period
+        # New hires per week: fetch creation dates for the whole period once and
+        # bucket into 7-day weeks ending on target_end_date
+        first_week_start = target_end_date - timedelta(weeks=num_weeks - 1, days=6)
+        hire_dates = await kpi_snapshot_service.get_hire_dates(org_id, first_week_start, target_end_date)
+        
+        hires_per_week = [0] * num_weeks
+        for hire_date in hire_dates:
+            weeks_back = (target_end_date - hire_date).days // 7
+            if 0 <= weeks_back < num_weeks:
+                hires_per_week[weeks_back] += 1
+        
         weeks_data = []
         for i in range(num_weeks - 1, -1, -1):
             week_end = target_end_date - timedelta(weeks=i)
-            week_start = week_end - timedelta(days=6)
-            
-            # Query employees created in this week
-            response = db_service.client.table("employees")\
-                .select("id", count="exact")\
-                .eq("organization_id", org_id)\
-                .gte("created_at", week_start.isoformat())\
-                .lte("created_at", week_end.isoformat())\
-                .execute()
-            
             weeks_data.append({
                 "week": week_end.strftime("%b %d"),
-                "new_hires": response.count or 0
+                "new_hires": hires_per_week[i]
             })
         
         # Calculate number of months in the period
         num_months = max(1, period_days // 30)
         
+        snapshot_dates = [date.fromisoformat(snap["snapshot_date"]) for snap in snapshot_series]
+        
         # Calculate monthly growth rate for the period
         months_data = []
         for i in range(num_months - 1, -1, -1):
             current_month = target_end_date - timedelta(days=30*i)
             previous_month = current_month - timedelta(days=30)
             
-            # Get snapshots for these months (or closest available)
-            current_snapshots = kpi_snapshot_service.get_snapshots_range(
-                org_id, 
-                current_month - timedelta(days=5),
-                current_month + timedelta(days=5)
-            )
-            previous_snapshots = kpi_snapshot_service.get_snapshots_range(
-                org_id,
-                previous_month - timedelta(days=5),
-                previous_month + timedelta(days=5)
-            )
+            # Closest snapshots to each month end (within 5 days, or half a month
+            # for monthly rollups)
+            max_days = NEAREST_SNAPSHOT_MAX_DAYS[resolution]
+            current_snapshot = _nearest_snapshot(snapshot_series, snapshot_dates, current_month, max_days)
+            previous_snapshot = _nearest_snapshot(snapshot_series, snapshot_dates, previous_month, max_days)
             
             growth_rate = 0.0
-            if current_snapshots and previous_snapshots:
-                # Snapshots are in DESC order, [0] is most recent in range
-                current_count = current_snapshots[0]["total_active_employees"]
-                previous_count = previous_snapshots[0]["total_active_employees"]
+            if current_snapshot and previous_snapshot:
+                current_count = current_snapshot["total_active_employees"]
+                previous_count = previous_snapshot["total_active_employees"]
                 
                 if previous_count > 0:
                     growth_rate = ((current_count - previous_count) / previous_count) * 100
@@ -301,9 +344,53 @@ async def get_time_series_data(
         )
 
 
+def _top_counts(counts: Dict[str, int], key: str = "name", limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """[{key: label, "count": n}] sorted by count (descending), optionally truncated"""
+    ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return [{key: label, "count": count} for label, count in ordered[:limit]]
+
+
+def _analytics_response(histograms: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape get_analytics_histograms() output into the /analytics response"""
+    total = histograms["total_employees"]
+    flags = histograms["flags"]
+    
+    def coverage(count: int, yes: str, no: str) -> Dict[str, Any]:
+        return {yes: count, no: total - count, "rate": round((count / total) * 100, 1) if total > 0 else 0}
+    
+    return {
+        "employees_by_company": _top_counts(histograms["company"], limit=15),
+        "nationality_breakdown": _top_counts(histograms["nationality"], limit=10),
+        "age_distribution": [{"bracket": bracket, "count": count} for bracket, count in histograms["age"].items()],
+        "pension_approaches": _top_counts(histograms["approach"]),
+        "coverage_rates": {
+            "pension": coverage(flags["pension"], "active", "inactive"),
+            "group_life": coverage(flags["group_life"], "has", "no"),
+            "gci": coverage(flags["gci"], "has", "no"),
+            "gip": coverage(flags["gip"], "has", "no"),
+            "bupa": coverage(flags["bupa"], "has", "no")
+        },
+        "gender_distribution": _top_counts(histograms["gender"]),
+        "residency": {
+            "uk_resident": flags["uk_resident"],
+            "non_uk_resident": total - flags["uk_resident"]
+        },
+        "io_status": {
+            "completed": flags["io_uploaded"],
+            "pending": total - flags["io_uploaded"]
+        },
+        "geographic_distribution": _top_counts(histograms["postcode_area"], key="area"),
+        "total_employees": total,
+        "snapshot_date": histograms.get("snapshot_date")
+    }
+
+
 @router.get("/analytics")
 async def get_analytics_data(
-    date: Optional[str] = Query(None, description="Target date in YYYY-MM-DD format (defaults to today)"),
+    request: Request,
+    response: Response,
+    target_date: Optional[str] = Query(None, alias="date", description="Target date in YYYY-MM-DD format (defaults to today)"),
+    compare_date: Optional[str] = Query(None, description="Optional second date in YYYY-MM-DD format to compare against"),
     current_user: Dict = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """
@@ -318,163 +405,55 @@ async def get_analytics_data(
     - IO Upload Status
     - Geographic Distribution
     
-    Note: Currently returns live data. Historical snapshot support coming soon.
+    Today is computed live; past dates are served from the daily analytics
+    snapshot on or before that date (`snapshot_date` in the response). A day's
+    snapshot is re-stored on the first load after each write, so it holds the
+    last state a dashboard load saw that day - the start-of-day scheduler state
+    if no one loaded analytics after that day's changes (or on another worker).
+    With compare_date, the other date's data is returned under `comparison`.
     """
+    org_id = _require_organization(current_user)
+    return await response_cache.serve(
+        request, response, org_id, "analytics",
+        {"date": target_date, "compare_date": compare_date},
+        lambda: _analytics_data(org_id, target_date, compare_date)
+    )
+
+
+async def _analytics_data(org_id: str, target_date: Optional[str], compare_date: Optional[str]) -> Dict[str, Any]:
+    """Compute the /analytics response"""
     try:
-        org_id = current_user.get("organization_id")
-        if not org_id:
+        try:
+            requested_dates = [
+                datetime.strptime(value, '%Y-%m-%d').date() if value else None
+                for value in (target_date, compare_date)
+            ]
+        except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Organization ID not found"
+                detail="Dates must be in YYYY-MM-DD format"
             )
         
-        # Fetch all active employees with company name
-        response = db_service.client.table("employees")\
-            .select("*, companies(name)")\
-            .eq("organization_id", org_id)\
-            .eq("service_status", "Active")\
-            .execute()
-        
-        employees = response.data
-        total = len(employees)
-        
-        # 1. Employees by Company (top 15)
-        company_counts = {}
-        for emp in employees:
-            company_name = emp.get("companies", {}).get("name", "Unknown") if emp.get("companies") else "Unknown"
-            company_counts[company_name] = company_counts.get(company_name, 0) + 1
-        
-        employees_by_company = [
-            {"name": name, "count": count}
-            for name, count in sorted(company_counts.items(), key=lambda x: x[1], reverse=True)[:15]
-        ]
-        
-        # 2. Nationality Breakdown (top 10)
-        nationality_counts = {}
-        for emp in employees:
-            nationality = emp.get("nationality", "Unknown") or "Unknown"
-            nationality_counts[nationality] = nationality_counts.get(nationality, 0) + 1
-        
-        nationality_breakdown = [
-            {"name": name, "count": count}
-            for name, count in sorted(nationality_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        ]
+        # Live distributions are computed in the database (only DOBs are fetched);
+        # past dates are a single snapshot row each
+        lookups = [kpi_snapshot_service.get_analytics(org_id, requested_dates[0])]
+        if compare_date:
+            lookups.append(kpi_snapshot_service.get_analytics(org_id, requested_dates[1]))
+        results = await asyncio.gather(*lookups)
         
-        # 3. Age Distribution (calculate from date_of_birth)
-        from datetime import date, datetime
-        encryption = get_encryption_service()
-        age_brackets = {"18-25": 0, "26-35": 0, "36-45": 0, "46-55": 0, "56-65": 0, "65+": 0}
-        for emp in employees:
-            dob = emp.get("date_of_birth")
-            if dob:
-                try:
-                    decrypted_dob = encryption.decrypt(dob) if isinstance(dob, str) else dob
-                    if isinstance(decrypted_dob, datetime):
-                        birth_date = decrypted_dob.date()
-                    elif isinstance(decrypted_dob, date):
-                        birth_date = decrypted_dob
-                    elif isinstance(decrypted_dob, str):
-                        birth_date = date.fromisoformat(decrypted_dob)
-                    else:
-                        continue
-                    age = (date.today() - birth_date).days // 365
-                    if age <= 25:
-                        age_brackets["18-25"] += 1
-                    elif age <= 35:
-                        age_brackets["26-35"] += 1
-                    elif age <= 45:
-                        age_brackets["36-45"] += 1
-                    elif age <= 55:
-                        age_brackets["46-55"] += 1
-                    elif age <= 65:
-                        age_brackets["56-65"] += 1
-                    else:
-                        age_brackets["65+"] += 1
-                except:
-                    pass
-        
-        age_distribution = [{"bracket": k, "count": v} for k, v in age_brackets.items()]
-        
-        # 4. Pension Investment Approach
-        approach_counts = {}
-        for emp in employees:
-            approach = emp.get("pension_investment_approach", "Not Set") or "Not Set"
-            approach_counts[approach] = approach_counts.get(approach, 0) + 1
-        
-        pension_approaches = [
-            {"name": name, "count": count}
-            for name, count in sorted(approach_counts.items(), key=lambda x: x[1], reverse=True)
-        ]
-        
-        # 5. Coverage Rates
-        pension_active = sum(1 for emp in employees if emp.get("is_pension_active"))
-        group_life = sum(1 for emp in employees if emp.get("has_group_life"))
-        gci = sum(1 for emp in employees if emp.get("has_gci"))
-        gip = sum(1 for emp in employees if emp.get("has_gip"))
-        bupa = sum(1 for emp in employees if emp.get("has_bupa"))
-        
-        coverage_rates = {
-            "pension": {"active": pension_active, "inactive": total - pension_active, "rate": round((pension_active / total) * 100, 1) if total > 0 else 0},
-            "group_life": {"has": group_life, "no": total - group_life, "rate": round((group_life / total) * 100, 1) if total > 0 else 0},
-            "gci": {"has": gci, "no": total - gci, "rate": round((gci / total) * 100, 1) if total > 0 else 0},
-            "gip": {"has": gip, "no": total - gip, "rate": round((gip / total) * 100, 1) if total > 0 else 0},
-            "bupa": {"has": bupa, "no": total - bupa, "rate": round((bupa / total) * 100, 1) if total > 0 else 0}
-        }
-        
-        # 6. Gender Distribution
-        gender_counts = {}
-        for emp in employees:
-            gender = emp.get("legal_gender", "Not Specified") or "Not Specified"
-            gender_counts[gender] = gender_counts.get(gender, 0) + 1
-        
-        gender_distribution = [{"name": name, "count": count} for name, count in gender_counts.items()]
-        
-        # 7. UK Resident vs Non-Resident
-        uk_residents = sum(1 for emp in employees if emp.get("uk_resident") is True)
-        non_uk_residents = total - uk_residents
-        
-        residency = {
-            "uk_resident": uk_residents,
-            "non_uk_resident": non_uk_residents
-        }
-        
-        # 8. IO Upload Status
-        io_completed = sum(1 for emp in employees if emp.get("io_upload_status") is True)
-        io_pending = total - io_completed
-        
-        io_status = {
-            "completed": io_completed,
-            "pending": io_pending
-        }
-        
-        # 9. Geographic Distribution (postcode areas)
-        postcode_counts = {}
-        for emp in employees:
-            postcode = emp.get("postcode", "")
-            if postcode:
-                # Extract postcode area (first 1-2 letters)
-                area = ''.join(filter(str.isalpha, postcode.split()[0][:2])).upper() if postcode else "Unknown"
-                if area:
-                    postcode_counts[area] = postcode_counts.get(area, 0) + 1
-        
-        geographic_distribution = [
-            {"area": area, "count": count}
-            for area, count in sorted(postcode_counts.items(), key=lambda x: x[1], reverse=True)
-        ]
+        if results[0] is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No analytics snapshot on or before {target_date}"
+            )
         
-        return {
-            "employees_by_company": employees_by_company,
-            "nationality_breakdown": nationality_breakdown,
-            "age_distribution": age_distribution,
-            "pension_approaches": pension_approaches,
-            "coverage_rates": coverage_rates,
-            "gender_distribution": gender_distribution,
-            "residency": residency,
-            "io_status": io_status,
-            "geographic_distribution": geographic_distribution,
-            "total_employees": total
-        }
+        data = _analytics_response(results[0])
+        if compare_date:
+            data["comparison"] = _analytics_response(results[1]) if results[1] else None
+        return data
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to fetch analytics data: {str(e)}")
         raise HTTPException(
@@ -513,3 +492,53 @@ async def generate_snapshot(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate snapshot: {str(e)}"
         )
+
+
+@router.post("/snapshot/backfill")
+async def backfill_snapshots(
+    start_date: str = Query(..., description="First date to rebuild, YYYY-MM-DD"),
+    end_date: Optional[str] = Query(None, description="Last date to rebuild, YYYY-MM-DD (defaults to yesterday)"),
+    dry_run: bool = Query(False, description="Compute without writing"),
+    current_user: Dict = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Reconstruct daily snapshots for a past date range (admin/owner only)
+    
+    Replays employee creation dates, pension start dates and the employee
+    audit log backwards from today, then bulk-upserts one snapshot per day.
+    """
+    org_id = _require_organization(current_user)
+    if current_user.get("role") not in ["admin", "owner"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins and owners can backfill snapshots"
+        )
+    
+    try:
+        first_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        last_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else date.today() - timedelta(days=1)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Dates must be in YYYY-MM-DD format"
+        )
+    
+    try:
+        # Identical concurrent requests (e.g. a double click) share one run
+        result = await single_flight.do(
+            f"kpi_backfill:{org_id}:{first_date}:{last_date}:{dry_run}",
+            lambda: kpi_backfill_service.backfill(org_id, first_date, last_date, dry_run)
+        )
+        return {"success": True, "data": result}
+        
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Failed to backfill snapshots: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to backfill snapshots: {str(e)}"
+        )
@@ -20,7 +20,7 @@ async def get_nationalities() -> List[str]:
         List of nationality strings sorted alphabetically
     """
     try:
-        response = db_service.client.table("lookup_nationalities").select("value").order("value").execute()
+        response = await db_service.table("lookup_nationalities").select("value").order("value").execute()
         
         if not response.data:
             # Return fallback list if table is empty
@@ -46,7 +46,7 @@ async def check_nationalities_table() -> Dict[str, Any]:
         Status information about the lookup table
     """
     try:
-        response = db_service.client.table("lookup_nationalities").select("id", count="exact").execute()
+        response = await db_service.table("lookup_nationalities").select("id", count="exact").execute()
         
         return {
             "exists": True,
@@ -4,14 +4,16 @@ Public Form Routes - No authentication required, token-based access
 from fastapi import APIRouter, HTTPException, status, Request
 from typing import Dict, Any
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
 import logging
 import httpx
 import os
-import re
 
 from app.services.database_service import db_service
 from app.services.encryption_service import get_encryption_service
+from app.services.blind_index_service import blind_index_service
+from app.services.kpi_aggregate_service import kpi_aggregate_service
+from app.services.response_cache_service import response_cache
+from app.services.company_rules import company_employee_defaults, calculate_pension_start_date
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -123,7 +125,7 @@ async def get_form_by_token(token: str, request: Request) -> Dict[str, Any]:
     """
     try:
         # Get token record
-        token_response = db_service.client.table("form_tokens").select(
+        token_response = await db_service.table("form_tokens").select(
             "*, forms(*), companies(name, id)"
         ).eq("token", token).execute()
         
@@ -160,7 +162,7 @@ async def get_form_by_token(token: str, request: Request) -> Dict[str, Any]:
                 )
         
         # Increment access count
-        db_service.client.table("form_tokens").update({
+        await db_service.table("form_tokens").update({
             "access_count": token_record["access_count"] + 1,
             "last_accessed_at": datetime.utcnow().isoformat()
         }).eq("id", token_record["id"]).execute()
@@ -200,7 +202,7 @@ async def submit_form(token: str, submission_data: Dict[str, Any], request: Requ
     """
     try:
         # Get token and validate
-        token_response = db_service.client.table("form_tokens").select(
+        token_response = await db_service.table("form_tokens").select(
             "*, companies(*), forms(*)"
         ).eq("token", token).execute()
         
@@ -297,9 +299,10 @@ async def submit_form(token: str, submission_data: Dict[str, Any], request: Requ
             }
             
             # Create change_information record
-            change_response = db_service.client.table("change_information").insert(
+            change_response = await db_service.table("change_information").insert(
                 change_data
             ).execute()
+            response_cache.bump(token_record["organization_id"])
             
             if not change_response.data:
                 raise HTTPException(
@@ -313,7 +316,7 @@ async def submit_form(token: str, submission_data: Dict[str, Any], request: Requ
             recipient_email = None
             if form_creator_id:
                 try:
-                    user_response = db_service.client.rpc(
+                    user_response = await db_service.rpc(
                         'get_user_email_by_id',
                         {'user_id': form_creator_id}
                     ).execute()
@@ -355,7 +358,7 @@ async def submit_form(token: str, submission_data: Dict[str, Any], request: Requ
             logger.info(f"Encrypted submission_data for form {token_record['form_id']}")
             
             # Create submission record in form_submissions table
-            submission_response = db_service.client.table("form_submissions").insert({
+            submission_response = await db_service.table("form_submissions").insert({
                 "form_id": token_record["form_id"],
                 "form_version": form_version,
                 "submission_data": encrypted_submission_data,  # ENCRYPTED JSONB
@@ -374,12 +377,12 @@ async def submit_form(token: str, submission_data: Dict[str, Any], request: Requ
             token_analytics = token_record.get("analytics", {})
             token_analytics["last_completed_at"] = datetime.utcnow().isoformat()
             
-            db_service.client.table("form_tokens").update({
+            await db_service.table("form_tokens").update({
                 "analytics": token_analytics
             }).eq("id", token_record["id"]).execute()
             
             # Increment token submission count
-            db_service.client.table("form_tokens").update({
+            await db_service.table("form_tokens").update({
                 "submission_count": token_record["submission_count"] + 1,
                 "last_accessed_at": datetime.utcnow().isoformat()
             }).eq("id", token_record["id"]).execute()
@@ -447,19 +450,7 @@ async def submit_form(token: str, submission_data: Dict[str, Any], request: Requ
                 "pension_investment_approach": submission_data.get("pensionInvestmentApproach"),
                 
                 # Auto-filled from company data
-                "client_category": company.get("category_name"),
-                "is_pension_active": company.get("is_pension_active"),
-                "is_smart_pension": company.get("is_smart_pension"),
-                "send_pension_pack": company.get("send_pension_pack"),
-                "pension_provider_info": company.get("pension_provider_info"),
-                "scheme_ref": company.get("scheme_ref"),
-                "advice_type": company.get("advice_type"),
-                "selling_adviser_id": company.get("selling_adviser_id"),
-                "has_group_life": company.get("has_group_life"),
-                "has_gci": company.get("has_gci"),
-                "has_gip": company.get("has_gip"),
-                "has_bupa": company.get("has_bupa"),
-                "operational_notes": company.get("operational_notes"),
+                **company_employee_defaults(company),
                 
                 # Tracking
                 "submission_token": token,
@@ -479,41 +470,42 @@ async def submit_form(token: str, submission_data: Dict[str, Any], request: Requ
             
             if submission_data.get("employmentStartDate"):
                 try:
-                    employment_date = datetime.strptime(submission_data.get("employmentStartDate"), "%Y-%m-%d")
-                    # Get postponement_period and parse it (supports "1 Day" or "3 months")
-                    postponement_value = company.get("postponement_period")
-                    postponement_days = 0
-                    postponement_months = 0
-                    
-                    if postponement_value not in (None, "", "None"):
-                        postponement_str = str(postponement_value).lower()
-                        # Extract number from string
-                        match = re.search(r'\d+', postponement_str)
-                        if match:
-                            number = int(match.group())
-                            # Check if it's days or months
-                            if 'day' in postponement_str:
-                                postponement_days = number
-                            elif 'month' in postponement_str:
-                                postponement_months = number
-                    
                     # Add postponement period (handles varying month lengths: 28/29/30/31 days)
-                    pension_start = employment_date + relativedelta(months=postponement_months, days=postponement_days)
-                    employee_data["pension_start_date"] = pension_start.strftime("%Y-%m-%d")
-                    logger.info(f"✓ Calculated pension_start_date: {employee_data['pension_start_date']} (employment: {submission_data.get('employmentStartDate')}, postponement: '{postponement_value}' = {postponement_months}m + {postponement_days}d)")
+                    postponement_value = company.get("postponement_period")
+                    employee_data["pension_start_date"] = calculate_pension_start_date(
+                        submission_data.get("employmentStartDate"), postponement_value
+                    )
+                    logger.info(f"✓ Calculated pension_start_date: {employee_data['pension_start_date']} (employment: {submission_data.get('employmentStartDate')}, postponement: '{postponement_value}')")
                 except Exception as e:
                     logger.error(f"✗ Failed to calculate pension_start_date: {e}")
                     logger.exception(e)
             else:
                 logger.warning(f"✗ Cannot calculate pension_start_date - missing employmentStartDate")
             
+            # An NI number already on file is flagged for staff review rather than rejected,
+            # so a public form link cannot be used to probe who is an employee (needs BLIND_INDEX_KEY)
+            duplicate_of = None
+            if employee_data.get("ni_number"):
+                existing = await blind_index_service.find_existing(
+                    "ni_number", [employee_data["ni_number"]], token_record["organization_id"]
+                )
+                duplicate_of = next(iter(existing.values()), None)
+                if duplicate_of:
+                    logger.warning(
+                        f"Public submission for form {token_record['form_id']} matches the NI number "
+                        f"of existing employee {duplicate_of} - flagged for review"
+                    )
+            
+            # Blind indexes for NI/email/DOB search (from plaintext, before encryption)
+            employee_data = blind_index_service.index_employee(employee_data, token_record["organization_id"])
+            
             # **ENCRYPT PII BEFORE STORING IN DATABASE**
             encryption = get_encryption_service()
             employee_data = encryption.encrypt_employee_pii(employee_data)
             logger.info(f"Encrypted employee PII for public form submission (form: {token_record['form_id']})")
             
             # Create employee record
-            employee_response = db_service.client.table("employees").insert(
+            employee_response = await db_service.table("employees").insert(
                 employee_data
             ).execute()
             
@@ -525,6 +517,9 @@ async def submit_form(token: str, submission_data: Dict[str, Any], request: Requ
             
             employee = employee_response.data[0]
             
+            # Keep running KPI counters in sync
+            await kpi_aggregate_service.record_change(token_record["organization_id"], None, employee)
+            
             # Get recipient email (the user who created the form)
             # Email is stored in Supabase auth.users, accessible via admin API
             # Get recipient email (the user who created the form)
@@ -534,7 +529,7 @@ async def submit_form(token: str, submission_data: Dict[str, Any], request: Requ
                 try:
                     # Use RPC to get user email from auth.users via a database function
                     # Alternative: query directly if we had admin access
-                    user_response = db_service.client.rpc(
+                    user_response = await db_service.rpc(
                         'get_user_email_by_id',
                         {'user_id': form_creator_id}
                     ).execute()
@@ -558,11 +553,12 @@ async def submit_form(token: str, submission_data: Dict[str, Any], request: Requ
             logger.info(f"Encrypted new employee submission_data for form {token_record['form_id']}")
             
             # Create submission record
-            submission_response = db_service.client.table("form_submissions").insert({
+            submission_response = await db_service.table("form_submissions").insert({
                 "form_id": token_record["form_id"],
                 "form_version": form_version,
                 "submission_data": encrypted_submission_data,  # ENCRYPTED JSONB
-                "status": "completed",
+                "status": "reviewing" if duplicate_of else "completed",
+                "notes": f"Possible duplicate: NI number matches existing employee {duplicate_of}" if duplicate_of else None,
                 "submitted_via": "form_link",
                 "token_id": token_record["id"],
                 "organization_id": token_record["organization_id"],
@@ -578,12 +574,12 @@ async def submit_form(token: str, submission_data: Dict[str, Any], request: Requ
             token_analytics = token_record.get("analytics", {})
             token_analytics["last_completed_at"] = datetime.utcnow().isoformat()
             
-            db_service.client.table("form_tokens").update({
+            await db_service.table("form_tokens").update({
                 "analytics": token_analytics
             }).eq("id", token_record["id"]).execute()
             
             # Increment token submission count
-            db_service.client.table("form_tokens").update({
+            await db_service.table("form_tokens").update({
                 "submission_count": token_record["submission_count"] + 1,
                 "last_accessed_at": datetime.utcnow().isoformat()
             }).eq("id", token_record["id"]).execute()
@@ -601,7 +597,8 @@ async def submit_form(token: str, submission_data: Dict[str, Any], request: Requ
                     "company_id": company["id"],
                     "company_name": company["name"],  # Add company name for display
                     "token": token,
-                    "submission_method": "public_form"
+                    "submission_method": "public_form",
+                    "possible_duplicate_of": str(duplicate_of) if duplicate_of else None
                 },
                 "ip_address": client_ip,
                 "user_agent": user_agent
@@ -11,6 +11,8 @@ import logging
 
 from app.services.database_service import db_service
 from app.routes.auth import get_current_user
+from app.services.token_verification_service import token_verification_service
+from app.services.profile_cache import user_profile_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -90,7 +92,7 @@ async def create_invite_code(
             "is_used": False
         }
         
-        response = db_service.client.table("invite_codes").insert(invite_code_data).execute()
+        response = await db_service.table("invite_codes").insert(invite_code_data).execute()
         
         if not response.data:
             raise HTTPException(
@@ -128,7 +130,7 @@ async def list_invite_codes(
                 detail="Only admins and owners can view invite codes"
             )
         
-        response = db_service.client.table("invite_codes").select("*").eq(
+        response = await db_service.table("invite_codes").select("*").eq(
             "organization_id", organization_id
         ).order("created_at", desc=True).execute()
         
@@ -156,7 +158,7 @@ async def list_members(
         
         # Use the database function via RPC to get members with emails
         # This avoids needing Admin API access
-        response = db_service.client.rpc(
+        response = await db_service.rpc(
             'get_user_emails_for_organization',
             {'org_id': organization_id}
         ).execute()
@@ -214,7 +216,7 @@ async def update_member_role(
             )
         
         # Get target member
-        target_member_response = db_service.client.table("user_profiles").select("*").eq(
+        target_member_response = await db_service.table("user_profiles").select("*").eq(
             "id", member_id
         ).eq("organization_id", organization_id).execute()
         
@@ -226,7 +228,7 @@ async def update_member_role(
             )
 
             # Helpful diagnostics: check if the user exists but is not in this org
-            any_org_response = db_service.client.table("user_profiles").select(
+            any_org_response = await db_service.table("user_profiles").select(
                 "id, organization_id, role"
             ).eq("id", member_id).execute()
             if any_org_response.data:
@@ -284,7 +286,7 @@ async def update_member_role(
         # Rule: If promoting to Owner, demote current owner first
         if role_update.new_role == 'owner':
             # Find current owner
-            current_owner_response = db_service.client.table("user_profiles").select("*").eq(
+            current_owner_response = await db_service.table("user_profiles").select("*").eq(
                 "organization_id", organization_id
             ).eq("role", "owner").execute()
             
@@ -292,12 +294,14 @@ async def update_member_role(
                 current_owner = current_owner_response.data[0]
                 
                 # Demote current owner to admin
-                db_service.client.table("user_profiles").update({
+                await db_service.table("user_profiles").update({
                     "role": "admin"
                 }).eq("id", current_owner["id"]).execute()
+                token_verification_service.require_remote_check(current_owner["id"])
+                user_profile_cache.invalidate(current_owner["id"])
         
         # Update target member's role
-        update_response = db_service.client.table("user_profiles").update({
+        update_response = await db_service.table("user_profiles").update({
             "role": role_update.new_role
         }).eq("id", member_id).execute()
         
@@ -307,6 +311,10 @@ async def update_member_role(
                 detail="Failed to update member role"
             )
         
+        # Role changed - re-check the member's existing tokens with Supabase
+        token_verification_service.require_remote_check(member_id)
+        user_profile_cache.invalidate(member_id)
+        
         return update_response.data[0]
         
     except HTTPException:
@@ -352,7 +360,7 @@ async def delete_member(
             )
         
         # Get target member
-        target_member_response = db_service.client.table("user_profiles").select("*").eq(
+        target_member_response = await db_service.table("user_profiles").select("*").eq(
             "id", member_id
         ).eq("organization_id", organization_id).execute()
         
@@ -363,7 +371,7 @@ async def delete_member(
                 organization_id,
             )
 
-            any_org_response = db_service.client.table("user_profiles").select(
+            any_org_response = await db_service.table("user_profiles").select(
                 "id, organization_id, role"
             ).eq("id", member_id).execute()
             if any_org_response.data:
@@ -422,7 +430,7 @@ async def delete_member(
             )
         
         # Delete the user profile
-        db_service.client.table("user_profiles").delete().eq("id", member_id).execute()
+        await db_service.table("user_profiles").delete().eq("id", member_id).execute()
         
         # Also delete the auth.users entry (cascade should handle this, but we'll try)
         try:
@@ -431,6 +439,10 @@ async def delete_member(
             logger.warning(f"Failed to delete auth user: {str(e)}")
             # Continue anyway, cascade should handle it
         
+        # Deleted member's tokens must no longer verify locally
+        token_verification_service.require_remote_check(member_id)
+        user_profile_cache.invalidate(member_id)
+        
         return {
             "message": "Member deleted successfully"
         }
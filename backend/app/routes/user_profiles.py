@@ -8,6 +8,8 @@ import logging
 
 from app.services.database_service import db_service
 from app.routes.auth import get_current_user
+from app.services.token_verification_service import token_verification_service
+from app.services.profile_cache import user_profile_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -35,11 +37,9 @@ async def get_my_profile(
         scheme, token = authorization.split()
         
         # Get user profile using authenticated client (respects RLS)
-        from app.services.database_service import create_user_auth_client
+        user_client = db_service.as_user(token)
         
-        user_client = create_user_auth_client(token)
-        
-        profile_response = user_client.table("user_profiles").select("*").eq("id", user_id).execute()
+        profile_response = await user_client.table("user_profiles").select("*").eq("id", user_id).execute()
         profile = profile_response.data[0] if profile_response.data else None
         
         if not profile:
@@ -84,9 +84,7 @@ async def update_my_profile(
         scheme, token = authorization.split()
         
         # Create authenticated client (respects RLS)
-        from app.services.database_service import create_user_auth_client
-        
-        user_client = create_user_auth_client(token)
+        user_client = db_service.as_user(token)
         
         # Prepare update data (only include non-None fields)
         update_data = {
@@ -97,7 +95,7 @@ async def update_my_profile(
             update_data["job_title"] = profile_update.job_title
         
         # Update user profile using authenticated client
-        update_response = user_client.table("user_profiles").update(update_data).eq("id", user_id).execute()
+        update_response = await user_client.table("user_profiles").update(update_data).eq("id", user_id).execute()
         
         if not update_response.data:
             raise HTTPException(
@@ -105,8 +103,10 @@ async def update_my_profile(
                 detail="Failed to update user profile"
             )
         
+        user_profile_cache.invalidate(user_id)
+        
         # Get updated profile
-        profile_response = user_client.table("user_profiles").select("*").eq("id", user_id).execute()
+        profile_response = await user_client.table("user_profiles").select("*").eq("id", user_id).execute()
         updated_profile = profile_response.data[0] if profile_response.data else None
         
         if not updated_profile:
@@ -215,6 +215,9 @@ async def change_password(
                 detail=f"Failed to update password: {str(e)}"
             )
         
+        # Existing sessions must be re-checked with Supabase after a password change
+        token_verification_service.require_remote_check(user_id)
+        
         return {
             "message": "Password updated successfully"
         }
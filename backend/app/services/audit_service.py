@@ -2,14 +2,19 @@
 Audit Logging Service
 Tracks all database operations for compliance and security
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 import logging
 from app.services.database_service import db_service
 from app.services.encryption_service import get_encryption_service
+from app.services.blind_index_service import BLIND_INDEX_COLUMNS
 
 logger = logging.getLogger(__name__)
 
+# Employee columns never copied into audit entries: sensitive PII, and blind
+# indexes (equal digests would reveal equal values to anyone reading the log)
+AUDIT_EXCLUDED_FIELDS = frozenset({'ni_number', 'date_of_birth', 'pensionable_salary', *BLIND_INDEX_COLUMNS.values()})
+
 
 class AuditService:
     """Service for creating comprehensive audit logs"""
@@ -68,7 +73,7 @@ class AuditService:
                 "created_at": datetime.utcnow().isoformat()
             }
             
-            db_service.client.table("audit_logs").insert(log_entry).execute()
+            await db_service.table("audit_logs").insert(log_entry).execute()
             
             # Also log to application logs for monitoring
             logger.info(
@@ -87,7 +92,7 @@ class AuditService:
     async def log_employee_create(employee_id: str, employee_data: Dict[str, Any], user_id: str, organization_id: str, ip_address: Optional[str] = None):
         """Log employee creation"""
         # Remove sensitive PII from audit log
-        sanitized_data = {k: v for k, v in employee_data.items() if k not in ['ni_number', 'date_of_birth', 'pensionable_salary']}
+        sanitized_data = {k: v for k, v in employee_data.items() if k not in AUDIT_EXCLUDED_FIELDS}
         sanitized_data['_pii_fields_encrypted'] = True
         
         await AuditService.log_action(
@@ -100,12 +105,57 @@ class AuditService:
             ip_address=ip_address
         )
     
+    @staticmethod
+    async def log_employee_bulk_create(employees: List[Dict[str, Any]], user_id: str, organization_id: str, ip_address: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Log the creation of many employees (bulk import) with a single insert
+        
+        Writes one CREATE entry per employee, shaped like log_employee_create,
+        so per-record history (and the KPI backfill) sees imported employees.
+        """
+        if not employees:
+            return True
+        
+        try:
+            encryption = get_encryption_service()
+            created_at = datetime.utcnow().isoformat()
+            entries = []
+            for employee in employees:
+                sanitized_data = {k: v for k, v in employee.items() if k not in AUDIT_EXCLUDED_FIELDS}
+                sanitized_data['_pii_fields_encrypted'] = True
+                details = {"new_data": sanitized_data, "record_id": employee["id"]}
+                if metadata:
+                    details["metadata"] = metadata
+                entries.append({
+                    "action": "CREATE",
+                    "resource": "employees",
+                    "user_id": user_id,
+                    "organization_id": organization_id,
+                    "details": encryption.encrypt_json(details),
+                    "ip_address": ip_address,
+                    "created_at": created_at
+                })
+            
+            await db_service.table("audit_logs").insert(entries).execute()
+            
+            logger.info(
+                f"AUDIT: CREATE on employees x{len(entries)} by user {user_id[:8]}... "
+                f"(org: {organization_id[:8]}...)"
+            )
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to create bulk audit log: {str(e)}")
+            # Don't fail the main operation if audit logging fails
+            return False
+    
     @staticmethod
     async def log_employee_update(employee_id: str, old_data: Dict[str, Any], new_data: Dict[str, Any], user_id: str, organization_id: str, ip_address: Optional[str] = None):
         """Log employee update"""
         # Remove sensitive PII from audit log
-        sanitized_old = {k: v for k, v in old_data.items() if k not in ['ni_number', 'date_of_birth', 'pensionable_salary']}
-        sanitized_new = {k: v for k, v in new_data.items() if k not in ['ni_number', 'date_of_birth', 'pensionable_salary']}
+        sanitized_old = {k: v for k, v in old_data.items() if k not in AUDIT_EXCLUDED_FIELDS}
+        sanitized_new = {k: v for k, v in new_data.items() if k not in AUDIT_EXCLUDED_FIELDS}
         
         await AuditService.log_action(
             action="UPDATE",
@@ -122,7 +172,7 @@ class AuditService:
     async def log_employee_delete(employee_id: str, employee_data: Dict[str, Any], user_id: str, organization_id: str, ip_address: Optional[str] = None):
         """Log employee deletion"""
         # Remove sensitive PII from audit log
-        sanitized_data = {k: v for k, v in employee_data.items() if k not in ['ni_number', 'date_of_birth', 'pensionable_salary']}
+        sanitized_data = {k: v for k, v in employee_data.items() if k not in AUDIT_EXCLUDED_FIELDS}
         
         await AuditService.log_action(
             action="DELETE",
@@ -148,8 +198,12 @@ class AuditService:
         )
     
     @staticmethod
-    async def log_export(table_name: str, user_id: str, organization_id: str, filters: Dict[str, Any], record_count: int, ip_address: Optional[str] = None):
-        """Log data export"""
+    async def log_export(table_name: str, user_id: str, organization_id: str, filters: Dict[str, Any], record_count: int, ip_address: Optional[str] = None, completed: Optional[bool] = None):
+        """Log data export (completed=False when a streamed export stopped partway)"""
+        metadata = {"filters": filters, "record_count": record_count}
+        if completed is not None:
+            metadata["status"] = "completed" if completed else "partial"
+        
         await AuditService.log_action(
             action="EXPORT",
             table_name=table_name,
@@ -157,7 +211,7 @@ class AuditService:
             user_id=user_id,
             organization_id=organization_id,
             ip_address=ip_address,
-            metadata={"filters": filters, "record_count": record_count}
+            metadata=metadata
         )
     
     @staticmethod
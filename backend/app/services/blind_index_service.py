@@ -0,0 +1,209 @@
+"""
+Blind Index Service - Searchable keyed hashes for encrypted employee fields
+
+ni_number and date_of_birth are Fernet-encrypted with a random IV, so the
+database cannot match on them. Alongside each encrypted value we store an
+HMAC-SHA256 of the normalized plaintext (a "blind index"), keyed with
+BLIND_INDEX_KEY (separate from ENCRYPTION_KEY) and scoped to the
+organization, so exact-match lookups become indexed equality queries:
+
+    ni_number      -> ni_number_bidx   (uppercase, no spaces)
+    email_address  -> email_bidx       (trimmed, lowercase)
+    date_of_birth  -> dob_bidx         (YYYY-MM-DD)
+
+The index columns are internal: strip_index_columns() removes them from rows
+before they are returned to clients, since equal digests reveal equal values.
+
+Usage:
+    employee_data = blind_index_service.index_employee(employee_data, organization_id)
+    ni_bidx = blind_index_service.compute("ni_number", "AB 12 34 56 C", organization_id)
+    existing = await blind_index_service.find_existing("ni_number", [ni_number], organization_id)
+    employee = strip_index_columns(employee)
+"""
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Iterable
+import hashlib
+import hmac
+import logging
+import re
+
+from app.config import settings
+from app.services.database_service import db_service
+
+logger = logging.getLogger(__name__)
+
+# Source column -> blind index column
+BLIND_INDEX_COLUMNS = {
+    "ni_number": "ni_number_bidx",
+    "email_address": "email_bidx",
+    "date_of_birth": "dob_bidx",
+}
+
+# Date formats accepted for date_of_birth (forms send ISO, imports often UK style)
+DOB_INPUT_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d")
+
+NI_NUMBER_PATTERN = re.compile(r"^[A-Z]{2}\d{6}[A-D]?$")
+
+# Digests per find_existing() request (keeps the in.() filter URL short)
+DUPLICATE_LOOKUP_BATCH_SIZE = 100
+
+
+def strip_index_columns(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Remove the blind index columns from a row (in place) before returning it"""
+    for index_column in BLIND_INDEX_COLUMNS.values():
+        row.pop(index_column, None)
+    return row
+
+
+class BlindIndexService:
+    """Computes organization-scoped HMAC blind indexes for employee fields"""
+
+    def __init__(self):
+        key = settings.BLIND_INDEX_KEY
+        if key and key == settings.ENCRYPTION_KEY:
+            raise ValueError("BLIND_INDEX_KEY must be different from ENCRYPTION_KEY")
+
+        self._key = key.encode("utf-8") if key else None
+        if not self._key:
+            logger.warning("BLIND_INDEX_KEY not set - encrypted-field search is disabled")
+
+    @property
+    def enabled(self) -> bool:
+        return self._key is not None
+
+    @staticmethod
+    def normalize(field: str, value: Any) -> Optional[str]:
+        """
+        Normalize a plaintext value so equivalent inputs index identically
+
+        Returns:
+            Normalized string, or None if the value is empty/unparseable
+        """
+        if value is None:
+            return None
+
+        text = str(value).strip()
+        if not text:
+            return None
+
+        if field == "ni_number":
+            return re.sub(r"\s+", "", text).upper()
+
+        if field == "email_address":
+            return text.lower()
+
+        if field == "date_of_birth":
+            # Accept full timestamps as well as plain dates
+            text = text[:10]
+            for fmt in DOB_INPUT_FORMATS:
+                try:
+                    return datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+                except ValueError:
+                    continue
+            return None
+
+        return text
+
+    def compute(self, field: str, value: Any, organization_id: str) -> Optional[str]:
+        """
+        Compute the blind index for one plaintext value
+
+        Args:
+            field: Source column (ni_number, email_address, date_of_birth)
+            value: Plaintext value
+            organization_id: Owning organization (indexes never match across orgs)
+
+        Returns:
+            32-character hex digest, or None if disabled or the value is empty
+        """
+        if not self._key:
+            return None
+
+        normalized = self.normalize(field, value)
+        if normalized is None:
+            return None
+
+        message = f"{field}:{organization_id}:{normalized}".encode("utf-8")
+        return hmac.new(self._key, message, hashlib.sha256).hexdigest()[:32]
+
+    def index_employee(self, employee_data: Dict[str, Any], organization_id: str) -> Dict[str, Any]:
+        """
+        Add blind index columns for every indexed field present in a write payload
+
+        Must be called on the plaintext payload, before encrypt_employee_pii.
+        Fields absent from the payload (partial updates) leave their index untouched;
+        fields cleared to empty clear their index.
+        """
+        if not self._key:
+            return employee_data
+
+        indexed_data = employee_data.copy()
+        for field, index_column in BLIND_INDEX_COLUMNS.items():
+            if field in indexed_data:
+                indexed_data[index_column] = self.compute(field, indexed_data[field], organization_id)
+        return indexed_data
+
+    def search_conditions(self, query: str, organization_id: str) -> List[str]:
+        """
+        PostgREST or= conditions for exact matches of a free-text search term
+
+        The term is tried as an NI number, an email and a date of birth;
+        only the interpretations that normalize validly are returned.
+        """
+        if not self._key:
+            return []
+
+        conditions = []
+        ni_number = self.normalize("ni_number", query)
+        if ni_number and NI_NUMBER_PATTERN.match(ni_number):
+            conditions.append(f"ni_number_bidx.eq.{self.compute('ni_number', ni_number, organization_id)}")
+
+        if "@" in query:
+            conditions.append(f"email_bidx.eq.{self.compute('email_address', query, organization_id)}")
+
+        dob_bidx = self.compute("date_of_birth", query, organization_id)
+        if dob_bidx:
+            conditions.append(f"dob_bidx.eq.{dob_bidx}")
+
+        return conditions
+
+    async def find_existing(
+        self,
+        field: str,
+        values: Iterable[Any],
+        organization_id: str,
+        exclude_id: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """
+        Employees of the organization whose field equals one of the values
+
+        Matching is on the blind index, so it is exact after normalization
+        ("ab 12 34 56 c" finds "AB123456C"). Rows written before the index was
+        backfilled are not found.
+
+        Returns:
+            {blind index: existing employee id}; empty when indexing is disabled
+        """
+        if not self._key:
+            return {}
+
+        index_column = BLIND_INDEX_COLUMNS[field]
+        digests = sorted({
+            digest for digest in (self.compute(field, value, organization_id) for value in values) if digest
+        })
+
+        existing: Dict[str, str] = {}
+        for start in range(0, len(digests), DUPLICATE_LOOKUP_BATCH_SIZE):
+            query = db_service.table("employees").select(f"id, {index_column}").eq(
+                "organization_id", organization_id
+            ).in_(index_column, digests[start:start + DUPLICATE_LOOKUP_BATCH_SIZE])
+            if exclude_id:
+                query = query.neq("id", exclude_id)
+            response = await query.execute()
+            for row in response.data or []:
+                existing.setdefault(row[index_column], row["id"])
+        return existing
+
+
+# Singleton instance
+blind_index_service = BlindIndexService()
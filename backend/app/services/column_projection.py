@@ -0,0 +1,83 @@
+"""
+Column Projection - Build narrow PostgREST selects from a `fields` query param
+
+List/detail endpoints accept `?fields=id,first_name,surname,company_name` so the
+UI only pays for the columns it renders. Requested names are checked against a
+per-table allow-list and turned into a select string; PII decryption is skipped
+automatically for encrypted columns that were not selected.
+
+Usage:
+    select = build_select(fields, EMPLOYEE_FIELDS, required=("id",))
+    query = db_service.table("employees").select(select)
+"""
+from typing import Iterable, Optional, FrozenSet
+
+from fastapi import HTTPException, status
+
+# Virtual field resolved from the companies(name) embed
+COMPANY_NAME_FIELD = "company_name"
+COMPANY_NAME_EMBED = "companies(name)"
+
+
+def parse_fields(fields: Optional[str], allowed: FrozenSet[str]) -> Optional[list]:
+    """
+    Parse and validate a comma-separated `fields` parameter
+
+    Args:
+        fields: Raw query parameter value (None/empty means all columns)
+        allowed: Column names the caller may request
+
+    Returns:
+        Ordered, de-duplicated field names, or None for all columns
+
+    Raises:
+        HTTPException: 400 if any field is not in the allow-list
+    """
+    if not fields or not fields.strip():
+        return None
+
+    requested = []
+    for name in fields.split(","):
+        name = name.strip()
+        if name and name not in requested:
+            requested.append(name)
+
+    invalid = [name for name in requested if name not in allowed]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid fields: {', '.join(invalid)}"
+        )
+
+    return requested or None
+
+
+def build_select(
+    fields: Optional[str],
+    allowed: FrozenSet[str],
+    required: Iterable[str] = ("id",),
+) -> str:
+    """
+    Build a PostgREST select string for the requested fields
+
+    Args:
+        fields: Raw `fields` query parameter
+        allowed: Column names the caller may request (may include company_name)
+        required: Columns always selected (ids, sort keys)
+
+    Returns:
+        Select string, e.g. "id,first_name,surname,companies(name)"
+    """
+    requested = parse_fields(fields, allowed)
+    if requested is None:
+        return f"*, {COMPANY_NAME_EMBED}" if COMPANY_NAME_FIELD in allowed else "*"
+
+    columns = list(required)
+    for name in requested:
+        if name != COMPANY_NAME_FIELD and name not in columns:
+            columns.append(name)
+
+    if COMPANY_NAME_FIELD in requested:
+        columns.append(COMPANY_NAME_EMBED)
+
+    return ",".join(columns)
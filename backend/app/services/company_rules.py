@@ -0,0 +1,76 @@
+"""
+Company Rules - Employee fields derived from a company's Master Rulebook entry
+
+New employees inherit the company's pension/benefit settings, and their
+pension_start_date is the employment start date plus the company's
+postponement period ("1 Day", "3 months", ...). Shared by public form
+submissions and bulk imports so both apply the same rules.
+
+Usage:
+    employee_data.update(company_employee_defaults(company))
+    employee_data["pension_start_date"] = calculate_pension_start_date(
+        employee_data["employment_start_date"], company.get("postponement_period")
+    )
+"""
+from datetime import datetime
+from typing import Dict, Any, Tuple
+import re
+
+from dateutil.relativedelta import relativedelta
+
+
+def company_employee_defaults(company: Dict[str, Any]) -> Dict[str, Any]:
+    """Employee columns auto-filled from the company"""
+    return {
+        "client_category": company.get("category_name"),
+        "is_pension_active": company.get("is_pension_active"),
+        "is_smart_pension": company.get("is_smart_pension"),
+        "send_pension_pack": company.get("send_pension_pack"),
+        "pension_provider_info": company.get("pension_provider_info"),
+        "scheme_ref": company.get("scheme_ref"),
+        "advice_type": company.get("advice_type"),
+        "selling_adviser_id": company.get("selling_adviser_id"),
+        "has_group_life": company.get("has_group_life"),
+        "has_gci": company.get("has_gci"),
+        "has_gip": company.get("has_gip"),
+        "has_bupa": company.get("has_bupa"),
+        "operational_notes": company.get("operational_notes"),
+    }
+
+
+def parse_postponement_period(postponement_value: Any) -> Tuple[int, int]:
+    """
+    Parse a postponement period such as "1 Day" or "3 months"
+
+    Returns:
+        (months, days) - (0, 0) when empty or unrecognised
+    """
+    if postponement_value in (None, "", "None"):
+        return 0, 0
+
+    postponement_str = str(postponement_value).lower()
+    match = re.search(r'\d+', postponement_str)
+    if not match:
+        return 0, 0
+
+    number = int(match.group())
+    if 'day' in postponement_str:
+        return 0, number
+    if 'month' in postponement_str:
+        return number, 0
+    return 0, 0
+
+
+def calculate_pension_start_date(employment_start_date: str, postponement_value: Any) -> str:
+    """
+    Employment start date (YYYY-MM-DD) plus the postponement period, as YYYY-MM-DD
+
+    Month arithmetic handles varying month lengths (28/29/30/31 days).
+
+    Raises:
+        ValueError: If employment_start_date is not YYYY-MM-DD
+    """
+    employment_date = datetime.strptime(employment_start_date, "%Y-%m-%d")
+    postponement_months, postponement_days = parse_postponement_period(postponement_value)
+    pension_start = employment_date + relativedelta(months=postponement_months, days=postponement_days)
+    return pension_start.strftime("%Y-%m-%d")
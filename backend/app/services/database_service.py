@@ -2,31 +2,120 @@
 Supabase Database Service
 """
 from supabase import create_client, Client
+from postgrest import AsyncPostgrestClient, AsyncRequestBuilder, AsyncRPCFilterRequestBuilder
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
 from typing import Optional, Dict, Any, List
 from uuid import UUID
 import logging
+import httpx
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Connection pool for the async PostgREST client (shared by all requests in a worker)
+POSTGREST_TIMEOUT_SECONDS = 30.0
+POSTGREST_MAX_CONNECTIONS = 50
+POSTGREST_MAX_KEEPALIVE_CONNECTIONS = 20
+POSTGREST_KEEPALIVE_EXPIRY_SECONDS = 30.0
+
 
 class SupabaseService:
     """Supabase database operations"""
     
     def __init__(self):
         """Initialize Supabase client"""
+        # Sync client - only used for the Auth Admin API (auth.admin.*)
         self.client: Client = create_client(
             settings.SUPABASE_URL,
             settings.SUPABASE_KEY  # service_role key for backend
         )
+        # Async PostgREST client - created lazily on first query
+        self._rest: Optional[AsyncPostgrestClient] = None
+    
+    @property
+    def rest(self) -> AsyncPostgrestClient:
+        """
+        Async PostgREST client on a pooled keep-alive httpx.AsyncClient.
+        
+        Queries built from it do not block the event loop, so concurrent
+        requests overlap their database I/O.
+        """
+        if self._rest is None:
+            http_client = httpx.AsyncClient(
+                timeout=POSTGREST_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=POSTGREST_MAX_CONNECTIONS,
+                    max_keepalive_connections=POSTGREST_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=POSTGREST_KEEPALIVE_EXPIRY_SECONDS,
+                ),
+                follow_redirects=True,
+            )
+            self._rest = AsyncPostgrestClient(
+                f"{settings.SUPABASE_URL}/rest/v1",
+                headers={
+                    **DEFAULT_POSTGREST_CLIENT_HEADERS,
+                    "apikey": settings.SUPABASE_KEY,
+                    "Authorization": f"Bearer {settings.SUPABASE_KEY}",
+                },
+                http_client=http_client,
+            )
+        return self._rest
+    
+    def table(self, table_name: str) -> AsyncRequestBuilder:
+        """
+        Start an awaitable query against a table (service_role, bypasses RLS)
+        
+        Usage:
+            response = await db_service.table("employees").select("*").eq("id", employee_id).execute()
+        """
+        return self.rest.from_(table_name)
+    
+    def rpc(self, function_name: str, params: Optional[Dict[str, Any]] = None) -> AsyncRPCFilterRequestBuilder:
+        """
+        Start an awaitable call to a database function
+        
+        Usage:
+            response = await db_service.rpc("get_user_email_by_id", {"user_id": user_id}).execute()
+        """
+        return self.rest.rpc(function_name, params or {})
+    
+    def as_user(self, access_token: str) -> AsyncPostgrestClient:
+        """
+        PostgREST access as the user who owns access_token (respects RLS)
+        
+        Stateless: the anon key and the user's JWT are per-request headers on
+        the shared pooled transport, so no client is built, no session is set
+        (no extra Supabase Auth round trip) and no token can leak between
+        requests.
+        
+        Usage:
+            response = await db_service.as_user(token).table("user_profiles").select("*").eq("id", user_id).execute()
+        
+        ⚠️ Do not call aclose() on the returned client - it shares the pool.
+        """
+        return AsyncPostgrestClient(
+            f"{settings.SUPABASE_URL}/rest/v1",
+            headers={
+                **DEFAULT_POSTGREST_CLIENT_HEADERS,
+                "apikey": settings.SUPABASE_ANON_KEY,
+                "Authorization": f"Bearer {access_token}",
+            },
+            http_client=self.rest.session,
+        )
+    
+    async def aclose(self) -> None:
+        """Close pooled HTTP connections (called on application shutdown)"""
+        if self._rest is not None:
+            await self.rest.aclose()
+            self._rest = None
     
     # ==================== Organizations ====================
     
     async def create_organization(self, name: str) -> Dict[str, Any]:
         """Create a new organization"""
         try:
-            response = self.client.table("organizations").insert({
+            response = await self.table("organizations").insert({
                 "name": name
             }).execute()
             return response.data[0] if response.data else None
@@ -37,7 +126,7 @@ class SupabaseService:
     async def get_organization(self, org_id: UUID) -> Optional[Dict[str, Any]]:
         """Get organization by ID"""
         try:
-            response = self.client.table("organizations").select("*").eq("id", str(org_id)).execute()
+            response = await self.table("organizations").select("*").eq("id", str(org_id)).execute()
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Error getting organization: {e}")
@@ -49,7 +138,7 @@ class SupabaseService:
         """Create a new user profile (linked to auth.users)"""
         try:
             profile_data['id'] = user_id  # Link to auth.users.id
-            response = self.client.table("user_profiles").insert(profile_data).execute()
+            response = await self.table("user_profiles").insert(profile_data).execute()
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Error creating user profile: {e}")
@@ -58,7 +147,7 @@ class SupabaseService:
     async def get_user_profile_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user profile by auth user ID"""
         try:
-            response = self.client.table("user_profiles").select("*").eq("id", user_id).execute()
+            response = await self.table("user_profiles").select("*").eq("id", user_id).execute()
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Error getting user profile: {e}")
@@ -87,7 +176,7 @@ class SupabaseService:
     async def update_user_profile(self, user_id: str, profile_data: Dict[str, Any]) -> bool:
         """Update user profile"""
         try:
-            self.client.table("user_profiles").update(profile_data).eq("id", user_id).execute()
+            await self.table("user_profiles").update(profile_data).eq("id", user_id).execute()
             return True
         except Exception as e:
             logger.error(f"Error updating user profile: {e}")
@@ -98,7 +187,7 @@ class SupabaseService:
     async def get_invite_code(self, code: str) -> Optional[Dict[str, Any]]:
         """Get invite code by code string"""
         try:
-            response = self.client.table("invite_codes").select("*").eq("code", code.upper()).execute()
+            response = await self.table("invite_codes").select("*").eq("code", code.upper()).execute()
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Error getting invite code: {e}")
@@ -107,7 +196,7 @@ class SupabaseService:
     async def mark_invite_code_used(self, code_id: UUID, user_id: str) -> bool:
         """Mark invite code as used"""
         try:
-            self.client.table("invite_codes").update({
+            await self.table("invite_codes").update({
                 "is_used": True,
                 "used_by": user_id,  # Now references auth.users.id
                 "used_at": "now()"
@@ -122,7 +211,7 @@ class SupabaseService:
     async def create_audit_log(self, log_data: Dict[str, Any]) -> bool:
         """Create audit log entry"""
         try:
-            self.client.table("audit_logs").insert(log_data).execute()
+            await self.table("audit_logs").insert(log_data).execute()
             return True
         except Exception as e:
             logger.error(f"Error creating audit log: {e}")
@@ -133,7 +222,10 @@ def create_user_auth_client(access_token: str) -> Client:
     """
     Create a fresh Supabase client for user authentication operations.
     
-    Use this for ANY operation that involves user JWT tokens:
+    For table queries as the user, use db_service.as_user(token) instead -
+    this builds a full client and set_session() costs a Supabase Auth round trip.
+    
+    Use this for ANY auth operation that involves user JWT tokens:
     - .auth.get_user(token)
     - .auth.set_session(token, refresh_token)
     - .auth.refresh_session(refresh_token)
@@ -171,6 +263,8 @@ def create_anon_auth_client() -> Client:
 
 
 # ⚠️ WARNING: Singleton instance for database operations ONLY
+# Queries go through the async API: await db_service.table(...)...execute()
+# db_service.client is kept for the Auth Admin API (auth.admin.*) only.
 # NEVER use db_service.client.auth methods with user JWT tokens!
 # Use create_user_auth_client() or create_anon_auth_client() instead.
 # 
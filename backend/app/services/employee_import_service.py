@@ -0,0 +1,465 @@
+"""
+Employee Import Service - Bulk create employees from the SW New Member upload template
+
+Reads the template (CSV, or the "Input" sheet of the .xlsx workbook) one row at
+a time, skipping blank and footnote rows, and validates every row against the
+template's accepted values before anything is written. NI numbers must be
+unique within the file and, when BLIND_INDEX_KEY is set, within the
+organization. Valid files are then written in chunks:
+
+- company rulebook auto-fill and pension_start_date per row (company_rules)
+- blind indexes and PII encryption per chunk (encrypt_many)
+- one employees insert per IMPORT_CHUNK_SIZE rows
+- one KPI delta and one audit insert for the whole import
+
+Validation is all-or-nothing: a file with any invalid row imports nothing and
+the report lists the problems by spreadsheet row number. The notification for
+the imported employees is sent by the route (one Edge Function call).
+
+Usage:
+    report, employees = await employee_import_service.import_file(
+        upload.file, "xlsx", company, current_user, dry_run=False
+    )
+"""
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional, Tuple, Iterator, BinaryIO
+import asyncio
+import csv
+import io
+import logging
+import re
+
+from app.config import settings
+from app.services.database_service import db_service
+from app.services.encryption_service import get_encryption_service
+from app.services.blind_index_service import blind_index_service, DOB_INPUT_FORMATS, NI_NUMBER_PATTERN
+from app.services.kpi_aggregate_service import kpi_aggregate_service
+from app.services.audit_service import audit_service
+from app.services.company_rules import company_employee_defaults, calculate_pension_start_date
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("csv", "xlsx")
+IMPORT_XLSX_SHEET = "Input"
+IMPORT_MAX_ERRORS = 200  # Errors listed in the report (all are counted)
+
+# (template header, employees column, required) - other template columns
+# (retirement age, section number, postcode validation) have no employee column
+TEMPLATE_COLUMNS = (
+    ("Title", "title", True),
+    ("Forename", "first_name", True),
+    ("Surname", "surname", True),
+    ("NI Number", "ni_number", True),
+    ("Date of Birth", "date_of_birth", True),
+    ("Sex", "legal_gender", True),
+    ("Marital Status", "marital_status", True),
+    ("Address 1", "address_line_1", True),
+    ("Address 2", "address_line_2", False),
+    ("Address 3", "address_line_3", False),
+    ("Address 4", "address_line_4", False),
+    ("Postcode", "postcode", True),
+    ("UK Resident", "uk_resident", True),
+    ("Nationality", "nationality", False),
+    ("Salary", "pensionable_salary", True),
+    ("Employment Start Date", "employment_start_date", True),
+    ("Pension Investment Approach", "pension_investment_approach", False),
+)
+TEMPLATE_HEADERS = {field: header for header, field, _ in TEMPLATE_COLUMNS}
+
+# Accepted values sheet of the template (nationalities come from lookup_nationalities)
+ACCEPTED_VALUES = {
+    "title": (
+        "Mr", "Mrs", "Miss", "Ms", "Dr", "Mx", "Professor", "Lady", "Sir",
+        "Dame", "Lord", "Rabbi", "Reverend", "Other",
+    ),
+    "legal_gender": ("Male", "Female"),
+    "marital_status": ("Single", "Married", "Divorced", "Separated", "Widowed"),
+    "pension_investment_approach": tuple(
+        f"{prefix}{risk} Targeting {target}"
+        for prefix in ("", "Premier ")
+        for risk in ("Adventurous", "Balanced", "Cautious")
+        for target in ("Annuity", "Encashment", "Flex Access")
+    ),
+}
+UK_RESIDENT_VALUES = {"yes": True, "no": False}
+
+UK_POSTCODE_PATTERN = re.compile(r"^[A-Z]{1,2}\d[A-Z\d]?\s*\d[A-Z]{2}$")
+# Footnote rows under the data in the template ("Note 1", "Note 2" in the Title column)
+TEMPLATE_NOTE_PATTERN = re.compile(r"^note\s*\d+$", re.IGNORECASE)
+
+
+def import_format(file_name: Optional[str]) -> str:
+    """
+    Import format from the uploaded file name
+
+    Raises:
+        ValueError: If the file is not .csv or .xlsx
+    """
+    extension = (file_name or "").rsplit(".", 1)[-1].lower()
+    if extension not in IMPORT_FORMATS:
+        raise ValueError("Upload the template as a .csv or .xlsx file")
+    return extension
+
+
+def _normalize_header(value: Any) -> str:
+    """Header as compared with the template (case and spacing ignored)"""
+    return " ".join(str(value or "").split()).casefold()
+
+
+def _canonical(values: Any) -> Dict[str, str]:
+    return {value.casefold(): value for value in values}
+
+
+def iter_template_rows(file: BinaryIO, fmt: str) -> Iterator[Tuple[int, tuple]]:
+    """
+    Yield (spreadsheet row number, cell values) for every row, header included
+
+    CSV is decoded incrementally and XLSX is read with a read-only workbook,
+    so memory does not grow with the file.
+    """
+    if fmt == "xlsx":
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            sheet = workbook[IMPORT_XLSX_SHEET] if IMPORT_XLSX_SHEET in workbook.sheetnames else workbook.active
+            for row_number, values in enumerate(sheet.iter_rows(values_only=True), start=1):
+                yield row_number, values
+        finally:
+            workbook.close()
+        return
+
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        for row_number, values in enumerate(csv.reader(text), start=1):
+            yield row_number, tuple(values)
+    finally:
+        # Leave the upload's file open for its owner
+        text.detach()
+
+
+class EmployeeImportService:
+    """Service for validating and bulk inserting template rows"""
+
+    def __init__(self, chunk_size: int = 500, max_rows: int = 10000):
+        self.db = db_service
+        self.chunk_size = max(1, chunk_size)
+        self.max_rows = max_rows
+        self._accepted = {field: _canonical(values) for field, values in ACCEPTED_VALUES.items()}
+
+    async def get_nationalities(self) -> Optional[Dict[str, str]]:
+        """Accepted nationalities (casefolded -> stored spelling), or None if unavailable"""
+        try:
+            response = await self.db.table("lookup_nationalities").select("value").execute()
+            if response.data:
+                return _canonical(row["value"] for row in response.data)
+            logger.warning("lookup_nationalities table is empty, nationality not validated")
+        except Exception as e:
+            logger.warning(f"Failed to load nationalities, nationality not validated: {str(e)}")
+        return None
+
+    def parse(
+        self,
+        file: BinaryIO,
+        fmt: str,
+        nationalities: Optional[Dict[str, str]] = None,
+    ) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Dict[str, Any]], int, int]:
+        """
+        Validate every row of the template
+
+        Blank rows are skipped. Returns ((row number, employee fields) of valid
+        rows, errors, error count, row count); errors are {"row", "column", "message"}, at most
+        IMPORT_MAX_ERRORS.
+
+        Raises:
+            ValueError: If the file cannot be read, the header does not match
+                the template or there are more than max_rows rows
+        """
+        rows = iter_template_rows(file, fmt)
+        try:
+            columns = self._header_columns(next(rows, (0, ()))[1])
+            valid: List[Tuple[int, Dict[str, Any]]] = []
+            errors: List[Dict[str, Any]] = []
+            error_count = 0
+            seen_ni_numbers: Dict[str, int] = {}
+            row_count = 0
+
+            for row_number, values in rows:
+                fields = {
+                    field: values[index] if index < len(values) else None
+                    for field, index in columns.items()
+                }
+                if all(_is_blank(value) for value in fields.values()) or _is_note(fields):
+                    continue
+
+                row_count += 1
+                if row_count > self.max_rows:
+                    raise ValueError(f"Too many rows: at most {self.max_rows} employees per import")
+
+                employee, row_errors = self._validate_row(fields, nationalities)
+                ni_number = employee.get("ni_number")
+                if ni_number:
+                    if ni_number in seen_ni_numbers:
+                        row_errors.append(("ni_number", f"Duplicate of row {seen_ni_numbers[ni_number]}"))
+                    else:
+                        seen_ni_numbers[ni_number] = row_number
+
+                if row_errors:
+                    error_count += len(row_errors)
+                    errors.extend(
+                        {"row": row_number, "column": TEMPLATE_HEADERS[field], "message": message}
+                        for field, message in row_errors
+                    )
+                    del errors[IMPORT_MAX_ERRORS:]
+                else:
+                    valid.append((row_number, employee))
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Could not read the {fmt.upper()} file: {str(e)}")
+        finally:
+            rows.close()
+
+        return valid, errors, error_count, row_count
+
+    async def import_file(
+        self,
+        file: BinaryIO,
+        fmt: str,
+        company: Dict[str, Any],
+        user: Dict[str, Any],
+        dry_run: bool = False,
+        file_name: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Validate the template and, if every row is valid, create the employees
+
+        Returns:
+            (report, created employee rows as stored)
+
+        Raises:
+            ValueError: If the file cannot be parsed (see parse)
+        """
+        organization_id = user["organization_id"]
+        nationalities = await self.get_nationalities()
+
+        # openpyxl/csv parsing is CPU-bound; keep the event loop free
+        loop = asyncio.get_running_loop()
+        valid_rows, errors, error_count, row_count = await loop.run_in_executor(None, self.parse, file, fmt, nationalities)
+
+        # NI numbers already on file (exact match through the blind index)
+        existing = await blind_index_service.find_existing(
+            "ni_number", [employee["ni_number"] for _, employee in valid_rows], organization_id
+        )
+        valid: List[Dict[str, Any]] = []
+        for row_number, employee in valid_rows:
+            if blind_index_service.compute("ni_number", employee["ni_number"], organization_id) in existing:
+                error_count += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append({
+                        "row": row_number,
+                        "column": TEMPLATE_HEADERS["ni_number"],
+                        "message": "An employee with this NI number already exists"
+                    })
+            else:
+                valid.append(employee)
+
+        report: Dict[str, Any] = {
+            "file_name": file_name,
+            "company_id": company["id"],
+            "company_name": company.get("name"),
+            "row_count": row_count,
+            "valid_count": len(valid),
+            "imported_count": 0,
+            "error_count": error_count,
+            "errors": errors,
+            "dry_run": dry_run,
+        }
+        if dry_run or error_count or not valid:
+            return report, []
+
+        for employee in valid:
+            employee.update(company_employee_defaults(company))
+            employee.update({
+                "organization_id": organization_id,
+                "company_id": company["id"],
+                "created_by_user_id": user["id"],
+                "service_status": "Active",
+                "io_upload_status": False,
+                "submitted_via": "import",
+                "pension_start_date": calculate_pension_start_date(
+                    employee["employment_start_date"], company.get("postponement_period")
+                ),
+            })
+
+        encryption = get_encryption_service()
+        created: List[Dict[str, Any]] = []
+        try:
+            for start in range(0, len(valid), self.chunk_size):
+                chunk = [
+                    blind_index_service.index_employee(employee, organization_id)
+                    for employee in valid[start:start + self.chunk_size]
+                ]
+                chunk = await encryption.encrypt_many(chunk)
+                response = await self.db.table("employees").insert(chunk).execute()
+                created.extend(response.data or [])
+        except Exception as e:
+            logger.error(f"Employee import stopped after {len(created)} rows (org: {organization_id}): {str(e)}")
+            report["error"] = f"Import stopped after {len(created)} of {len(valid)} employees: {str(e)}"
+        finally:
+            report["imported_count"] = len(created)
+            if created:
+                # One KPI delta and one audit insert for everything written
+                await kpi_aggregate_service.record_changes(organization_id, [(None, row) for row in created])
+                await audit_service.log_employee_bulk_create(
+                    created,
+                    user_id=user["id"],
+                    organization_id=organization_id,
+                    metadata={"source": "template_import", "file_name": file_name, "company_id": company["id"]}
+                )
+
+        logger.info(f"Imported {len(created)} employees for company {company['id']} (org: {organization_id})")
+        return report, created
+
+    def _header_columns(self, header: tuple) -> Dict[str, int]:
+        """Map employee columns to their index in the header row"""
+        positions = {_normalize_header(value): index for index, value in enumerate(header) if not _is_blank(value)}
+        columns = {}
+        missing = []
+        for template_header, field, required in TEMPLATE_COLUMNS:
+            index = positions.get(_normalize_header(template_header))
+            if index is not None:
+                columns[field] = index
+            elif required:
+                missing.append(template_header)
+
+        if missing:
+            raise ValueError(
+                "The file does not match the SW New Member upload template, missing columns: "
+                + ", ".join(missing)
+            )
+        return columns
+
+    def _validate_row(
+        self,
+        fields: Dict[str, Any],
+        nationalities: Optional[Dict[str, str]],
+    ) -> Tuple[Dict[str, Any], List[Tuple[str, str]]]:
+        """Convert one row to employee fields; returns (employee, [(field, message)])"""
+        employee: Dict[str, Any] = {}
+        errors: List[Tuple[str, str]] = []
+
+        for _, field, required in TEMPLATE_COLUMNS:
+            value = fields.get(field)
+            if _is_blank(value):
+                if required:
+                    errors.append((field, "Required"))
+                employee[field] = None
+                continue
+
+            try:
+                employee[field] = self._convert(field, value, nationalities)
+            except ValueError as e:
+                errors.append((field, str(e)))
+
+        return employee, errors
+
+    def _convert(self, field: str, value: Any, nationalities: Optional[Dict[str, str]]) -> Any:
+        """Validate and normalize one cell (raises ValueError with the reason)"""
+        if field in ("date_of_birth", "employment_start_date"):
+            parsed = _parse_date(value)
+            if field == "date_of_birth" and parsed >= date.today():
+                raise ValueError("Date of birth must be in the past")
+            return parsed.isoformat()
+
+        if field == "pensionable_salary":
+            return _parse_salary(value)
+
+        text = " ".join(_cell_text(value).split())
+
+        if field in self._accepted:
+            accepted = self._accepted[field].get(text.casefold())
+            if accepted is None:
+                raise ValueError(f"'{text}' is not an accepted value")
+            return accepted
+
+        if field == "uk_resident":
+            if text.casefold() not in UK_RESIDENT_VALUES:
+                raise ValueError("Must be Yes or No")
+            return UK_RESIDENT_VALUES[text.casefold()]
+
+        if field == "nationality" and nationalities is not None:
+            accepted = nationalities.get(text.casefold())
+            if accepted is None:
+                raise ValueError(f"'{text}' is not an accepted nationality")
+            return accepted
+
+        if field == "ni_number":
+            ni_number = re.sub(r"\s+", "", text).upper()
+            if not NI_NUMBER_PATTERN.match(ni_number):
+                raise ValueError("Not a valid NI number (e.g. QQ123456C)")
+            return ni_number
+
+        if field == "postcode":
+            postcode = text.upper()
+            if not UK_POSTCODE_PATTERN.match(postcode):
+                raise ValueError("Not a valid UK postcode")
+            return postcode
+
+        return text
+
+
+def _is_blank(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _is_note(fields: Dict[str, Any]) -> bool:
+    """Template footnote row rather than an employee"""
+    title = fields.get("title")
+    return isinstance(title, str) and bool(TEMPLATE_NOTE_PATTERN.match(title.strip()))
+
+
+def _cell_text(value: Any) -> str:
+    """Cell as text (whole-number floats from XLSX without the trailing .0)"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _parse_date(value: Any) -> date:
+    """Date cell (XLSX date, ISO or UK style text) as a date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+
+    text = _cell_text(value)[:10]
+    for fmt in DOB_INPUT_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError("Not a valid date (use DD/MM/YYYY)")
+
+
+def _parse_salary(value: Any) -> Any:
+    """Salary cell ("£25,000.00", 25000) as a non-negative number"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        amount = float(value)
+    else:
+        try:
+            amount = float(re.sub(r"[£,\s]", "", str(value)))
+        except ValueError:
+            raise ValueError("Not a valid amount")
+
+    if amount < 0:
+        raise ValueError("Must not be negative")
+    amount = round(amount, 2)
+    return int(amount) if amount.is_integer() else amount
+
+
+# Singleton instance
+employee_import_service = EmployeeImportService(
+    chunk_size=settings.EMPLOYEE_IMPORT_CHUNK_SIZE,
+    max_rows=settings.EMPLOYEE_IMPORT_MAX_ROWS,
+)
@@ -12,18 +12,155 @@ Usage:
     encryption = EncryptionService()
     encrypted = encryption.encrypt("sensitive data")
     decrypted = encryption.decrypt(encrypted)
+
+    # Lists of rows - chunked on a worker pool, off the event loop
+    employees = await encryption.decrypt_many(rows)
+    encrypted = await encryption.encrypt_many(rows)
+
+Ciphertext formats:
+    v2 (written by encrypt):  "enc:v2:" + Fernet token (already url-safe base64)
+    v1 (legacy, read only):   base64(Fernet token) - always starts with "Z0FBQUFB"
+    Anything else is treated as plaintext. Detection is a prefix check; use
+    is_encrypted() instead of sniffing values. scripts/migrate_ciphertext_v2.py
+    rewrites stored v1 values to v2.
+
+Decrypted-value cache:
+    decrypt() keeps a bounded LRU of {digest(ciphertext): plaintext} so repeated
+    dashboard/KPI/export reads skip the HMAC + AES work. Limits come from
+    DECRYPT_CACHE_MAX_ENTRIES / DECRYPT_CACHE_MAX_BYTES / DECRYPT_CACHE_TTL_SECONDS
+    (set DECRYPT_CACHE_MAX_ENTRIES=0 to disable). encrypt() never populates it and
+    rotate_key() empties it.
 """
 
 from cryptography.fernet import Fernet, InvalidToken
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
 import hashlib
 import base64
+import binascii
+import multiprocessing
 import os
 import logging
-from typing import Optional, Any
+from collections import OrderedDict
+from typing import Optional, Any, List, Sequence, Dict, Tuple
 import json
+import threading
+import time
+
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Encrypted columns on the employees table
+EMPLOYEE_PII_FIELDS = ("ni_number", "pensionable_salary", "date_of_birth")
+
+# decrypt_many() tuning
+DECRYPT_INLINE_MAX_ROWS = 50  # Below this, decrypt on the calling thread
+DECRYPT_CHUNK_SIZE = 1000  # Rows per worker task
+DECRYPT_PROCESS_MIN_ROWS = 20000  # From this size, use the process pool (needs >1 CPU)
+DECRYPT_MAX_PROCESSES = min(4, os.cpu_count() or 1)
+
+# Ciphertext format prefixes
+CIPHERTEXT_V2_PREFIX = "enc:v2:"
+# base64("gAAAAA") - v1 values are base64 of a Fernet token, which starts with
+# the 0x80 version byte and a 64-bit timestamp whose high bytes are zero
+CIPHERTEXT_V1_PREFIX = "Z0FBQUFB"
+
+# Decrypted-value cache limits (per process)
+DECRYPT_CACHE_MAX_ENTRIES = settings.DECRYPT_CACHE_MAX_ENTRIES
+DECRYPT_CACHE_MAX_BYTES = settings.DECRYPT_CACHE_MAX_BYTES
+DECRYPT_CACHE_TTL_SECONDS = settings.DECRYPT_CACHE_TTL_SECONDS
+# Approximate per-entry cost on top of the plaintext (digest, tuple, dict slot)
+_DECRYPT_CACHE_ENTRY_OVERHEAD_BYTES = 160
+
+
+class DecryptCache:
+    """
+    Thread-safe LRU of decrypted values keyed by a ciphertext digest
+    
+    Bounded by entry count, approximate byte size and TTL. Only successful
+    decryptions are stored, so plaintext passthrough and failures never are.
+    """
+    
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = max_entries > 0 and max_bytes > 0 and ttl_seconds > 0
+        
+        # { digest: (expires_at, plaintext, cost) } in least-recently-used order
+        self._entries: "OrderedDict[bytes, Tuple[float, str, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def digest(ciphertext: str) -> bytes:
+        """Cache key - the ciphertext itself is never kept"""
+        return hashlib.blake2b(ciphertext.encode('utf-8'), digest_size=16).digest()
+    
+    def get(self, key: bytes) -> Optional[str]:
+        """Return the cached plaintext, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            expires_at, plaintext, cost = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= cost
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return plaintext
+    
+    def set(self, key: bytes, plaintext: str) -> None:
+        """Cache a plaintext, evicting least recently used entries over budget"""
+        cost = len(plaintext) + _DECRYPT_CACHE_ENTRY_OVERHEAD_BYTES
+        if cost > self.max_bytes:
+            return
+        
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, plaintext, cost)
+            self._bytes += cost
+            
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_cost) = self._entries.popitem(last=False)
+                self._bytes -= evicted_cost
+                self.evictions += 1
+    
+    def clear(self) -> None:
+        """Drop every cached plaintext"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters for logging/monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
 
 class EncryptionService:
     """
@@ -31,9 +168,9 @@ class EncryptionService:
     Uses Fernet (AES-256-CBC + HMAC authentication)
     """
     
-    def __init__(self):
-        """Initialize with encryption key from environment"""
-        encryption_key = os.getenv("ENCRYPTION_KEY")
+    def __init__(self, encryption_key: Optional[str] = None):
+        """Initialize with encryption key (defaults to ENCRYPTION_KEY from environment)"""
+        encryption_key = encryption_key or os.getenv("ENCRYPTION_KEY")
         
         if not encryption_key:
             logger.error("ENCRYPTION_KEY not found in environment variables!")
@@ -45,20 +182,48 @@ class EncryptionService:
         try:
             # Fernet expects bytes
             self.cipher = Fernet(encryption_key.encode())
+            self._encryption_key = encryption_key
             logger.info("Encryption service initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize encryption: {e}")
             raise ValueError(f"Invalid ENCRYPTION_KEY format: {e}")
+        
+        self.decrypt_cache = DecryptCache(
+            max_entries=DECRYPT_CACHE_MAX_ENTRIES,
+            max_bytes=DECRYPT_CACHE_MAX_BYTES,
+            ttl_seconds=DECRYPT_CACHE_TTL_SECONDS,
+        )
+    
+    def rotate_key(self, encryption_key: str) -> None:
+        """
+        Switch to a new Fernet key
+        
+        Empties the decrypted-value cache and restarts the decryption process
+        pool so no plaintext or worker cipher from the old key survives.
+        
+        Raises:
+            ValueError: If the key is not a valid Fernet key
+        """
+        try:
+            cipher = Fernet(encryption_key.encode())
+        except Exception as e:
+            raise ValueError(f"Invalid ENCRYPTION_KEY format: {e}")
+        
+        self.cipher = cipher
+        self._encryption_key = encryption_key
+        self.decrypt_cache.clear()
+        shutdown_decrypt_pool()
+        logger.info("Encryption key rotated - decrypt cache cleared")
     
     def encrypt(self, plaintext: Any) -> Optional[str]:
         """
-        Encrypt plaintext and return base64-encoded string
+        Encrypt plaintext and return a v2 ciphertext string
         
         Args:
             plaintext: Data to encrypt (string, number, etc.)
         
         Returns:
-            Base64-encoded encrypted string, or None if input is None/empty
+            "enc:v2:<fernet token>" string, or None if input is None/empty
         """
         if plaintext is None or plaintext == "":
             return None
@@ -68,22 +233,52 @@ class EncryptionService:
             if not isinstance(plaintext, str):
                 plaintext = str(plaintext)
             
-            # Encrypt
-            encrypted_bytes = self.cipher.encrypt(plaintext.encode('utf-8'))
+            # Encrypt - the Fernet token is url-safe base64 already
+            token = self.cipher.encrypt(plaintext.encode('utf-8'))
             
-            # Return as base64 string for database storage
-            return base64.b64encode(encrypted_bytes).decode('utf-8')
+            return CIPHERTEXT_V2_PREFIX + token.decode('ascii')
         
         except Exception as e:
             logger.error(f"Encryption failed: {e}")
             raise ValueError(f"Failed to encrypt data: {e}")
     
+    @staticmethod
+    def is_encrypted(value: Any) -> bool:
+        """Check whether a stored value is ciphertext (v1 or v2) - O(1) prefix check"""
+        return isinstance(value, str) and (
+            value.startswith(CIPHERTEXT_V2_PREFIX) or value.startswith(CIPHERTEXT_V1_PREFIX)
+        )
+    
+    @staticmethod
+    def upgrade_ciphertext(value: Any) -> Optional[str]:
+        """
+        Convert a v1 ciphertext to v2 without decrypting it
+        
+        v1 is base64 of the Fernet token, so stripping that layer and adding the
+        prefix yields the same token in v2 form - no key needed.
+        
+        Returns:
+            The v2 string, or None if the value is not a valid v1 ciphertext
+        """
+        if not isinstance(value, str) or not value.startswith(CIPHERTEXT_V1_PREFIX):
+            return None
+        
+        try:
+            token = base64.b64decode(value.encode('ascii'), validate=True)
+        except (binascii.Error, ValueError):
+            return None
+        
+        if not token.startswith(b"gAAAAA"):
+            return None
+        
+        return CIPHERTEXT_V2_PREFIX + token.decode('ascii')
+    
     def decrypt(self, ciphertext: Optional[str]) -> Optional[str]:
         """
-        Decrypt base64-encoded ciphertext
+        Decrypt a v2 or legacy v1 ciphertext
         
         Args:
-            ciphertext: Base64-encoded encrypted string
+            ciphertext: Encrypted string (plaintext values are returned unchanged)
         
         Returns:
             Decrypted plaintext string, or None if input is None/empty
@@ -96,20 +291,31 @@ class EncryptionService:
             logger.debug(f"Skipping decryption for non-string type: {type(ciphertext)}")
             return str(ciphertext)
         
-        # Check if data looks like encrypted base64 (long string with base64 chars)
-        # If it's short or has non-base64 chars, it's likely plaintext
-        if len(ciphertext) < 20 or not self._looks_like_base64(ciphertext):
-            logger.debug(f"Skipping decryption for plaintext data: {ciphertext[:20]}...")
+        # Plaintext (legacy rows written before encryption) is passed through
+        if not self.is_encrypted(ciphertext):
             return ciphertext
         
+        cache_key = None
+        if self.decrypt_cache.enabled:
+            cache_key = DecryptCache.digest(ciphertext)
+            cached = self.decrypt_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
-            # Decode from base64
-            encrypted_bytes = base64.b64decode(ciphertext.encode('utf-8'))
+            if ciphertext.startswith(CIPHERTEXT_V2_PREFIX):
+                token = ciphertext[len(CIPHERTEXT_V2_PREFIX):].encode('ascii')
+            else:
+                # v1: extra base64 layer around the token
+                token = base64.b64decode(ciphertext.encode('utf-8'))
             
             # Decrypt
-            decrypted_bytes = self.cipher.decrypt(encrypted_bytes)
+            plaintext = self.cipher.decrypt(token).decode('utf-8')
             
-            return decrypted_bytes.decode('utf-8')
+            if cache_key is not None:
+                self.decrypt_cache.set(cache_key, plaintext)
+            
+            return plaintext
         
         except InvalidToken:
             logger.warning("Decryption failed: Invalid token - returning plaintext")
@@ -118,13 +324,6 @@ class EncryptionService:
             logger.warning(f"Decryption failed: {e} - returning plaintext")
             return ciphertext
     
-    def _looks_like_base64(self, s: str) -> bool:
-        """Check if string looks like base64-encoded data"""
-        import re
-        # Base64 uses A-Z, a-z, 0-9, +, /, and = for padding
-        # Encrypted data is typically longer than 40 chars
-        return bool(re.match(r'^[A-Za-z0-9+/]+=*$', s)) and len(s) > 40
-    
     def encrypt_json(self, data: dict) -> Optional[str]:
         """
         Encrypt entire JSON object (for JSONB fields like submission_data)
@@ -133,7 +332,7 @@ class EncryptionService:
             data: Dictionary to encrypt
         
         Returns:
-            Base64-encoded encrypted JSON string
+            Encrypted JSON string (v2 format)
         """
         if not data:
             return None
@@ -154,7 +353,7 @@ class EncryptionService:
         Decrypt encrypted JSON string back to dictionary
         
         Args:
-            ciphertext: Base64-encoded encrypted JSON
+            ciphertext: Encrypted JSON (v1 or v2)
         
         Returns:
             Decrypted dictionary
@@ -234,6 +433,32 @@ class EncryptionService:
         
         return encrypted_data
     
+    def encrypt_rows(self, rows: Sequence[dict]) -> List[dict]:
+        """Encrypt the PII fields of every employee row on the calling thread"""
+        return [self.encrypt_employee_pii(row) for row in rows]
+    
+    async def encrypt_many(self, rows: Sequence[dict]) -> List[dict]:
+        """
+        Encrypt the PII fields of every employee row without blocking the event loop
+        
+        Small lists are encrypted inline, larger ones chunk by chunk on the
+        default thread pool (same thresholds as decrypt_many).
+        
+        Args:
+            rows: Employee dictionaries with plaintext PII
+        
+        Returns:
+            New employee dictionaries with encrypted PII, in the original order
+        """
+        if len(rows) <= DECRYPT_INLINE_MAX_ROWS:
+            return self.encrypt_rows(rows)
+        
+        loop = asyncio.get_running_loop()
+        encrypted = []
+        for i in range(0, len(rows), DECRYPT_CHUNK_SIZE):
+            encrypted.extend(await loop.run_in_executor(None, self.encrypt_rows, rows[i:i + DECRYPT_CHUNK_SIZE]))
+        return encrypted
+    
     def decrypt_employee_pii(self, employee_data: dict) -> dict:
         """
         Decrypt all high-risk PII fields in employee data
@@ -244,40 +469,149 @@ class EncryptionService:
         Returns:
             Employee dictionary with decrypted PII
         """
-        decrypted_data = employee_data.copy()
+        return self._decrypt_row(employee_data, EMPLOYEE_PII_FIELDS)
+    
+    def decrypt_rows(self, rows: Sequence[dict], fields: Sequence[str] = EMPLOYEE_PII_FIELDS) -> List[dict]:
+        """
+        Decrypt the given fields in every row on the calling thread
         
-        # Decrypt National Insurance Number
-        if decrypted_data.get('ni_number'):
-            try:
-                decrypted_data['ni_number'] = self.decrypt(decrypted_data['ni_number'])
-            except Exception as e:
-                logger.warning(f"Failed to decrypt ni_number: {e}")
-                # Keep original value if decryption fails
-                pass
-        
-        # Decrypt pensionable salary
-        if decrypted_data.get('pensionable_salary'):
-            try:
-                decrypted_value = self.decrypt(decrypted_data['pensionable_salary'])
-                # Keep as original type if it was a number
-                decrypted_data['pensionable_salary'] = decrypted_value
-            except Exception as e:
-                logger.warning(f"Failed to decrypt pensionable_salary: {e}")
-                # Keep original value if decryption fails
-                pass
-        
-        # Decrypt date of birth
-        if decrypted_data.get('date_of_birth'):
-            try:
-                decrypted_data['date_of_birth'] = self.decrypt(
-                    decrypted_data['date_of_birth']
-                )
-            except Exception as e:
-                logger.warning(f"Failed to decrypt date_of_birth: {e}")
-                # Keep original value if decryption fails
-                pass
+        Args:
+            rows: Rows as returned by PostgREST
+            fields: Encrypted columns to decrypt
+        
+        Returns:
+            New row dictionaries with decrypted fields (plaintext values kept as-is)
+        """
+        return [self._decrypt_row(row, fields) for row in rows]
+    
+    async def decrypt_many(self, rows: Sequence[dict], fields: Sequence[str] = EMPLOYEE_PII_FIELDS) -> List[dict]:
+        """
+        Decrypt the given fields in every row without blocking the event loop
+        
+        Small lists are decrypted inline, larger ones chunk by chunk on the
+        default thread pool, and very large ones (DECRYPT_PROCESS_MIN_ROWS+) on a process
+        pool when more than one CPU is available. Only the encrypted values are
+        sent to worker processes, not whole rows.
+        
+        Args:
+            rows: Rows as returned by PostgREST
+            fields: Encrypted columns to decrypt
         
+        Returns:
+            New row dictionaries with decrypted fields, in the original order
+        """
+        fields = tuple(fields)
+        if len(rows) <= DECRYPT_INLINE_MAX_ROWS:
+            return self.decrypt_rows(rows, fields)
+        
+        loop = asyncio.get_running_loop()
+        chunks = [rows[i:i + DECRYPT_CHUNK_SIZE] for i in range(0, len(rows), DECRYPT_CHUNK_SIZE)]
+        
+        if len(rows) >= DECRYPT_PROCESS_MIN_ROWS and DECRYPT_MAX_PROCESSES > 1:
+            try:
+                pool = _get_process_pool(self._encryption_key)
+                results = await asyncio.gather(*[
+                    loop.run_in_executor(pool, _decrypt_values_in_worker, _extract_values(chunk, fields))
+                    for chunk in chunks
+                ])
+                return [
+                    _merge_values(row, fields, values)
+                    for chunk, chunk_values in zip(chunks, results)
+                    for row, values in zip(chunk, chunk_values)
+                ]
+            except BrokenProcessPool as e:
+                logger.warning(f"Decryption process pool failed, falling back to threads: {e}")
+                shutdown_decrypt_pool()
+        
+        # One chunk at a time: the GIL serialises the work anyway, and a single
+        # busy worker thread lets the event loop keep getting scheduled
+        decrypted = []
+        for chunk in chunks:
+            decrypted.extend(await loop.run_in_executor(None, self.decrypt_rows, chunk, fields))
+        return decrypted
+    
+    def _decrypt_row(self, row: dict, fields: Sequence[str]) -> dict:
+        """Copy a row and decrypt its encrypted fields (keeps the original value on failure)"""
+        decrypted_data = row.copy()
+        for field in fields:
+            if decrypted_data.get(field):
+                try:
+                    decrypted_data[field] = self.decrypt(decrypted_data[field])
+                except Exception as e:
+                    logger.warning(f"Failed to decrypt {field}: {e}")
         return decrypted_data
+    
+    def _decrypt_values(self, values: List[list]) -> List[list]:
+        """Decrypt a matrix of field values (one list per row), keeping empty values"""
+        decrypted = []
+        for row_values in values:
+            out = []
+            for value in row_values:
+                if value:
+                    try:
+                        value = self.decrypt(value)
+                    except Exception as e:
+                        logger.warning(f"Failed to decrypt value: {e}")
+                out.append(value)
+            decrypted.append(out)
+        return decrypted
+
+
+# Process pool for decrypt_many() - created on first large batch
+_process_pool: Optional[ProcessPoolExecutor] = None
+_worker_encryption_service: Optional[EncryptionService] = None
+
+
+def _init_decrypt_worker(encryption_key: str) -> None:
+    """Process pool initializer - build one EncryptionService per worker process"""
+    global _worker_encryption_service
+    logging.getLogger(__name__).setLevel(logging.WARNING)
+    _worker_encryption_service = EncryptionService(encryption_key)
+
+
+def _decrypt_values_in_worker(values: List[list]) -> List[list]:
+    """Process pool task - decrypt one chunk of field values"""
+    return _worker_encryption_service._decrypt_values(values)
+
+
+def _extract_values(rows: Sequence[dict], fields: Sequence[str]) -> List[list]:
+    """Pull just the encrypted field values out of each row"""
+    return [[row.get(field) for field in fields] for row in rows]
+
+
+def _merge_values(row: dict, fields: Sequence[str], values: list) -> dict:
+    """Copy a row with its decrypted field values put back"""
+    merged = row.copy()
+    for field, value in zip(fields, values):
+        if field in merged:
+            merged[field] = value
+    return merged
+
+
+def _get_process_pool(encryption_key: str) -> ProcessPoolExecutor:
+    """Get or create the decryption process pool"""
+    global _process_pool
+    
+    if _process_pool is None:
+        # spawn: forking a process with a running event loop and open sockets is unsafe
+        _process_pool = ProcessPoolExecutor(
+            max_workers=DECRYPT_MAX_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_decrypt_worker,
+            initargs=(encryption_key,),
+        )
+        logger.info(f"Started decryption process pool ({DECRYPT_MAX_PROCESSES} workers)")
+    
+    return _process_pool
+
+
+def shutdown_decrypt_pool() -> None:
+    """Stop the decryption process pool (called on app shutdown)"""
+    global _process_pool
+    
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
 
 
 # Singleton instance
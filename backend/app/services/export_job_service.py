@@ -0,0 +1,413 @@
+"""
+Export Job Service - Background exports with progress and reusable results
+
+Large exports can outlast proxy timeouts when they run inside the request.
+POST /api/exports queues a job instead; EXPORT_JOB_WORKERS workers per process
+take jobs off the queue and write the file to EXPORT_JOB_DIR page by page
+(export_service), reporting rows written against the expected total. The
+finished file is downloaded with Range support (resumable).
+
+Results are reused: a job with the same organization, type, format, filters
+and data version as a queued, running or finished one returns that job
+instead of querying and decrypting again. The data version combines the
+organization's response-cache version (bumped by every employee and change
+information write through the API) with the row count and latest change
+timestamp of the filtered rows (export_service.data_fingerprint), so audit
+log exports are only reused when their date range ends in the past (every
+export adds an audit entry). Finished files are deleted after
+EXPORT_JOB_TTL_SECONDS.
+
+Jobs and files belong to the process that ran them. Only files named like a
+job (<uuid>.csv / .xlsx / .part) are ever deleted from EXPORT_JOB_DIR: on
+startup and periodically, those older than the TTL (left behind by a restart
+or by another process sharing the directory) are swept.
+
+Every user who receives a job's file gets an EXPORT audit entry: the creator
+and anyone who joined the job while it was queued or running when it
+completes, and anyone reusing a completed job straight away.
+
+Usage:
+    export_job_service.start()                  # app startup
+    job = await export_job_service.submit(org_id, user_id, "io_template", "xlsx", filters)
+    job = export_job_service.get(org_id, job_id)
+    await export_job_service.stop()             # app shutdown
+"""
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+import uuid
+
+from app.config import settings
+from app.services.audit_service import audit_service
+from app.services.export_service import (
+    export_service,
+    encode_csv_rows,
+    normalize_export_format,
+    write_xlsx,
+    EXPORT_TYPE_FILTERS,
+    EXPORT_TYPE_TABLES,
+)
+from app.services.response_cache_service import response_cache
+
+logger = logging.getLogger(__name__)
+
+# Worksheet title per export type
+EXPORT_SHEET_TITLES = {
+    "io_template": "Employees",
+    "change_information": "Change Information",
+    "form_submissions": "Submissions",
+    "audit_logs": "Audit Logs",
+}
+# Download file name prefix per export type
+EXPORT_FILE_PREFIXES = {
+    "io_template": "employee_export",
+    "change_information": "change_information",
+    "form_submissions": "form_submissions",
+    "audit_logs": "audit_logs",
+}
+# Names of the files this service writes: <job uuid>.<format>[.part]
+JOB_FILE_PATTERN = re.compile(
+    r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.(csv|xlsx)(\.part)?$"
+)
+# Minimum seconds between sweeps of orphaned job files
+ORPHAN_SWEEP_INTERVAL_SECONDS = 600
+# Fields of a job returned to clients
+PUBLIC_JOB_FIELDS = (
+    "id", "type", "format", "filters", "status", "rows_written", "total_rows", "progress",
+    "file_name", "size_bytes", "error", "created_at", "started_at", "completed_at", "expires_at",
+)
+
+
+class ExportQueueFullError(Exception):
+    """The organization already has max_pending_per_org queued/running jobs"""
+
+
+class ExportJobService:
+    """In-process queue and worker pool for export jobs"""
+
+    def __init__(self, workers: int, directory: str, ttl_seconds: int, max_pending_per_org: int):
+        self.workers = max(1, workers)
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "zomi_exports")
+        self.ttl_seconds = ttl_seconds
+        self.max_pending_per_org = max_pending_per_org
+
+        # { job_id: job }
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # { cache key: job_id } of queued, running and finished jobs
+        self._by_key: Dict[str, str] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+        self.reused = 0
+        self._last_sweep = 0.0
+
+    def start(self) -> None:
+        """Create the export directory (sweeping expired job files) and start the workers"""
+        if self._tasks:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._sweep_orphans()
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Export job workers started ({self.workers}, files in {self.directory})")
+
+    async def stop(self) -> None:
+        """Cancel the workers and wait for them to finish"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def pending_count(self, organization_id: str) -> int:
+        """Queued or running jobs of an organization"""
+        return sum(
+            1 for job in self._jobs.values()
+            if job["organization_id"] == organization_id and job["status"] in ("queued", "running")
+        )
+
+    async def submit(
+        self,
+        organization_id: str,
+        user_id: str,
+        export_type: str,
+        export_format: str,
+        filters: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """
+        Queue an export, or return an identical job that is queued, running or finished
+
+        Args:
+            organization_id: Organization UUID
+            user_id: Requesting user (recorded in the EXPORT audit entry)
+            export_type: io_template, change_information, form_submissions or audit_logs
+            export_format: csv or xlsx
+            filters: Filters accepted by the type (see EXPORT_TYPE_FILTERS); others are ignored
+
+        Returns:
+            The job (public fields) plus "reused": True if an existing job was returned
+
+        Raises:
+            ValueError: If the type or format is unknown, or a required filter is missing
+            ExportQueueFullError: If a new job is needed and the organization already
+                has max_pending_per_org queued/running jobs
+        """
+        if self._queue is None:
+            raise RuntimeError("Export job workers are not running")
+        if export_type not in EXPORT_TYPE_FILTERS:
+            raise ValueError(f"Unknown export type: {export_type}. Use one of: {', '.join(EXPORT_TYPE_FILTERS)}")
+        export_format = normalize_export_format(export_format)
+        filters = {name: filters[name] for name in EXPORT_TYPE_FILTERS[export_type] if filters.get(name)}
+        if export_type == "form_submissions" and not filters.get("form_id"):
+            raise ValueError("form_id is required for form submission exports")
+
+        self._expire()
+
+        total_rows, latest_change = await export_service.data_fingerprint(export_type, organization_id, filters)
+        key = self._cache_key(organization_id, export_type, export_format, filters, total_rows, latest_change)
+
+        existing = self._jobs.get(self._by_key.get(key, ""))
+        if existing is not None and existing["status"] in ("queued", "running", "completed"):
+            self.reused += 1
+            # Every download of data is audited, including reused files
+            if existing["status"] == "completed":
+                await self._log_export(existing, user_id)
+            else:
+                existing["joined_user_ids"].append(user_id)
+            return {**self.public(existing), "reused": True}
+
+        # Checked here, with no await before the job is registered, so concurrent
+        # requests cannot all pass the limit while their fingerprints are running
+        if self.pending_count(organization_id) >= self.max_pending_per_org:
+            raise ExportQueueFullError(
+                f"Organization {organization_id} already has {self.max_pending_per_org} exports in progress"
+            )
+
+        now = datetime.now(timezone.utc).isoformat()
+        job = {
+            "id": str(uuid.uuid4()),
+            "organization_id": organization_id,
+            "user_id": user_id,
+            "type": export_type,
+            "format": export_format,
+            "filters": filters,
+            "status": "queued",
+            "rows_written": 0,
+            "total_rows": total_rows,
+            "progress": 0.0,
+            "file_name": f"{EXPORT_FILE_PREFIXES[export_type]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}",
+            "path": None,
+            "size_bytes": None,
+            "error": None,
+            "created_at": now,
+            "started_at": None,
+            "completed_at": None,
+            "expires_at": None,
+            "expires_monotonic": None,
+            "cache_key": key,
+            # Users who requested the same export while it was queued/running
+            "joined_user_ids": [],
+        }
+        self._jobs[job["id"]] = job
+        self._by_key[key] = job["id"]
+        self._queue.put_nowait(job["id"])
+
+        logger.info(f"Export job {job['id']} queued: {export_type}/{export_format} for org {organization_id} ({total_rows} rows)")
+        return {**self.public(job), "reused": False}
+
+    def get(self, organization_id: str, job_id: str) -> Optional[Dict[str, Any]]:
+        """A job of the organization (internal fields included), or None"""
+        self._expire()
+        job = self._jobs.get(job_id)
+        if job is None or job["organization_id"] != organization_id:
+            return None
+        return job
+
+    def list(self, organization_id: str) -> List[Dict[str, Any]]:
+        """The organization's jobs (public fields), newest first"""
+        self._expire()
+        jobs = [job for job in self._jobs.values() if job["organization_id"] == organization_id]
+        return [self.public(job) for job in sorted(jobs, key=lambda job: job["created_at"], reverse=True)]
+
+    def public(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Client-facing view of a job"""
+        return {field: job[field] for field in PUBLIC_JOB_FIELDS}
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for logging/monitoring"""
+        by_status: Dict[str, int] = {}
+        for job in self._jobs.values():
+            by_status[job["status"]] = by_status.get(job["status"], 0) + 1
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "jobs": by_status,
+            "reused": self.reused,
+        }
+
+    async def _worker(self, index: int) -> None:
+        """Run queued jobs one at a time"""
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self._jobs.get(job_id)
+                if job is not None and job["status"] == "queued":
+                    await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Export worker {index} failed on job {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        """Write a job's file, tracking progress; failures are recorded on the job"""
+        job["status"] = "running"
+        job["started_at"] = datetime.now(timezone.utc).isoformat()
+        path = os.path.join(self.directory, f"{job['id']}.{job['format']}")
+        partial_path = f"{path}.part"
+        start = time.perf_counter()
+
+        try:
+            headers, pages = await export_service.export_rows(
+                job["type"], job["organization_id"], job["filters"], typed=job["format"] == "xlsx"
+            )
+
+            async def counted(pages):
+                async for rows in pages:
+                    job["rows_written"] += len(rows)
+                    total = max(job["total_rows"], job["rows_written"])
+                    job["progress"] = round(job["rows_written"] / total, 3) if total else 1.0
+                    yield rows
+
+            with open(partial_path, "wb") as output:
+                if job["format"] == "xlsx":
+                    await write_xlsx(EXPORT_SHEET_TITLES[job["type"]], headers, counted(pages), output)
+                else:
+                    output.write(encode_csv_rows([headers]))
+                    async for rows in counted(pages):
+                        output.write(encode_csv_rows(rows))
+
+            os.replace(partial_path, path)
+        except asyncio.CancelledError:
+            self._discard(partial_path)
+            self._fail(job, "Cancelled")
+            raise
+        except Exception as e:
+            self._discard(partial_path)
+            self._fail(job, str(e))
+            logger.error(f"Export job {job['id']} failed: {str(e)}")
+            return
+
+        job["path"] = path
+        job["size_bytes"] = os.path.getsize(path)
+        job["status"] = "completed"
+        job["progress"] = 1.0
+        self._finish(job)
+
+        logger.info(
+            f"Export job {job['id']} completed: {job['rows_written']} rows, {job['size_bytes']} bytes "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        for user_id in [job["user_id"], *job["joined_user_ids"]]:
+            await self._log_export(job, user_id)
+
+    def _finish(self, job: Dict[str, Any]) -> None:
+        """Stamp completion and start the job's TTL"""
+        job["completed_at"] = datetime.now(timezone.utc).isoformat()
+        job["expires_at"] = datetime.fromtimestamp(time.time() + self.ttl_seconds, timezone.utc).isoformat()
+        job["expires_monotonic"] = time.monotonic() + self.ttl_seconds
+
+    def _fail(self, job: Dict[str, Any], error: str) -> None:
+        """Mark a job failed; it stays visible until its TTL but is never reused"""
+        job["status"] = "failed"
+        job["error"] = error
+        self._finish(job)
+        if self._by_key.get(job["cache_key"]) == job["id"]:
+            del self._by_key[job["cache_key"]]
+
+    async def _log_export(self, job: Dict[str, Any], user_id: str) -> None:
+        """EXPORT audit entry for a finished job"""
+        table_name, _ = EXPORT_TYPE_TABLES[job["type"]]
+        await audit_service.log_export(
+            table_name=table_name,
+            user_id=user_id,
+            organization_id=job["organization_id"],
+            filters={**job["filters"], "format": job["format"], "export_job_id": job["id"]},
+            record_count=job["rows_written"]
+        )
+
+    def _cache_key(
+        self,
+        organization_id: str,
+        export_type: str,
+        export_format: str,
+        filters: Dict[str, Any],
+        total_rows: int,
+        latest_change: Optional[str],
+    ) -> str:
+        """Identity of an export's result: request plus the data version it would read"""
+        payload = json.dumps({
+            "organization_id": organization_id,
+            "type": export_type,
+            "format": export_format,
+            "filters": filters,
+            "version": response_cache.version(organization_id),
+            "rows": total_rows,
+            "latest_change": latest_change,
+        }, sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _expire(self) -> None:
+        """Forget jobs past their TTL and delete their files"""
+        now = time.monotonic()
+        if now - self._last_sweep >= ORPHAN_SWEEP_INTERVAL_SECONDS:
+            self._sweep_orphans()
+        for job_id, job in list(self._jobs.items()):
+            if job["expires_monotonic"] is None or job["expires_monotonic"] > now:
+                continue
+            if job["path"]:
+                self._discard(job["path"])
+            del self._jobs[job_id]
+            if self._by_key.get(job["cache_key"]) == job_id:
+                del self._by_key[job["cache_key"]]
+
+    def _sweep_orphans(self) -> None:
+        """Delete job files older than the TTL that no job of this process owns"""
+        self._last_sweep = time.monotonic()
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+
+        for entry in entries:
+            if not JOB_FILE_PATTERN.match(entry.name) or entry.name.split(".", 1)[0] in self._jobs:
+                continue
+            try:
+                if entry.is_file(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    self._discard(entry.path)
+            except OSError as e:
+                logger.warning(f"Failed to remove orphaned export file {entry.path}: {str(e)}")
+
+    @staticmethod
+    def _discard(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# Singleton instance
+export_job_service = ExportJobService(
+    workers=settings.EXPORT_JOB_WORKERS,
+    directory=settings.EXPORT_JOB_DIR,
+    ttl_seconds=settings.EXPORT_JOB_TTL_SECONDS,
+    max_pending_per_org=settings.EXPORT_JOB_MAX_PENDING_PER_ORG,
+)
@@ -0,0 +1,275 @@
+"""
+KPI Aggregate Service
+Maintains per-organization running KPI counters so the current snapshot is an O(1) read
+
+Every employee create/update/delete calls record_change() with the row before
+and after the write; the difference in counters is added atomically in the
+database (apply_kpi_aggregate_delta RPC), and today's kpi_snapshots row is
+rewritten from the new counters, so each day's stored row ends up holding that
+day's final figures. The counters are rebuilt from a full scan when an
+organization has none yet, and reconciled in the background once they are
+older than KPI_AGGREGATE_RECONCILE_HOURS to correct any drift. A reconciliation
+is compare-and-set on the row's version: if a delta lands during its scan, it
+scans again rather than overwrite that delta.
+
+Usage:
+    await kpi_aggregate_service.record_change(org_id, old_row, new_row)
+    snapshot = await kpi_aggregate_service.current_snapshot(org_id, date.today())
+"""
+from datetime import datetime, date, timedelta, timezone
+from typing import Dict, Any, Optional, List, Set, Tuple
+import asyncio
+import logging
+
+from app.config import settings
+from app.services.database_service import db_service
+from app.services.response_cache_service import response_cache
+from app.services.single_flight import single_flight
+from app.services.kpi_snapshot_service import (
+    kpi_snapshot_service,
+    COUNTER_FIELDS,
+    empty_counters,
+    add_employee,
+    snapshot_from_counters,
+)
+
+logger = logging.getLogger(__name__)
+
+# Employee columns needed to work out a row's KPI contribution
+KPI_AGGREGATE_COLUMNS = (
+    "id, service_status, pensionable_salary, pension_start_date, is_pension_active, "
+    "has_group_life, has_gci, has_gip, has_bupa, legal_gender, uk_resident, "
+    "io_upload_status, send_pension_pack"
+)
+
+# Full scans per reconciliation before giving up on a busy organization
+RECONCILE_MAX_ATTEMPTS = 3
+
+
+class KPIAggregateService:
+    """Service for incrementally maintained KPI counters"""
+
+    def __init__(self):
+        self.db = db_service
+        self.reconcile_after = timedelta(hours=settings.KPI_AGGREGATE_RECONCILE_HOURS)
+        # Organizations with a background reconciliation in flight
+        self._reconciling: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        # { organization_id: snapshot_date } last kpi_snapshots row this process wrote
+        self._stored_snapshots: Dict[str, str] = {}
+
+    async def record_change(
+        self,
+        organization_id: str,
+        old_row: Optional[Dict[str, Any]],
+        new_row: Optional[Dict[str, Any]],
+    ) -> None:
+        """
+        Apply one employee write to the organization's counters
+
+        Args:
+            organization_id: Organization UUID
+            old_row: Employee row before the write (None for creates)
+            new_row: Employee row after the write (None for deletes)
+
+        Rows are as stored (encrypted salary). Never raises - a failed update
+        is corrected by the next reconciliation.
+        """
+        await self.record_changes(organization_id, [(old_row, new_row)])
+
+    async def record_changes(
+        self,
+        organization_id: str,
+        changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]],
+    ) -> None:
+        """Apply several employee writes (e.g. a bulk delete) as one delta"""
+        # Every employee write passes through here; cached dashboards are now stale
+        response_cache.bump(organization_id)
+        try:
+            delta = await self._compute_delta(changes)
+            if delta is None:
+                return
+
+            response = await self.db.rpc(
+                "apply_kpi_aggregate_delta",
+                {"p_organization_id": organization_id, "p_delta": delta}
+            ).execute()
+
+            if response.data is False:
+                logger.debug(f"No KPI aggregates yet for org {organization_id}, delta skipped")
+                return
+
+            # Keep today's stored snapshot at the latest figures
+            counters = await self.get_counters(organization_id)
+            await self.store_snapshot(snapshot_from_counters(organization_id, date.today(), counters))
+        except Exception as e:
+            logger.warning(f"Failed to update KPI aggregates for org {organization_id}: {str(e)}")
+
+    async def current_snapshot(self, organization_id: str, snapshot_date: date) -> Dict[str, Any]:
+        """
+        Build the snapshot for snapshot_date from the running counters
+
+        The first call per org/date in this process also stores it in kpi_snapshots
+        so the day still appears in trend history.
+        """
+        counters = await self.get_counters(organization_id)
+        snapshot_data = snapshot_from_counters(organization_id, snapshot_date, counters)
+
+        if self._stored_snapshots.get(organization_id) != snapshot_data["snapshot_date"]:
+            try:
+                await self.store_snapshot(snapshot_data)
+            except Exception as e:
+                logger.warning(f"Failed to store KPI snapshot for org {organization_id}: {str(e)}")
+
+        return snapshot_data
+
+    async def store_snapshot(self, snapshot_data: Dict[str, Any]) -> None:
+        """Upsert a snapshot built from the counters into kpi_snapshots"""
+        await self.db.table("kpi_snapshots")\
+            .upsert(snapshot_data, on_conflict="organization_id,snapshot_date")\
+            .execute()
+        self._stored_snapshots[snapshot_data["organization_id"]] = snapshot_data["snapshot_date"]
+
+    async def get_counters(self, organization_id: str) -> Dict[str, Any]:
+        """
+        Read the organization's counters
+
+        Builds them inline only if they do not exist yet; stale counters are
+        returned as-is and reconciled in the background.
+        """
+        response = await self.db.table("kpi_aggregates")\
+            .select("*")\
+            .eq("organization_id", organization_id)\
+            .execute()
+
+        if not response.data:
+            logger.info(f"No KPI aggregates for org {organization_id}, building them now")
+            return await self.reconcile(organization_id)
+
+        row = response.data[0]
+        if self._is_stale(row.get("reconciled_at")):
+            self._schedule_reconcile(organization_id)
+
+        counters = {field: row.get(field) or 0 for field in COUNTER_FIELDS}
+        counters["pension_start_dates"] = row.get("pension_start_dates") or {}
+        return counters
+
+    async def reconcile(self, organization_id: str) -> Dict[str, Any]:
+        """Recompute the counters from a full scan and store them"""
+        # Concurrent first reads of an org (and the scheduler) share one scan
+        return await single_flight.do(
+            f"kpi_reconcile:{organization_id}",
+            lambda: self._reconcile(organization_id)
+        )
+
+    async def _reconcile(self, organization_id: str) -> Dict[str, Any]:
+        """
+        Full-scan reconciliation (see reconcile)
+
+        The scan result is stored only if the row's version is unchanged since
+        before the scan; otherwise a delta landed mid-scan and the scan is
+        repeated (up to RECONCILE_MAX_ATTEMPTS times).
+        """
+        for attempt in range(1, RECONCILE_MAX_ATTEMPTS + 1):
+            current = await self.db.table("kpi_aggregates")\
+                .select("version")\
+                .eq("organization_id", organization_id)\
+                .execute()
+            version = (current.data[0].get("version") or 0) if current.data else None
+
+            counters, _ = await kpi_snapshot_service.count_active_employees(organization_id)
+
+            # Drop dates no active employee starts on (keeps the JSON small)
+            counters["pension_start_dates"] = {
+                start_date: count for start_date, count in counters["pension_start_dates"].items() if count
+            }
+
+            now = datetime.now(timezone.utc).isoformat()
+            row = {**counters, "reconciled_at": now, "updated_at": now}
+            if version is None:
+                # First build; another worker may have inserted meanwhile
+                stored = await self.db.table("kpi_aggregates").upsert(
+                    {"organization_id": organization_id, **row, "version": 0},
+                    on_conflict="organization_id",
+                    ignore_duplicates=True,
+                ).execute()
+            else:
+                stored = await self.db.table("kpi_aggregates")\
+                    .update({**row, "version": version + 1})\
+                    .eq("organization_id", organization_id)\
+                    .eq("version", version)\
+                    .execute()
+
+            if stored.data:
+                # Reconciliation may have corrected drift in today's figures
+                response_cache.bump(organization_id)
+                logger.info(f"KPI aggregates reconciled for org {organization_id} ({counters['total_active']} active)")
+                return counters
+
+            logger.info(f"KPI aggregates for org {organization_id} changed during reconciliation (attempt {attempt})")
+
+        logger.warning(
+            f"KPI aggregates for org {organization_id} kept changing, reconciliation skipped "
+            f"after {RECONCILE_MAX_ATTEMPTS} attempts"
+        )
+        return counters
+
+    async def _compute_delta(
+        self,
+        changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]],
+    ) -> Optional[Dict[str, Any]]:
+        """Counter difference for a list of (old_row, new_row) writes, or None if nothing changed"""
+        signed_rows = []
+        for old_row, new_row in changes:
+            if old_row and old_row.get("service_status") == "Active":
+                signed_rows.append((old_row, -1))
+            if new_row and new_row.get("service_status") == "Active":
+                signed_rows.append((new_row, 1))
+
+        if not signed_rows:
+            return None
+
+        salaries = await kpi_snapshot_service.row_salaries([row for row, _ in signed_rows])
+
+        counters = empty_counters()
+        for (row, sign), salary in zip(signed_rows, salaries):
+            add_employee(counters, row, salary, sign)
+
+        delta = {field: counters[field] for field in COUNTER_FIELDS if counters[field]}
+        dates = {start_date: count for start_date, count in counters["pension_start_dates"].items() if count}
+        if dates:
+            delta["pension_start_dates"] = dates
+
+        return delta or None
+
+    def _is_stale(self, reconciled_at: Optional[str]) -> bool:
+        """Check whether counters are due for a full reconciliation"""
+        if not reconciled_at:
+            return True
+        try:
+            reconciled = datetime.fromisoformat(reconciled_at.replace("Z", "+00:00"))
+        except ValueError:
+            return True
+        return datetime.now(timezone.utc) - reconciled > self.reconcile_after
+
+    def _schedule_reconcile(self, organization_id: str) -> None:
+        """Start a background reconciliation unless one is already running for the org"""
+        if organization_id in self._reconciling:
+            return
+        self._reconciling.add(organization_id)
+
+        async def run():
+            try:
+                await self.reconcile(organization_id)
+            except Exception as e:
+                logger.error(f"Background KPI reconciliation failed for org {organization_id}: {str(e)}")
+            finally:
+                self._reconciling.discard(organization_id)
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+# Singleton instance
+kpi_aggregate_service = KPIAggregateService()
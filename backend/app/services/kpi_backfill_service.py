@@ -0,0 +1,308 @@
+"""
+KPI Backfill Service
+Reconstructs daily kpi_snapshots rows for past dates
+
+History normally only exists from the day snapshots started being written, so
+week/period trends fall back to the oldest snapshot or 0%. The backfill starts
+from today's employee rows and walks backwards one day at a time, undoing what
+happened on each day:
+
+- employees created that day (employees.created_at) disappear
+- pension activations that day (pension_start_date) are switched back off
+- employee UPDATE / DELETE / BULK_DELETE audit_logs entries are reverted
+  using their (encrypted) old_data
+
+Counters are adjusted only for the employees touched on each day, so the whole
+range costs one employee scan, one audit_logs scan and a pass over the days;
+the results are written with bulk upserts.
+
+Limitations: audit entries never contain pensionable_salary, so past salary
+figures use each employee's current salary (deleted employees count without
+one). Bulk-deleted employees are restored from their latest CREATE/UPDATE
+audit entry in the range, and skipped if there is none.
+
+Usage:
+    result = await kpi_backfill_service.backfill(org_id, date(2025, 1, 1), date(2025, 12, 31))
+"""
+from datetime import date, timedelta
+from typing import Dict, Any, Optional, List, Set, Tuple
+import json
+import logging
+
+from app.services.database_service import db_service
+from app.services.encryption_service import get_encryption_service
+from app.services.kpi_aggregate_service import KPI_AGGREGATE_COLUMNS
+from app.services.kpi_snapshot_service import (
+    kpi_snapshot_service,
+    KPI_FETCH_PAGE_SIZE,
+    empty_counters,
+    add_employee,
+    snapshot_from_counters,
+)
+from app.services.response_cache_service import response_cache
+
+logger = logging.getLogger(__name__)
+
+# Longest range one backfill may cover (about three years)
+BACKFILL_MAX_DAYS = 1096
+# Snapshot rows per upsert request
+BACKFILL_UPSERT_BATCH_SIZE = 500
+
+BACKFILL_EMPLOYEE_COLUMNS = KPI_AGGREGATE_COLUMNS + ", created_at"
+BACKFILL_AUDIT_ACTIONS = ("CREATE", "UPDATE", "DELETE", "BULK_DELETE")
+
+
+def _effective_row(row: Optional[Dict[str, Any]], day_iso: str) -> Optional[Dict[str, Any]]:
+    """
+    The row as counted on day_iso, or None if it does not count
+
+    An employee counts if active and created on or before the day; pension is
+    active once pension_start_date has passed (same rule as the DB trigger).
+    """
+    if not row or row.get("service_status") != "Active":
+        return None
+
+    created = (row.get("created_at") or "")[:10]
+    if created and created > day_iso:
+        return None
+
+    pension_start = (row.get("pension_start_date") or "")[:10]
+    return {**row, "is_pension_active": bool(pension_start) and pension_start <= day_iso}
+
+
+class KPIBackfillService:
+    """Service for reconstructing historical KPI snapshots"""
+
+    def __init__(self):
+        self.db = db_service
+
+    async def backfill(
+        self,
+        organization_id: str,
+        start_date: date,
+        end_date: date,
+        dry_run: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Rebuild and store snapshots for start_date..end_date (inclusive)
+
+        Args:
+            organization_id: Organization UUID
+            start_date: First day to rebuild
+            end_date: Last day to rebuild (must be before today)
+            dry_run: Compute without writing
+
+        Returns:
+            Summary with days rebuilt, rows scanned and skipped deletions
+
+        Raises:
+            ValueError: If the range is empty, includes today or is too long
+        """
+        today = date.today()
+        if start_date > end_date:
+            raise ValueError("start_date must be on or before end_date")
+        if end_date >= today:
+            raise ValueError("end_date must be before today (today's snapshot is computed live)")
+        if (end_date - start_date).days + 1 > BACKFILL_MAX_DAYS:
+            raise ValueError(f"Backfill range is limited to {BACKFILL_MAX_DAYS} days")
+
+        employees = await self._fetch_employees(organization_id)
+        salaries = await kpi_snapshot_service.row_salaries(employees)
+        # Everything after the end of start_date has to be undone
+        events = await self._fetch_audit_events(organization_id, start_date + timedelta(days=1))
+
+        snapshots, unrestorable = self._replay(
+            organization_id,
+            start_date,
+            end_date,
+            today,
+            employees,
+            {emp["id"]: salary for emp, salary in zip(employees, salaries)},
+            events,
+        )
+
+        if not dry_run:
+            for i in range(0, len(snapshots), BACKFILL_UPSERT_BATCH_SIZE):
+                await self.db.table("kpi_snapshots")\
+                    .upsert(snapshots[i:i + BACKFILL_UPSERT_BATCH_SIZE], on_conflict="organization_id,snapshot_date")\
+                    .execute()
+            response_cache.bump(organization_id)
+
+        logger.info(
+            f"KPI backfill for org {organization_id} {start_date}..{end_date}: {len(snapshots)} days, "
+            f"{len(employees)} employees, {len(events)} audit events"
+            f"{' (dry run)' if dry_run else ''}"
+        )
+
+        return {
+            "organization_id": organization_id,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "days": len(snapshots),
+            "employees_scanned": len(employees),
+            "audit_events_replayed": len(events),
+            "unrestorable_deletions": unrestorable,
+            "written": 0 if dry_run else len(snapshots),
+            "dry_run": dry_run,
+        }
+
+    def _replay(
+        self,
+        organization_id: str,
+        start_date: date,
+        end_date: date,
+        today: date,
+        employees: List[Dict[str, Any]],
+        salaries: Dict[str, Optional[float]],
+        events: List[Dict[str, Any]],
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Walk back from today undoing each day's changes; returns (snapshot rows oldest first, skipped deletions)"""
+        state: Dict[str, Dict[str, Any]] = {emp["id"]: emp for emp in employees}
+
+        # Employees whose counted state changes when crossing a day boundary
+        # without an audit entry: created that day, or pension starting that day
+        day_changes: Dict[str, Set[str]] = {}
+
+        def track(employee_id: str, row: Dict[str, Any]) -> None:
+            for value in (row.get("created_at"), row.get("pension_start_date")):
+                if value:
+                    day_changes.setdefault(value[:10], set()).add(employee_id)
+
+        for employee_id, row in state.items():
+            track(employee_id, row)
+
+        # Bulk deletes carry only ids; restore each from its last known state
+        latest_known: Dict[str, Dict[str, Any]] = {}
+        for event in events:
+            if event["action"] in ("CREATE", "UPDATE") and event["new_data"]:
+                latest_known[event["record_id"]] = {**latest_known.get(event["record_id"], {}), **event["new_data"]}
+            elif event["action"] == "BULK_DELETE":
+                event["restore"] = {
+                    employee_id: latest_known.get(employee_id) for employee_id in event["deleted_ids"]
+                }
+
+        events_by_day: Dict[str, List[Dict[str, Any]]] = {}
+        for event in reversed(events):
+            events_by_day.setdefault(event["created_at"][:10], []).append(event)
+
+        counters = empty_counters()
+        today_iso = today.isoformat()
+        for employee_id, row in state.items():
+            effective = _effective_row(row, today_iso)
+            if effective:
+                add_employee(counters, effective, salaries.get(employee_id))
+
+        snapshots: List[Dict[str, Any]] = []
+        unrestorable = 0
+        day = today
+        while day > start_date:
+            later_iso = day.isoformat()
+            day -= timedelta(days=1)
+            day_iso = day.isoformat()
+            day_events = events_by_day.get(later_iso, [])
+
+            affected = set(day_changes.get(later_iso, ()))
+            for event in day_events:
+                affected.update(event["deleted_ids"] or [event["record_id"]])
+            affected.discard(None)
+
+            for employee_id in affected:
+                effective = _effective_row(state.get(employee_id), later_iso)
+                if effective:
+                    add_employee(counters, effective, salaries.get(employee_id), -1)
+
+            # Undo the later day's writes, newest first
+            for event in day_events:
+                if event["action"] == "UPDATE" and event["old_data"]:
+                    state[event["record_id"]] = {**state.get(event["record_id"], {}), **event["old_data"]}
+                    track(event["record_id"], state[event["record_id"]])
+                elif event["action"] == "DELETE" and event["old_data"]:
+                    state[event["record_id"]] = dict(event["old_data"])
+                    track(event["record_id"], state[event["record_id"]])
+                elif event["action"] == "BULK_DELETE":
+                    for employee_id, row in event["restore"].items():
+                        if row:
+                            state[employee_id] = dict(row)
+                            track(employee_id, row)
+                        elif employee_id not in state:
+                            unrestorable += 1
+
+            for employee_id in affected:
+                effective = _effective_row(state.get(employee_id), day_iso)
+                if effective:
+                    add_employee(counters, effective, salaries.get(employee_id))
+
+            if day <= end_date:
+                snapshots.append(snapshot_from_counters(organization_id, day, counters))
+
+        snapshots.reverse()
+        return snapshots, unrestorable
+
+    async def _fetch_employees(self, organization_id: str) -> List[Dict[str, Any]]:
+        """Current KPI columns and created_at of every employee (id keyset pages)"""
+        rows: List[Dict[str, Any]] = []
+        last_id = None
+
+        while True:
+            query = self.db.table("employees")\
+                .select(BACKFILL_EMPLOYEE_COLUMNS)\
+                .eq("organization_id", organization_id)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            response = await query.order("id").limit(KPI_FETCH_PAGE_SIZE).execute()
+
+            rows.extend(response.data)
+            if len(response.data) < KPI_FETCH_PAGE_SIZE:
+                return rows
+            last_id = response.data[-1]["id"]
+
+    async def _fetch_audit_events(self, organization_id: str, since: date) -> List[Dict[str, Any]]:
+        """
+        Employee audit entries from `since` onwards, decrypted, oldest first
+
+        Each event keeps only what the replay needs: action, created_at,
+        record_id, old_data, new_data and deleted_ids (bulk deletes).
+        """
+        encryption = get_encryption_service()
+        events: List[Dict[str, Any]] = []
+        last_id = None
+
+        while True:
+            query = self.db.table("audit_logs")\
+                .select("id, action, created_at, details")\
+                .eq("organization_id", organization_id)\
+                .eq("resource", "employees")\
+                .in_("action", list(BACKFILL_AUDIT_ACTIONS))\
+                .gte("created_at", since.isoformat())
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            response = await query.order("id").limit(KPI_FETCH_PAGE_SIZE).execute()
+
+            for row in await encryption.decrypt_many(response.data, ("details",)):
+                details = row.get("details") or {}
+                if isinstance(details, str):
+                    try:
+                        details = json.loads(details)
+                    except ValueError:
+                        logger.warning(f"Skipping audit log {row['id']} with unreadable details")
+                        continue
+
+                events.append({
+                    "action": row["action"],
+                    "created_at": row["created_at"],
+                    "record_id": details.get("record_id"),
+                    "old_data": details.get("old_data"),
+                    "new_data": details.get("new_data"),
+                    "deleted_ids": (details.get("metadata") or {}).get("deleted_ids") or [],
+                })
+
+            if len(response.data) < KPI_FETCH_PAGE_SIZE:
+                break
+            last_id = response.data[-1]["id"]
+
+        events.sort(key=lambda event: event["created_at"])
+        return events
+
+
+# Singleton instance
+kpi_backfill_service = KPIBackfillService()
@@ -0,0 +1,267 @@
+"""
+KPI Snapshot Scheduler
+Pre-computes the daily KPI snapshot for every organization inside the API process
+
+Once a day at KPI_SNAPSHOT_RUN_TIME (and on startup if today's run is still
+outstanding) each worker tries to take the lease row for the day's run in
+scheduler_leases; only the holder does the work. Workers that find the lease
+held keep polling every KPI_SCHEDULER_LEASE_SECONDS until the run is completed,
+so an expired lease (crashed or redeployed holder) is taken over the same day. Organizations are processed
+with bounded concurrency and a small random delay each. Every org's KPI
+counters are rebuilt from a full scan and today's KPI and analytics snapshots
+are stored, so the first dashboard hit of the day never computes anything
+inline and every day has analytics history.
+
+Usage:
+    kpi_snapshot_scheduler.start()        # app startup
+    await kpi_snapshot_scheduler.stop()   # app shutdown
+    await kpi_snapshot_scheduler.run_once()
+    kpi_snapshot_scheduler.metrics()
+"""
+from datetime import datetime, date, time as dt_time, timedelta, timezone
+from typing import Dict, Any, Optional, List
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+
+from app.config import settings
+from app.services.database_service import db_service
+from app.services.kpi_aggregate_service import kpi_aggregate_service
+from app.services.kpi_snapshot_service import kpi_snapshot_service, snapshot_from_counters
+from app.services.response_cache_service import response_cache
+
+logger = logging.getLogger(__name__)
+
+LEASE_PREFIX = "kpi_daily_snapshots"
+ORGANIZATION_PAGE_SIZE = 1000
+
+
+class KPISnapshotScheduler:
+    """Daily background job that stores a KPI snapshot for every organization"""
+
+    def __init__(self):
+        self.db = db_service
+        self.run_time = self._parse_run_time(settings.KPI_SNAPSHOT_RUN_TIME)
+        self.concurrency = max(1, settings.KPI_SCHEDULER_CONCURRENCY)
+        self.start_jitter = settings.KPI_SCHEDULER_START_JITTER_SECONDS
+        self.org_jitter = settings.KPI_SCHEDULER_ORG_JITTER_SECONDS
+        self.lease_seconds = settings.KPI_SCHEDULER_LEASE_SECONDS
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._task: Optional[asyncio.Task] = None
+        self._metrics: Dict[str, Any] = {
+            "runs_started": 0,
+            "runs_completed": 0,
+            "runs_failed": 0,
+            "runs_skipped_lease_held": 0,
+            "organizations_succeeded": 0,
+            "organizations_failed": 0,
+            "last_run_date": None,
+            "last_run_started_at": None,
+            "last_run_duration_seconds": None,
+            "last_run_organizations": 0,
+            "last_run_failures": 0,
+            "last_error": None,
+            "next_run_at": None,
+        }
+
+    def start(self) -> None:
+        """Start the scheduler loop (no-op if disabled or already running)"""
+        if not settings.KPI_SCHEDULER_ENABLED:
+            logger.info("KPI snapshot scheduler disabled")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"KPI snapshot scheduler started (daily at {self.run_time.strftime('%H:%M')}, holder {self.holder})")
+
+    async def stop(self) -> None:
+        """Cancel the scheduler loop and wait for it to finish"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> Dict[str, Any]:
+        """Run counters, last run duration and failures"""
+        return {**self._metrics, "running": self._task is not None and not self._task.done()}
+
+    async def run_once(self, snapshot_date: Optional[date] = None) -> bool:
+        """
+        Run the day's job if this worker can take its lease
+
+        Returns:
+            True if this worker ran the job, False if another worker holds/completed it
+        """
+        snapshot_date = snapshot_date or date.today()
+        lease_name = self._lease_name(snapshot_date)
+
+        acquired = await self.db.rpc("acquire_scheduler_lease", {
+            "p_name": lease_name,
+            "p_holder": self.holder,
+            "p_ttl_seconds": self.lease_seconds,
+        }).execute()
+
+        if acquired.data is not True:
+            self._metrics["runs_skipped_lease_held"] += 1
+            logger.info(f"KPI snapshot run {lease_name} already held or completed by another worker")
+            return False
+
+        self._metrics["runs_started"] += 1
+        self._metrics["last_run_date"] = snapshot_date.isoformat()
+        self._metrics["last_run_started_at"] = datetime.now(timezone.utc).isoformat()
+        start = time.perf_counter()
+        heartbeat = asyncio.create_task(self._renew_lease(lease_name))
+
+        try:
+            organization_ids = await self._list_organizations()
+            results = await self._snapshot_organizations(organization_ids, snapshot_date)
+            failures = [org_id for org_id, ok in results if not ok]
+
+            duration = round(time.perf_counter() - start, 2)
+            self._metrics["runs_completed"] += 1
+            self._metrics["organizations_succeeded"] += len(results) - len(failures)
+            self._metrics["organizations_failed"] += len(failures)
+            self._metrics["last_run_duration_seconds"] = duration
+            self._metrics["last_run_organizations"] = len(results)
+            self._metrics["last_run_failures"] = len(failures)
+
+            await self.db.table("scheduler_leases").update({
+                "completed_at": datetime.now(timezone.utc).isoformat(),
+                "details": {
+                    "organizations": len(results),
+                    "failed": failures,
+                    "duration_seconds": duration,
+                },
+            }).eq("name", lease_name).eq("holder", self.holder).execute()
+
+            logger.info(
+                f"KPI snapshots for {snapshot_date}: {len(results) - len(failures)}/{len(results)} "
+                f"organizations in {duration}s"
+            )
+            return True
+
+        except Exception as e:
+            # Lease is left uncompleted so another worker can retry once it expires
+            self._metrics["runs_failed"] += 1
+            self._metrics["last_error"] = str(e)
+            self._metrics["last_run_duration_seconds"] = round(time.perf_counter() - start, 2)
+            logger.error(f"KPI snapshot run {lease_name} failed: {str(e)}")
+            raise
+        finally:
+            heartbeat.cancel()
+
+    async def _loop(self) -> None:
+        """Wait for each run time, then run (on startup too if today's run is outstanding)"""
+        while True:
+            try:
+                now = datetime.now()
+                today_run = datetime.combine(now.date(), self.run_time)
+                if now >= today_run:
+                    await self._sleep_with_jitter(0)
+                    ran = await self.run_once(now.date())
+                    if ran or await self._lease_completed(now.date()):
+                        next_run = today_run + timedelta(days=1)
+                    else:
+                        # Another worker holds the lease; poll until it completes, or
+                        # take over once it expires (holder crashed or redeployed)
+                        next_run = datetime.now() + timedelta(seconds=self.lease_seconds)
+                else:
+                    next_run = today_run
+
+                self._metrics["next_run_at"] = next_run.isoformat()
+                await asyncio.sleep((next_run - datetime.now()).total_seconds())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"KPI snapshot scheduler error: {str(e)}")
+                # Retry after a pause; the lease keeps other workers from duplicating work
+                await asyncio.sleep(300)
+
+    @staticmethod
+    def _lease_name(snapshot_date: date) -> str:
+        return f"{LEASE_PREFIX}:{snapshot_date.isoformat()}"
+
+    async def _lease_completed(self, snapshot_date: date) -> bool:
+        """Whether the day's run has been completed by any worker"""
+        response = await self.db.table("scheduler_leases")\
+            .select("completed_at")\
+            .eq("name", self._lease_name(snapshot_date))\
+            .limit(1)\
+            .execute()
+        return bool(response.data and response.data[0].get("completed_at"))
+
+    async def _sleep_with_jitter(self, base_seconds: float) -> None:
+        """Sleep base_seconds plus up to KPI_SCHEDULER_START_JITTER_SECONDS"""
+        await asyncio.sleep(base_seconds + random.uniform(0, self.start_jitter))
+
+    async def _list_organizations(self) -> List[str]:
+        """All organization IDs (id keyset pages)"""
+        organization_ids: List[str] = []
+        last_id = None
+        while True:
+            query = self.db.table("organizations").select("id")
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            response = await query.order("id").limit(ORGANIZATION_PAGE_SIZE).execute()
+
+            organization_ids.extend(row["id"] for row in response.data)
+            if len(response.data) < ORGANIZATION_PAGE_SIZE:
+                return organization_ids
+            last_id = response.data[-1]["id"]
+
+    async def _snapshot_organizations(self, organization_ids: List[str], snapshot_date: date) -> List[tuple]:
+        """Rebuild counters and store the day's snapshots for each org, a few at a time"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def snapshot_one(organization_id: str) -> tuple:
+            async with semaphore:
+                await asyncio.sleep(random.uniform(0, self.org_jitter))
+                try:
+                    counters = await kpi_aggregate_service.reconcile(organization_id)
+                    await kpi_aggregate_service.store_snapshot(
+                        snapshot_from_counters(organization_id, snapshot_date, counters)
+                    )
+                    version = response_cache.version(organization_id)
+                    histograms = await kpi_snapshot_service.get_analytics_histograms(organization_id, snapshot_date)
+                    await kpi_snapshot_service.store_analytics_snapshot(organization_id, snapshot_date, histograms, version)
+                    return organization_id, True
+                except Exception as e:
+                    logger.error(f"KPI snapshot failed for org {organization_id}: {str(e)}")
+                    return organization_id, False
+
+        return await asyncio.gather(*[snapshot_one(org_id) for org_id in organization_ids])
+
+    async def _renew_lease(self, lease_name: str) -> None:
+        """Extend the lease while a run is in progress"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+                await self.db.table("scheduler_leases")\
+                    .update({"expires_at": expires_at.isoformat()})\
+                    .eq("name", lease_name)\
+                    .eq("holder", self.holder)\
+                    .execute()
+            except Exception as e:
+                logger.warning(f"Failed to renew lease {lease_name}: {str(e)}")
+
+    @staticmethod
+    def _parse_run_time(value: str) -> dt_time:
+        """Parse HH:MM, falling back to 00:15 if invalid"""
+        try:
+            hour, minute = (int(part) for part in value.split(":"))
+            return dt_time(hour, minute)
+        except (ValueError, TypeError):
+            logger.warning(f"Invalid KPI_SNAPSHOT_RUN_TIME '{value}', using 00:15")
+            return dt_time(0, 15)
+
+
+# Singleton instance
+kpi_snapshot_scheduler = KPISnapshotScheduler()
@@ -3,25 +3,231 @@ KPI Snapshot Service
 Handles daily snapshots of KPI metrics for historical trend tracking
 """
 from datetime import datetime, date, timedelta
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Iterable
+import asyncio
+import bisect
 import logging
 
 from app.services.database_service import db_service
 from app.services.encryption_service import get_encryption_service
+from app.services.response_cache_service import response_cache
+from app.services.single_flight import single_flight
 
 logger = logging.getLogger(__name__)
 
+# Every employee column any snapshot metric reads
+KPI_SNAPSHOT_COLUMNS = (
+    "id, pensionable_salary, pension_start_date, is_pension_active, "
+    "has_group_life, has_gci, has_gip, has_bupa, legal_gender, uk_resident, "
+    "io_upload_status, send_pension_pack"
+)
+# Rows per request - matches the default PostgREST max_rows on Supabase
+KPI_FETCH_PAGE_SIZE = 1000
+
+# Age brackets for the analytics dashboard; an age falls in the first bracket
+# whose upper bound it does not exceed
+AGE_BRACKETS = ("18-25", "26-35", "36-45", "46-55", "56-65", "65+")
+AGE_BRACKET_UPPER_BOUNDS = (25, 35, 45, 55, 65)
+
+# Distributions returned by the kpi_analytics_distributions RPC
+ANALYTICS_DIMENSIONS = ("company", "nationality", "approach", "gender", "postcode_area")
+ANALYTICS_FLAGS = ("pension", "group_life", "gci", "gip", "bupa", "uk_resident", "io_uploaded")
+# kpi_analytics_snapshots columns holding get_analytics_histograms() output
+ANALYTICS_HISTOGRAM_COLUMNS = ANALYTICS_DIMENSIONS + ("age", "flags", "total_employees")
+
+# Snapshot series resolutions, finest first: daily kpi_snapshots rows, then the
+# week/month rows of kpi_snapshot_rollups. A range uses the finest resolution
+# that stays within SNAPSHOT_SERIES_MAX_POINTS rows.
+SNAPSHOT_RESOLUTION_DAYS = {"day": 1, "week": 7, "month": 30}
+SNAPSHOT_SERIES_MAX_POINTS = 62
+
+
+# Running totals every snapshot metric is derived from (see snapshot_from_counters)
+COUNTER_FIELDS = (
+    "total_active", "salary_count", "salary_sum",
+    "pension_active_count", "group_life_count", "gci_count", "gip_count", "bupa_count",
+    "gender_male_count", "gender_female_count", "gender_other_count",
+    "uk_resident_count", "non_uk_resident_count",
+    "io_uploads_completed", "pension_packs_sent",
+)
+
+
+def pick_snapshot_resolution(start_date: date, end_date: date) -> str:
+    """Finest resolution whose point count for start_date..end_date fits SNAPSHOT_SERIES_MAX_POINTS"""
+    span_days = (end_date - start_date).days + 1
+    for resolution, days in SNAPSHOT_RESOLUTION_DAYS.items():
+        if span_days / days <= SNAPSHOT_SERIES_MAX_POINTS:
+            return resolution
+    return "month"
+
+
+def empty_counters() -> Dict[str, Any]:
+    """Zeroed counters, plus {pension_start_date: count} for pending activations"""
+    counters: Dict[str, Any] = {field: 0 for field in COUNTER_FIELDS}
+    counters["pension_start_dates"] = {}
+    return counters
+
+
+def add_employee(counters: Dict[str, Any], emp: Dict[str, Any], salary: Optional[float], sign: int = 1) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) one active employee's contribution
+    
+    Args:
+        counters: Counters to update in place
+        emp: Employee row with the KPI_SNAPSHOT_COLUMNS
+        salary: Parsed pensionable salary, or None if missing/unparseable
+        sign: 1 to add, -1 to remove
+    """
+    counters["total_active"] += sign
+    
+    if salary is not None:
+        counters["salary_count"] += sign
+        counters["salary_sum"] += sign * salary
+    
+    pension_start_date = emp.get("pension_start_date")
+    if pension_start_date:
+        dates = counters["pension_start_dates"]
+        dates[pension_start_date] = dates.get(pension_start_date, 0) + sign
+    
+    if emp.get("is_pension_active"):
+        counters["pension_active_count"] += sign
+    if emp.get("has_group_life"):
+        counters["group_life_count"] += sign
+    if emp.get("has_gci"):
+        counters["gci_count"] += sign
+    if emp.get("has_gip"):
+        counters["gip_count"] += sign
+    if emp.get("has_bupa"):
+        counters["bupa_count"] += sign
+    
+    gender = emp.get("legal_gender")
+    if gender == "Male":
+        counters["gender_male_count"] += sign
+    elif gender == "Female":
+        counters["gender_female_count"] += sign
+    else:
+        counters["gender_other_count"] += sign
+    
+    if emp.get("uk_resident") is True:
+        counters["uk_resident_count"] += sign
+    elif emp.get("uk_resident") is False:
+        counters["non_uk_resident_count"] += sign
+    
+    if emp.get("io_upload_status") is True:
+        counters["io_uploads_completed"] += sign
+    if emp.get("send_pension_pack") is True:
+        counters["pension_packs_sent"] += sign
+
+
+def snapshot_from_counters(
+    organization_id: str,
+    snapshot_date: date,
+    counters: Dict[str, Any],
+    total_active: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Build a kpi_snapshots row from running counters
+    
+    Args:
+        total_active: Exact active count if known separately (defaults to the counter)
+    """
+    snapshot_iso = snapshot_date.isoformat()
+    employees = counters["total_active"]
+    salary_count = counters["salary_count"]
+    salary_sum = float(counters["salary_sum"])
+    
+    pending_count = sum(
+        count for start_date, count in counters["pension_start_dates"].items()
+        if start_date > snapshot_iso
+    )
+    
+    avg_salary = salary_sum / salary_count if salary_count else 0
+    total_employees = employees or 1  # Avoid division by zero
+    
+    return {
+        "organization_id": organization_id,
+        "snapshot_date": snapshot_iso,
+        "total_active_employees": employees if total_active is None else total_active,
+        "average_pensionable_salary": round(avg_salary, 2),
+        "total_salary_under_management": round(salary_sum, 2),
+        "pending_pension_activations": pending_count,
+        "pension_participation_rate": round((counters["pension_active_count"] / total_employees) * 100, 2),
+        "group_life_coverage_rate": round((counters["group_life_count"] / total_employees) * 100, 2),
+        "gci_coverage_rate": round((counters["gci_count"] / total_employees) * 100, 2),
+        "gip_coverage_rate": round((counters["gip_count"] / total_employees) * 100, 2),
+        "bupa_coverage_rate": round((counters["bupa_count"] / total_employees) * 100, 2),
+        "gender_male_count": counters["gender_male_count"],
+        "gender_female_count": counters["gender_female_count"],
+        "gender_other_count": counters["gender_other_count"],
+        "uk_resident_count": counters["uk_resident_count"],
+        "non_uk_resident_count": counters["non_uk_resident_count"],
+        "io_uploads_completed": counters["io_uploads_completed"],
+        "pension_packs_sent": counters["pension_packs_sent"]
+    }
+
+
+def parse_salary(raw: Any, decrypted: Any) -> Optional[float]:
+    """
+    Parse a stored pensionable_salary for KPI sums
+    
+    Args:
+        raw: Value as stored (ciphertext, number or plaintext string)
+        decrypted: Same value after decryption
+    
+    Returns:
+        Salary as float, or None if it cannot be used
+    """
+    try:
+        if get_encryption_service().is_encrypted(raw):
+            return float(decrypted)
+        if isinstance(raw, (int, float)):
+            return float(raw)
+        if isinstance(raw, str) and raw.replace(".", "").replace("-", "").isdigit():
+            return float(raw)
+    except (ValueError, TypeError) as e:
+        logger.debug(f"Failed to decrypt/parse salary: {e}")
+    return None
+
+
+def age_bracket_counts(birth_dates: Iterable[Any], today: date) -> Dict[str, int]:
+    """
+    Count decrypted dates of birth per AGE_BRACKETS entry
+    
+    Values that are missing or not ISO dates are skipped.
+    """
+    counts = [0] * len(AGE_BRACKETS)
+    for dob in birth_dates:
+        if not dob:
+            continue
+        try:
+            if isinstance(dob, datetime):
+                birth_date = dob.date()
+            elif isinstance(dob, date):
+                birth_date = dob
+            else:
+                birth_date = date.fromisoformat(str(dob))
+        except ValueError:
+            continue
+        age = (today - birth_date).days // 365
+        counts[bisect.bisect_left(AGE_BRACKET_UPPER_BOUNDS, age)] += 1
+    return dict(zip(AGE_BRACKETS, counts))
+
 
 class KPISnapshotService:
     """Service for managing KPI snapshots"""
     
     def __init__(self):
-        self.db = db_service.client
+        self.db = db_service
+        # { organization_id: (snapshot_date, data version) } last kpi_analytics_snapshots row this process wrote
+        self._stored_analytics: Dict[str, Tuple[str, int]] = {}
     
     async def calculate_and_store_snapshot(self, organization_id: str, snapshot_date: Optional[date] = None) -> Dict[str, Any]:
         """
         Calculate current KPI metrics and store as a snapshot
         
+        All metrics come from one scan of the organization's active employees
+        (paged for very large orgs) instead of one query per metric.
+        
         Args:
             organization_id: Organization UUID
             snapshot_date: Date for the snapshot (defaults to today)
@@ -32,123 +238,22 @@ class KPISnapshotService:
         if snapshot_date is None:
             snapshot_date = date.today()
         
+        # Concurrent requests for the same org/date share one scan and one upsert
+        return await single_flight.do(
+            f"kpi_snapshot:{organization_id}:{snapshot_date.isoformat()}",
+            lambda: self._calculate_and_store_snapshot(organization_id, snapshot_date)
+        )
+    
+    async def _calculate_and_store_snapshot(self, organization_id: str, snapshot_date: date) -> Dict[str, Any]:
+        """Scan, build and upsert one snapshot (see calculate_and_store_snapshot)"""
         try:
             logger.info(f"Calculating KPI snapshot for org {organization_id} on {snapshot_date}")
             
-            # 1. Total Active Employees
-            active_response = self.db.table("employees")\
-                .select("id", count="exact")\
-                .eq("organization_id", organization_id)\
-                .eq("service_status", "Active")\
-                .execute()
-            
-            total_active = active_response.count or 0
-            
-            # 2. Calculate salaries
-            salary_response = self.db.table("employees")\
-                .select("pensionable_salary")\
-                .eq("organization_id", organization_id)\
-                .eq("service_status", "Active")\
-                .not_.is_("pensionable_salary", "null")\
-                .execute()
-            
-            salaries = []
-            for emp in salary_response.data:
-                try:
-                    salary_str = emp.get("pensionable_salary", "0")
-                    # Decrypt if encrypted
-                    if salary_str and isinstance(salary_str, str) and salary_str.startswith("Z0FBQUFB"):
-                        decrypted_salary = get_encryption_service().decrypt(salary_str)
-                        salaries.append(float(decrypted_salary))
-                    elif isinstance(salary_str, (int, float)):
-                        salaries.append(float(salary_str))
-                    elif isinstance(salary_str, str) and salary_str.replace(".", "").replace("-", "").isdigit():
-                        salaries.append(float(salary_str))
-                except (ValueError, TypeError) as e:
-                    logger.debug(f"Failed to decrypt/parse salary: {e}")
-                    continue
-            
-            avg_salary = sum(salaries) / len(salaries) if salaries else 0
-            total_salary = sum(salaries)
-            
-            # 3. Pending Pension Activations
-            pending_response = self.db.table("employees")\
-                .select("id", count="exact")\
-                .eq("organization_id", organization_id)\
-                .eq("service_status", "Active")\
-                .gt("pension_start_date", snapshot_date.isoformat())\
-                .execute()
-            
-            pending_count = pending_response.count or 0
-            
-            # 4. Coverage rates
-            coverage_response = self.db.table("employees")\
-                .select("is_pension_active, has_group_life, has_gci, has_gip, has_bupa")\
-                .eq("organization_id", organization_id)\
-                .eq("service_status", "Active")\
-                .execute()
-            
-            pension_active_count = sum(1 for emp in coverage_response.data if emp.get("is_pension_active"))
-            group_life_count = sum(1 for emp in coverage_response.data if emp.get("has_group_life"))
-            gci_count = sum(1 for emp in coverage_response.data if emp.get("has_gci"))
-            gip_count = sum(1 for emp in coverage_response.data if emp.get("has_gip"))
-            bupa_count = sum(1 for emp in coverage_response.data if emp.get("has_bupa"))
-            
-            total_employees = len(coverage_response.data) or 1  # Avoid division by zero
-            
-            pension_rate = (pension_active_count / total_employees) * 100
-            group_life_rate = (group_life_count / total_employees) * 100
-            gci_rate = (gci_count / total_employees) * 100
-            gip_rate = (gip_count / total_employees) * 100
-            bupa_rate = (bupa_count / total_employees) * 100
-            
-            # 5. Demographics
-            demo_response = self.db.table("employees")\
-                .select("legal_gender, uk_resident")\
-                .eq("organization_id", organization_id)\
-                .eq("service_status", "Active")\
-                .execute()
-            
-            gender_male = sum(1 for emp in demo_response.data if emp.get("legal_gender") == "Male")
-            gender_female = sum(1 for emp in demo_response.data if emp.get("legal_gender") == "Female")
-            gender_other = sum(1 for emp in demo_response.data if emp.get("legal_gender") not in ["Male", "Female"])
-            uk_resident = sum(1 for emp in demo_response.data if emp.get("uk_resident") is True)
-            non_uk_resident = sum(1 for emp in demo_response.data if emp.get("uk_resident") is False)
-            
-            # 6. IO Upload Status and Send Pension Pack counts
-            status_response = self.db.table("employees")\
-                .select("io_upload_status, send_pension_pack")\
-                .eq("organization_id", organization_id)\
-                .eq("service_status", "Active")\
-                .execute()
-            
-            io_uploads_completed = sum(1 for emp in status_response.data if emp.get("io_upload_status") is True)
-            pension_packs_sent = sum(1 for emp in status_response.data if emp.get("send_pension_pack") is True)
-            
-            # Prepare snapshot data
-            snapshot_data = {
-                "organization_id": organization_id,
-                "snapshot_date": snapshot_date.isoformat(),
-                "total_active_employees": total_active,
-                "average_pensionable_salary": round(avg_salary, 2),
-                "total_salary_under_management": round(total_salary, 2),
-                "pending_pension_activations": pending_count,
-                "pension_participation_rate": round(pension_rate, 2),
-                "group_life_coverage_rate": round(group_life_rate, 2),
-                "gci_coverage_rate": round(gci_rate, 2),
-                "gip_coverage_rate": round(gip_rate, 2),
-                "bupa_coverage_rate": round(bupa_rate, 2),
-                "gender_male_count": gender_male,
-                "gender_female_count": gender_female,
-                "gender_other_count": gender_other,
-                "uk_resident_count": uk_resident,
-                "non_uk_resident_count": non_uk_resident,
-                "io_uploads_completed": io_uploads_completed,
-                "pension_packs_sent": pension_packs_sent
-            }
+            counters, total_active = await self.count_active_employees(organization_id)
+            snapshot_data = snapshot_from_counters(organization_id, snapshot_date, counters, total_active)
             
             # Store snapshot (upsert to handle re-runs)
-            response = self.db.table("kpi_snapshots")\
+            response = await self.db.table("kpi_snapshots")\
                 .upsert(snapshot_data, on_conflict="organization_id,snapshot_date")\
                 .execute()
             
@@ -159,10 +264,179 @@ class KPISnapshotService:
             logger.error(f"Failed to calculate/store KPI snapshot: {str(e)}")
             raise
     
-    def get_snapshot(self, organization_id: str, snapshot_date: date) -> Optional[Dict[str, Any]]:
+    async def count_active_employees(self, organization_id: str) -> Tuple[Dict[str, Any], int]:
+        """
+        Full recompute of the KPI counters from the employees table
+        
+        Returns:
+            (counters, exact active count)
+        """
+        rows, total_active = await self._fetch_active_employees(organization_id)
+        salaries = await self.row_salaries(rows)
+        
+        counters = empty_counters()
+        for emp, salary in zip(rows, salaries):
+            add_employee(counters, emp, salary)
+        return counters, total_active
+    
+    async def _fetch_active_employees(self, organization_id: str) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Fetch the snapshot columns of every active employee in one pass
+        
+        Returns:
+            (rows, exact active count)
+        """
+        rows: List[Dict[str, Any]] = []
+        total_active = 0
+        last_id = None
+        
+        while True:
+            query = self.db.table("employees")\
+                .select(KPI_SNAPSHOT_COLUMNS, count="exact" if last_id is None else None)\
+                .eq("organization_id", organization_id)\
+                .eq("service_status", "Active")
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            response = await query.order("id").limit(KPI_FETCH_PAGE_SIZE).execute()
+            
+            if last_id is None:
+                total_active = response.count or 0
+            rows.extend(response.data)
+            
+            if len(response.data) < KPI_FETCH_PAGE_SIZE:
+                break
+            last_id = response.data[-1]["id"]
+        
+        return rows, total_active
+    
+    async def get_analytics_histograms(self, organization_id: str, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Distributions of active employees for the analytics dashboard
+        
+        Everything except age comes from one GROUPING SETS query
+        (kpi_analytics_distributions RPC); age needs only a date_of_birth scan
+        with batched decryption.
+        
+        Returns:
+            {"total_employees": int,
+             "company" | "nationality" | "approach" | "gender" | "postcode_area" | "age": {label: count},
+             "flags": {"pension" | "group_life" | "gci" | "gip" | "bupa" | "uk_resident" | "io_uploaded": count}}
+        """
+        distributions, birth_dates = await asyncio.gather(
+            self.db.rpc("kpi_analytics_distributions", {"p_organization_id": organization_id}).execute(),
+            self._fetch_birth_dates(organization_id)
+        )
+        
+        histograms: Dict[str, Any] = {dimension: {} for dimension in ANALYTICS_DIMENSIONS}
+        histograms["flags"] = {flag: 0 for flag in ANALYTICS_FLAGS}
+        histograms["total_employees"] = 0
+        
+        for row in distributions.data or []:
+            dimension, value, count = row["dimension"], row["value"], row["employee_count"]
+            if dimension == "total":
+                histograms["total_employees"] = count
+            elif dimension in histograms["flags"]:
+                if value == "true":
+                    histograms["flags"][dimension] = count
+            elif dimension in histograms and value is not None:
+                histograms[dimension][value] = count
+        
+        histograms["age"] = age_bracket_counts(birth_dates, today or date.today())
+        return histograms
+    
+    async def get_analytics(self, organization_id: str, target_date: Optional[date] = None) -> Optional[Dict[str, Any]]:
+        """
+        Analytics histograms as of target_date
+        
+        Today (or no date) is computed live and stored whenever the org's
+        response_cache data version has moved since this process last stored it,
+        so each day's row ends up holding the last state a dashboard load saw
+        after the day's final write. Past dates are read from
+        kpi_analytics_snapshots (latest row on or before target_date).
+        
+        Returns:
+            get_analytics_histograms() output plus "snapshot_date", or None if
+            no snapshot exists on or before target_date
+        """
+        today = date.today()
+        if target_date is not None and target_date < today:
+            return await self.get_analytics_snapshot(organization_id, target_date)
+        
+        # Read the version first so a write landing mid-computation triggers another store
+        version = response_cache.version(organization_id)
+        histograms = await self.get_analytics_histograms(organization_id, today)
+        if self._stored_analytics.get(organization_id) != (today.isoformat(), version):
+            try:
+                await self.store_analytics_snapshot(organization_id, today, histograms, version)
+            except Exception as e:
+                logger.warning(f"Failed to store analytics snapshot for org {organization_id}: {str(e)}")
+        
+        return {**histograms, "snapshot_date": today.isoformat()}
+    
+    async def store_analytics_snapshot(
+        self,
+        organization_id: str,
+        snapshot_date: date,
+        histograms: Dict[str, Any],
+        version: int,
+    ) -> None:
+        """Upsert one day's histograms (computed at response_cache data version) into kpi_analytics_snapshots"""
+        await self.db.table("kpi_analytics_snapshots").upsert({
+            "organization_id": organization_id,
+            "snapshot_date": snapshot_date.isoformat(),
+            **{column: histograms[column] for column in ANALYTICS_HISTOGRAM_COLUMNS},
+        }, on_conflict="organization_id,snapshot_date").execute()
+        self._stored_analytics[organization_id] = (snapshot_date.isoformat(), version)
+    
+    async def get_analytics_snapshot(self, organization_id: str, target_date: date) -> Optional[Dict[str, Any]]:
+        """Most recent stored histograms on or before target_date"""
+        response = await self.db.table("kpi_analytics_snapshots")\
+            .select(", ".join(("snapshot_date",) + ANALYTICS_HISTOGRAM_COLUMNS))\
+            .eq("organization_id", organization_id)\
+            .lte("snapshot_date", target_date.isoformat())\
+            .order("snapshot_date", desc=True)\
+            .limit(1)\
+            .execute()
+        
+        return response.data[0] if response.data else None
+    
+    async def _fetch_birth_dates(self, organization_id: str) -> List[Any]:
+        """Decrypted date_of_birth of every active employee (id keyset pages)"""
+        rows: List[Dict[str, Any]] = []
+        last_id = None
+        
+        while True:
+            query = self.db.table("employees")\
+                .select("id, date_of_birth")\
+                .eq("organization_id", organization_id)\
+                .eq("service_status", "Active")
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            response = await query.order("id").limit(KPI_FETCH_PAGE_SIZE).execute()
+            
+            rows.extend(row for row in response.data if row.get("date_of_birth"))
+            if len(response.data) < KPI_FETCH_PAGE_SIZE:
+                break
+            last_id = response.data[-1]["id"]
+        
+        decrypted = await get_encryption_service().decrypt_many(rows, ("date_of_birth",))
+        return [row["date_of_birth"] for row in decrypted]
+    
+    async def row_salaries(self, rows: List[Dict[str, Any]]) -> List[Optional[float]]:
+        """Decrypt (batched) and parse each row's pensionable salary (None if unusable)"""
+        encryption = get_encryption_service()
+        decrypted_rows = await encryption.decrypt_many(rows, ("pensionable_salary",))
+        
+        return [
+            parse_salary(emp["pensionable_salary"], decrypted["pensionable_salary"])
+            if emp.get("pensionable_salary") is not None else None
+            for emp, decrypted in zip(rows, decrypted_rows)
+        ]
+    
+    async def get_snapshot(self, organization_id: str, snapshot_date: date) -> Optional[Dict[str, Any]]:
         """Get a specific snapshot by date"""
         try:
-            response = self.db.table("kpi_snapshots")\
+            response = await self.db.table("kpi_snapshots")\
                 .select("*")\
                 .eq("organization_id", organization_id)\
                 .eq("snapshot_date", snapshot_date.isoformat())\
@@ -175,26 +449,10 @@ class KPISnapshotService:
             logger.error(f"Failed to get snapshot: {str(e)}")
             return None
     
-    def get_snapshots_range(self, organization_id: str, start_date: date, end_date: date) -> List[Dict[str, Any]]:
-        """Get snapshots within a date range"""
-        try:
-            response = self.db.table("kpi_snapshots")\
-                .select("*")\
-                .eq("organization_id", organization_id)\
-                .gte("snapshot_date", start_date.isoformat())\
-                .lte("snapshot_date", end_date.isoformat())\
-                .order("snapshot_date", desc=True)\
-                .execute()
-            
-            return response.data or []
-        except Exception as e:
-            logger.error(f"Failed to get snapshots range: {str(e)}")
-            return []
-    
-    def get_latest_snapshot(self, organization_id: str) -> Optional[Dict[str, Any]]:
+    async def get_latest_snapshot(self, organization_id: str) -> Optional[Dict[str, Any]]:
         """Get the most recent snapshot"""
         try:
-            response = self.db.table("kpi_snapshots")\
+            response = await self.db.table("kpi_snapshots")\
                 .select("*")\
                 .eq("organization_id", organization_id)\
                 .order("snapshot_date", desc=True)\
@@ -207,7 +465,152 @@ class KPISnapshotService:
         except Exception as e:
             logger.error(f"Failed to get latest snapshot: {str(e)}")
             return None
-    
+
+    async def get_oldest_snapshot(
+        self,
+        organization_id: str,
+        end_date: date,
+        start_date: Optional[date] = None,
+        columns: str = "*",
+    ) -> Optional[Dict[str, Any]]:
+        """First snapshot on or before end_date (and on or after start_date, if given)"""
+        try:
+            query = self.db.table("kpi_snapshots")\
+                .select(columns)\
+                .eq("organization_id", organization_id)\
+                .lte("snapshot_date", end_date.isoformat())
+            if start_date is not None:
+                query = query.gte("snapshot_date", start_date.isoformat())
+            response = await query.order("snapshot_date").limit(1).execute()
+
+            if response.data:
+                return response.data[0]
+            return None
+        except Exception as e:
+            logger.error(f"Failed to get oldest snapshot: {str(e)}")
+            return None
+
+    async def get_oldest_snapshot_date(self, organization_id: str, end_date: date) -> Optional[date]:
+        """Date of the first snapshot on or before end_date"""
+        snapshot = await self.get_oldest_snapshot(organization_id, end_date, columns="snapshot_date")
+        return date.fromisoformat(snapshot["snapshot_date"]) if snapshot else None
+
+    async def get_snapshot_series(
+        self,
+        organization_id: str,
+        start_date: date,
+        end_date: date,
+        columns: str = "snapshot_date, total_active_employees",
+    ) -> List[Dict[str, Any]]:
+        """
+        Get selected snapshot columns within a date range, oldest first
+
+        Pages on snapshot_date (unique per organization) so long ranges are
+        not truncated at the PostgREST row limit.
+        """
+        try:
+            rows: List[Dict[str, Any]] = []
+            last_date = None
+
+            while True:
+                query = self.db.table("kpi_snapshots")\
+                    .select(columns)\
+                    .eq("organization_id", organization_id)\
+                    .lte("snapshot_date", end_date.isoformat())
+                if last_date is None:
+                    query = query.gte("snapshot_date", start_date.isoformat())
+                else:
+                    query = query.gt("snapshot_date", last_date)
+                response = await query.order("snapshot_date").limit(KPI_FETCH_PAGE_SIZE).execute()
+
+                rows.extend(response.data)
+                if len(response.data) < KPI_FETCH_PAGE_SIZE:
+                    return rows
+                last_date = response.data[-1]["snapshot_date"]
+        except Exception as e:
+            logger.error(f"Failed to get snapshot series: {str(e)}")
+            return []
+
+    async def get_snapshot_rollups(
+        self,
+        organization_id: str,
+        start_date: date,
+        end_date: date,
+        resolution: Optional[str] = None,
+        columns: str = "*",
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Get the snapshot series for a date range at a resolution, oldest first
+
+        Args:
+            organization_id: Organization UUID
+            start_date: First day of the range
+            end_date: Last day of the range
+            resolution: "day", "week" or "month" (default: pick_snapshot_resolution)
+            columns: kpi_snapshots columns for daily rows (rollup rows carry them all)
+
+        Returns:
+            (resolution, rows). Daily rows are kpi_snapshots rows. Week/month rows
+            are the period's last daily snapshot (snapshot_date is its date) plus
+            period_start, period_end, day_count and stats ({column: {min, max, avg}});
+            periods overlapping the range are included whole.
+        """
+        resolution = resolution or pick_snapshot_resolution(start_date, end_date)
+        if resolution not in SNAPSHOT_RESOLUTION_DAYS:
+            raise ValueError(f"Unknown snapshot resolution: {resolution}")
+        if resolution == "day":
+            return resolution, await self.get_snapshot_series(organization_id, start_date, end_date, columns)
+
+        try:
+            # Periods overlapping the range; even a monthly multi-decade range fits one page
+            response = await self.db.table("kpi_snapshot_rollups")\
+                .select("period_start, period_end, last_snapshot_date, day_count, last_values, stats")\
+                .eq("organization_id", organization_id)\
+                .eq("resolution", resolution)\
+                .gte("period_end", start_date.isoformat())\
+                .lte("period_start", end_date.isoformat())\
+                .order("period_start")\
+                .limit(KPI_FETCH_PAGE_SIZE)\
+                .execute()
+        except Exception as e:
+            logger.error(f"Failed to get snapshot rollups: {str(e)}")
+            return resolution, []
+
+        return resolution, [
+            {
+                **(row.get("last_values") or {}),
+                "organization_id": organization_id,
+                "snapshot_date": row["last_snapshot_date"],
+                "period_start": row["period_start"],
+                "period_end": row["period_end"],
+                "day_count": row["day_count"],
+                "stats": row.get("stats") or {},
+            }
+            for row in response.data
+        ]
+
+    async def get_hire_dates(self, organization_id: str, start_date: date, end_date: date) -> List[date]:
+        """Creation date (UTC) of every employee created between start_date and end_date inclusive"""
+        hire_dates: List[date] = []
+        last_id = None
+
+        while True:
+            query = self.db.table("employees")\
+                .select("id, created_at")\
+                .eq("organization_id", organization_id)\
+                .gte("created_at", start_date.isoformat())\
+                .lt("created_at", (end_date + timedelta(days=1)).isoformat())
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            response = await query.order("id").limit(KPI_FETCH_PAGE_SIZE).execute()
+
+            hire_dates.extend(
+                date.fromisoformat(row["created_at"][:10]) for row in response.data if row.get("created_at")
+            )
+            if len(response.data) < KPI_FETCH_PAGE_SIZE:
+                return hire_dates
+            last_id = response.data[-1]["id"]
+
     def calculate_trend(self, current_value: float, previous_value: float) -> Dict[str, Any]:
         """Calculate trend percentage and direction"""
         if previous_value == 0:
@@ -0,0 +1,72 @@
+"""
+User Profile Cache - Bounded in-process cache for get_current_user
+
+get_current_user only needs role and organization_id from user_profiles,
+but a dashboard page fires 5-10 API calls in a row. Profiles are cached
+per user with a short TTL and an LRU size limit, and invalidated explicitly
+whenever a role or profile changes (team management, profile updates).
+
+Usage:
+    profile = user_profile_cache.get(user_id)
+    if profile is None:
+        profile = ...  # query user_profiles
+        user_profile_cache.set(user_id, profile)
+"""
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+import logging
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UserProfileCache:
+    """LRU + TTL cache of user_profiles rows keyed by user ID"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # { user_id: (expires_at, profile) } in least-recently-used order
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached profile, or None if missing or expired"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+
+        expires_at, profile = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return None
+
+        self._entries.move_to_end(user_id)
+        return profile
+
+    def set(self, user_id: str, profile: Dict[str, Any]) -> None:
+        """Cache a profile, evicting the least recently used entry when full"""
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, profile)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user's cached profile (call after role/profile changes)"""
+        if self._entries.pop(str(user_id), None) is not None:
+            logger.debug(f"Invalidated cached profile for user {str(user_id)[:8]}...")
+
+    def clear(self) -> None:
+        """Drop all cached profiles"""
+        self._entries.clear()
+
+
+# Singleton instance
+user_profile_cache = UserProfileCache(
+    max_size=settings.PROFILE_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PROFILE_CACHE_TTL_SECONDS,
+)
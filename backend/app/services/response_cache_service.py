@@ -0,0 +1,187 @@
+"""
+Response Cache Service - Per-organization cache for dashboard responses
+
+The executive dashboard endpoints (/api/kpi/workforce, /time-series, /analytics)
+recompute from the database on every page view, while employee data changes a
+few times an hour. Responses are cached per (organization, endpoint, params)
+and tagged with the organization's data version, which every employee and
+change-information write bumps. ETags are derived from the same version, so
+a browser revalidating an unchanged dashboard gets 304 without any query.
+
+Entries also expire after RESPONSE_CACHE_TTL_SECONDS (and ETags roll over on
+the same interval) to pick up changes made outside the API, e.g. SQL scripts
+or the background KPI reconciliation.
+
+Usage:
+    return await response_cache.serve(
+        request, response, org_id, "analytics", {"date": target_date},
+        lambda: compute_analytics(org_id, target_date)
+    )
+
+    response_cache.bump(org_id)  # after any write that affects dashboards
+"""
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
+import hashlib
+import logging
+import os
+import time
+
+from fastapi import Request, Response
+
+from app.config import settings
+from app.services.single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    LRU of computed responses keyed by organization, endpoint and params
+
+    Only used from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = max_entries > 0 and ttl_seconds > 0
+
+        # Random per process so ETags from before a restart never match
+        self._epoch = os.urandom(8).hex()
+        # { organization_id: data version }
+        self._versions: Dict[str, int] = {}
+        # { key: (organization_id, version, expires_at, payload) } in least-recently-used order
+        self._entries: "OrderedDict[str, Tuple[str, int, float, Any]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def version(self, organization_id: str) -> int:
+        """Current data version of an organization"""
+        return self._versions.get(organization_id, 0)
+
+    def bump(self, organization_id: Optional[str]) -> None:
+        """Invalidate every cached response and ETag for an organization"""
+        if not organization_id:
+            return
+        self._versions[organization_id] = self.version(organization_id) + 1
+        self.invalidations += 1
+
+    def key(self, organization_id: str, endpoint: str, params: Dict[str, Any]) -> str:
+        """Cache key; includes today's date since default date ranges depend on it"""
+        normalized = "&".join(f"{name}={params[name]}" for name in sorted(params))
+        return f"{organization_id}:{endpoint}:{date.today().isoformat()}:{normalized}"
+
+    def etag(self, key: str, version: int) -> str:
+        """Strong ETag for a key at a data version (changes every TTL window)"""
+        window = int(time.time() // self.ttl_seconds) if self.ttl_seconds > 0 else 0
+        digest = hashlib.blake2b(
+            f"{self._epoch}:{window}:{version}:{key}".encode("utf-8"), digest_size=16
+        ).hexdigest()
+        return f'"{digest}"'
+
+    def get(self, key: str, version: int) -> Optional[Any]:
+        """Return the cached payload, or None if missing, expired or from an older version"""
+        entry = self._entries.get(key)
+        if entry is None or entry[1] != version or entry[2] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[3]
+
+    def set(self, key: str, organization_id: str, version: int, payload: Any) -> None:
+        """Cache a payload computed at a data version"""
+        if not self.enabled or version != self.version(organization_id):
+            # A write landed while computing - the result may already be stale
+            return
+
+        self._entries[key] = (organization_id, version, time.monotonic() + self.ttl_seconds, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached response"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for logging/monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "organizations": len(self._versions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    async def serve(
+        self,
+        request: Request,
+        response: Response,
+        organization_id: str,
+        endpoint: str,
+        params: Dict[str, Any],
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Return a 304 if the client's ETag is current, else the cached or freshly computed payload
+
+        Args:
+            request: Incoming request (If-None-Match is read from it)
+            response: Response whose ETag/Cache-Control headers are set
+            organization_id: Organization the data belongs to
+            endpoint: Endpoint name used in the cache key
+            params: Query parameters that change the result
+            compute: Coroutine factory producing the payload on a miss (coalesced
+                across concurrent identical requests)
+        """
+        key = self.key(organization_id, endpoint, params)
+        version = self.version(organization_id)
+        if not self.enabled:
+            return await single_flight.do(f"response:{key}:{version}", compute)
+
+        etag = self.etag(key, version)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        response.headers.update(headers)
+
+        payload = self.get(key, version)
+        if payload is None:
+            # Identical concurrent misses share one computation
+            payload = await single_flight.do(f"response:{key}:{version}", compute)
+            self.set(key, organization_id, version, payload)
+        return payload
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header (list, weak validators or *) against an ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+# Singleton instance
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+)
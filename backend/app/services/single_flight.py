@@ -0,0 +1,74 @@
+"""
+Single Flight - Coalesce concurrent identical async computations
+
+When several requests ask for the same expensive result at once (admins of
+one org opening the dashboard together, a browser firing duplicate requests),
+only the first runs the computation; the others await its result. Nothing is
+cached once the computation finishes - see response_cache_service for that.
+
+The computation runs as its own task, so a caller that disconnects (and is
+cancelled) does not cancel it for the others.
+
+Usage:
+    snapshot = await single_flight.do(
+        f"kpi_snapshot:{org_id}:{snapshot_date}",
+        lambda: self._calculate_and_store_snapshot(org_id, snapshot_date)
+    )
+"""
+from typing import Dict, Any, Callable, Awaitable
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Registry of in-flight computations keyed by string"""
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run compute() unless an identical computation is already running
+
+        Args:
+            key: Identifies the computation (include org, endpoint and params)
+            compute: Coroutine factory, only called by the first caller
+
+        Returns:
+            The computation's result (exceptions are raised to every caller)
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logger.debug(f"Joined in-flight computation {key}")
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        """Forget a finished computation"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for logging/monitoring"""
+        return {
+            "in_flight": len(self._in_flight),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
+
+
+# Singleton instance
+single_flight = SingleFlight()
@@ -0,0 +1,176 @@
+"""
+Token Verification Service - Local Supabase JWT verification
+
+Verifies access tokens in-process with SUPABASE_JWT_SECRET (signature,
+expiry and audience) instead of calling Supabase Auth on every request.
+Verified tokens are cached by SHA-256 hash until their `exp` claim.
+
+Revocation:
+    Logout, role changes and password changes call require_remote_check(user_id).
+    Tokens issued before that moment are re-checked against Supabase Auth
+    (which knows about signed-out sessions) instead of being trusted locally.
+
+Usage:
+    claims = await token_verification_service.verify(token)
+    if claims:
+        user_id = claims["sub"]
+"""
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+import asyncio
+import hashlib
+import logging
+import time
+
+import jwt
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenVerificationService:
+    """Verifies Supabase access tokens locally with a bounded cache"""
+
+    def __init__(self):
+        self.secret = settings.SUPABASE_JWT_SECRET
+        self.audience = settings.JWT_AUDIENCE
+        self.max_cache_size = settings.JWT_VERIFY_CACHE_SIZE
+        self.max_token_lifetime = settings.JWT_MAX_LIFETIME_SECONDS
+
+        # { token_hash: claims } in least-recently-used order
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # { user_id: unix timestamp } - tokens issued before this need a remote check
+        self._remote_check_after: Dict[str, float] = {}
+
+    async def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verify an access token and return its claims
+
+        Args:
+            token: Raw JWT access token (without "Bearer ")
+
+        Returns:
+            Verified claims (sub, email, exp, ...), or None if the token is invalid
+        """
+        token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        now = time.time()
+
+        cached = self._cache.get(token_hash)
+        if cached is not None:
+            if cached["exp"] > now:
+                self._cache.move_to_end(token_hash)
+                return cached
+            del self._cache[token_hash]
+
+        try:
+            claims = self._verify_locally(token)
+        except jwt.InvalidAlgorithmError:
+            # Asymmetric signing keys (RS256/ES256) - let Supabase Auth verify it
+            logger.debug("Token not signed with HS256, falling back to remote verification")
+            claims = None
+        except jwt.InvalidTokenError as e:
+            logger.debug(f"Local token verification failed: {e}")
+            return None
+
+        if claims is None or self._needs_remote_check(claims, now):
+            claims = await self._verify_remotely(token)
+
+        if claims is None:
+            return None
+
+        self._store(token_hash, claims)
+        return claims
+
+    def require_remote_check(self, user_id: str) -> None:
+        """
+        Revocation hook - stop trusting the user's existing tokens locally
+
+        Call on logout, role change, password change or member deletion.
+        Tokens issued after this call verify locally again.
+        """
+        if not user_id:
+            return
+
+        self._remote_check_after[str(user_id)] = time.time()
+
+        stale_hashes = [h for h, claims in self._cache.items() if claims.get("sub") == str(user_id)]
+        for token_hash in stale_hashes:
+            del self._cache[token_hash]
+
+        logger.info(f"Cleared {len(stale_hashes)} cached token(s) for user {str(user_id)[:8]}...")
+
+    def clear(self) -> None:
+        """Drop all cached tokens and revocation markers"""
+        self._cache.clear()
+        self._remote_check_after.clear()
+
+    def _verify_locally(self, token: str) -> Dict[str, Any]:
+        """
+        Verify signature, expiry and audience with the project JWT secret
+
+        Raises:
+            jwt.InvalidTokenError: If the token fails any check
+        """
+        return jwt.decode(
+            token,
+            self.secret,
+            algorithms=["HS256"],
+            audience=self.audience,
+            options={"require": ["exp", "sub"]},
+        )
+
+    def _needs_remote_check(self, claims: Dict[str, Any], now: float) -> bool:
+        """Check whether the token predates a revocation for its user"""
+        user_id = claims.get("sub")
+        revoked_at = self._remote_check_after.get(user_id)
+        if revoked_at is None:
+            return False
+
+        # Every token issued before the revocation has expired by now
+        if now - revoked_at > self.max_token_lifetime:
+            del self._remote_check_after[user_id]
+            return False
+
+        return claims.get("iat", 0) <= revoked_at
+
+    async def _verify_remotely(self, token: str) -> Optional[Dict[str, Any]]:
+        """Ask Supabase Auth to validate the token (handles signed-out sessions)"""
+        # Import here to avoid circular dependency
+        from app.services.database_service import create_anon_auth_client
+
+        try:
+            unverified = jwt.decode(token, options={"verify_signature": False})
+        except jwt.InvalidTokenError:
+            return None
+
+        if not unverified.get("exp") or unverified["exp"] <= time.time():
+            return None
+
+        try:
+            # Create fresh client for token validation (prevents JWT contamination)
+            auth_client = create_anon_auth_client()
+            response = await asyncio.to_thread(auth_client.auth.get_user, token)
+        except Exception as e:
+            logger.info(f"Remote token verification failed: {e}")
+            return None
+
+        if not response or not response.user:
+            return None
+
+        return {
+            **unverified,
+            "sub": response.user.id,
+            "email": response.user.email,
+        }
+
+    def _store(self, token_hash: str, claims: Dict[str, Any]) -> None:
+        """Cache verified claims, evicting the least recently used entry when full"""
+        self._cache[token_hash] = claims
+        self._cache.move_to_end(token_hash)
+        while len(self._cache) > self.max_cache_size:
+            self._cache.popitem(last=False)
+
+
+# Singleton instance
+token_verification_service = TokenVerificationService()
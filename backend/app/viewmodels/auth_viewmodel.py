@@ -216,18 +216,11 @@ class AuthViewModel:
             if not auth_response.user or not auth_response.session:
                 return False, None, "Invalid email or password"
             
-            # Create authenticated client with user's token (respects RLS)
-            from supabase import create_client
-            from app.config import settings
-            
-            user_client = create_client(settings.SUPABASE_URL, settings.SUPABASE_ANON_KEY)
-            user_client.auth.set_session(
-                auth_response.session.access_token,
-                auth_response.session.refresh_token
-            )
+            # Query as the user with their token (respects RLS)
+            user_client = db_service.as_user(auth_response.session.access_token)
             
             # Get user profile using authenticated client (auth.uid() will be set from JWT)
-            profile_response = user_client.table("user_profiles").select("*").eq("id", auth_response.user.id).execute()
+            profile_response = await user_client.table("user_profiles").select("*").eq("id", auth_response.user.id).execute()
             profile = profile_response.data[0] if profile_response.data else None
             
             if not profile:
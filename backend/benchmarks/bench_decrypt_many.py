@@ -0,0 +1,115 @@
+"""
+Microbenchmark - decrypting employee PII for list endpoints
+
+Compares the old per-row loop used by get_employees / IO export:
+    [encryption.decrypt_employee_pii(row) for row in rows]
+with the batched API:
+    await encryption.decrypt_many(rows)
+
+Rows carry the three encrypted employee columns (ni_number, pensionable_salary,
+date_of_birth) plus a few plaintext columns. The decrypted-value cache is
+cleared before the cold runs; "decrypt_many (warm cache)" repeats the call the
+way a second dashboard load would. "max loop stall" is the longest
+gap seen by a 1ms ticker task running on the event loop during decryption -
+the time other requests would have been blocked.
+
+Usage (from backend/, with ENCRYPTION_KEY set):
+    python -m benchmarks.bench_decrypt_many
+    python -m benchmarks.bench_decrypt_many --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+from app.services import encryption_service
+from app.services.encryption_service import EncryptionService, shutdown_decrypt_pool
+
+
+def _make_rows(encryption: EncryptionService, count: int) -> list:
+    rows = []
+    for i in range(count):
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "first_name": f"First{i}",
+            "surname": f"Surname{i}",
+            "service_status": "Active",
+            "ni_number": encryption.encrypt(f"QQ{i:06d}C"),
+            "pensionable_salary": encryption.encrypt(str(random.randint(18000, 90000))),
+            "date_of_birth": encryption.encrypt(f"19{random.randint(50, 99)}-0{random.randint(1, 9)}-1{random.randint(0, 9)}"),
+        })
+    return rows
+
+
+async def _timed(coro_factory) -> tuple:
+    """Run a coroutine while measuring elapsed time and the longest event loop stall"""
+    max_stall = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal max_stall
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            max_stall = max(max_stall, now - last)
+            last = now
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    result = await coro_factory()
+    elapsed = time.perf_counter() - start
+    done = True
+    await ticker_task
+    return result, elapsed, max_stall
+
+
+async def run(sizes: list) -> None:
+    encryption = EncryptionService()
+
+    print(f"{'rows':>8}  {'path':<28} {'total':>10} {'per row':>10} {'max loop stall':>15}")
+    for size in sizes:
+        rows = _make_rows(encryption, size)
+
+        async def old_path():
+            return [encryption.decrypt_employee_pii(row) for row in rows]
+
+        async def new_path():
+            return await encryption.decrypt_many(rows)
+
+        encryption.decrypt_cache.clear()
+        expected, old_elapsed, old_stall = await _timed(old_path)
+        encryption.decrypt_cache.clear()
+        result, new_elapsed, new_stall = await _timed(new_path)
+        assert result == expected, "decrypt_many() output differs from decrypt_employee_pii()"
+        warm_result, warm_elapsed, warm_stall = await _timed(new_path)
+        assert warm_result == expected, "cached decrypt_many() output differs"
+
+        for label, elapsed, stall in (
+            ("decrypt_employee_pii loop", old_elapsed, old_stall),
+            ("decrypt_many", new_elapsed, new_stall),
+            ("decrypt_many (warm cache)", warm_elapsed, warm_stall),
+        ):
+            print(
+                f"{size:>8}  {label:<28} {elapsed * 1000:>8.1f}ms "
+                f"{elapsed / size * 1e6:>8.1f}us {stall * 1000:>13.1f}ms"
+            )
+
+    print(f"decrypt cache: {encryption.decrypt_cache.stats()}")
+    shutdown_decrypt_pool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"process pool workers={encryption_service.DECRYPT_MAX_PROCESSES} "
+          f"(used from {encryption_service.DECRYPT_PROCESS_MIN_ROWS} rows)")
+    asyncio.run(run(args.sizes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Microbenchmark - per-request cost of a user-scoped (RLS) Supabase query
+
+Compares the old path used by get_current_user:
+    create_client(anon) + auth.set_session(token) + table(...).execute()
+with the stateless path:
+    await db_service.as_user(token).table(...).execute()
+
+Network is replaced by in-process mock transports, so the numbers are the
+client-side overhead only. --rtt-ms adds a simulated round trip per HTTP call
+(the old path makes two: set_session() calls GET /auth/v1/user).
+
+Usage (from backend/, with the usual env vars set):
+    python -m benchmarks.bench_user_client
+    python -m benchmarks.bench_user_client --iterations 500 --rtt-ms 20
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+import jwt
+from supabase import create_client, ClientOptions
+
+from app.config import settings
+from app.services.database_service import db_service
+
+USER_ID = str(uuid.uuid4())
+
+
+def _make_token() -> str:
+    now = int(time.time())
+    return jwt.encode(
+        {"sub": USER_ID, "aud": "authenticated", "role": "authenticated", "iat": now, "exp": now + 3600},
+        settings.SUPABASE_JWT_SECRET,
+        algorithm="HS256",
+    )
+
+
+def _mock_response(request: httpx.Request) -> httpx.Response:
+    if request.url.path.endswith("/auth/v1/user"):
+        return httpx.Response(200, json={
+            "id": USER_ID,
+            "aud": "authenticated",
+            "created_at": "2024-01-01T00:00:00Z",
+            "app_metadata": {},
+            "user_metadata": {},
+        })
+    return httpx.Response(200, json=[{"id": USER_ID, "role": "admin", "organization_id": str(uuid.uuid4())}])
+
+
+def run_old_path(iterations: int, rtt: float) -> float:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if rtt:
+            time.sleep(rtt)
+        return _mock_response(request)
+
+    http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    token = _make_token()
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        client = create_client(
+            settings.SUPABASE_URL,
+            settings.SUPABASE_ANON_KEY or settings.SUPABASE_KEY,
+            options=ClientOptions(httpx_client=http_client),
+        )
+        client.auth.set_session(token, token)
+        client.table("user_profiles").select("*").eq("id", USER_ID).execute()
+    return (time.perf_counter() - start) / iterations
+
+
+async def run_new_path(iterations: int, rtt: float) -> float:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if rtt:
+            await asyncio.sleep(rtt)
+        return _mock_response(request)
+
+    db_service.rest.session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    token = _make_token()
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await db_service.as_user(token).table("user_profiles").select("*").eq("id", USER_ID).execute()
+    elapsed = (time.perf_counter() - start) / iterations
+
+    await db_service.aclose()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Simulated round trip per HTTP call")
+    args = parser.parse_args()
+    rtt = args.rtt_ms / 1000
+
+    old = run_old_path(args.iterations, rtt)
+    new = asyncio.run(run_new_path(args.iterations, rtt))
+
+    print(f"iterations={args.iterations} simulated_rtt={args.rtt_ms:.1f}ms")
+    print(f"create_client + set_session + query : {old * 1000:8.3f} ms/request")
+    print(f"db_service.as_user(token) + query   : {new * 1000:8.3f} ms/request")
+    print(f"saving                              : {(old - new) * 1000:8.3f} ms/request ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Maintenance script - populate employee blind index columns
+
+Decrypts ni_number / date_of_birth for every employee, computes the blind
+indexes (BlindIndexService) and writes the ones that are missing or stale.
+Run it once after sql_updates/add_employee_blind_indexes.sql and again
+whenever BLIND_INDEX_KEY changes. Safe to re-run; unchanged rows are skipped.
+
+Usage (from backend/, with the usual env vars and BLIND_INDEX_KEY set):
+    python -m scripts.backfill_blind_indexes --dry-run
+    python -m scripts.backfill_blind_indexes --organization-id <uuid>
+    python -m scripts.backfill_blind_indexes --batch-size 1000 --concurrency 20
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from app.services.database_service import db_service
+from app.services.encryption_service import get_encryption_service
+from app.services.blind_index_service import blind_index_service, BLIND_INDEX_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill(organization_id: Optional[str], batch_size: int, concurrency: int, dry_run: bool) -> Dict[str, int]:
+    """Scan employees in id order and update stale blind indexes"""
+    encryption = get_encryption_service()
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"scanned": 0, "updated": 0}
+    columns = ["id", "organization_id"] + list(BLIND_INDEX_COLUMNS) + list(BLIND_INDEX_COLUMNS.values())
+
+    async def update_row(row_id: str, changes: Dict[str, Optional[str]]) -> None:
+        async with semaphore:
+            await db_service.table("employees").update(changes).eq("id", row_id).execute()
+
+    last_id: Optional[str] = None
+    while True:
+        query = db_service.table("employees").select(",".join(columns))
+        if organization_id:
+            query = query.eq("organization_id", organization_id)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        result = await query.order("id").limit(batch_size).execute()
+
+        rows = result.data
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+        stats["scanned"] += len(rows)
+
+        decrypted_rows = await encryption.decrypt_many(rows, tuple(BLIND_INDEX_COLUMNS))
+        pending = []
+        for row in decrypted_rows:
+            changes = {}
+            for field, index_column in BLIND_INDEX_COLUMNS.items():
+                expected = blind_index_service.compute(field, row.get(field), row["organization_id"])
+                if row.get(index_column) != expected:
+                    changes[index_column] = expected
+            if changes:
+                stats["updated"] += 1
+                if not dry_run:
+                    pending.append(update_row(row["id"], changes))
+
+        if pending:
+            await asyncio.gather(*pending)
+
+        logger.info(f"Scanned {stats['scanned']} employees, {stats['updated']} needed new indexes")
+
+        if len(rows) < batch_size:
+            break
+
+    return stats
+
+
+async def run(organization_id: Optional[str], batch_size: int, concurrency: int, dry_run: bool) -> None:
+    try:
+        start = time.perf_counter()
+        stats = await backfill(organization_id, batch_size, concurrency, dry_run)
+        action = "would update" if dry_run else "updated"
+        print(f"employees scanned={stats['scanned']} {action}={stats['updated']} ({time.perf_counter() - start:.1f}s)")
+    finally:
+        await db_service.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--organization-id", help="Only backfill one organization")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent row updates")
+    parser.add_argument("--dry-run", action="store_true", help="Count stale rows without writing")
+    args = parser.parse_args()
+
+    if not blind_index_service.enabled:
+        parser.error("BLIND_INDEX_KEY is not set")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(run(args.organization_id, args.batch_size, args.concurrency, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Maintenance script - reconstruct historical KPI snapshots
+
+Rebuilds one kpi_snapshots row per day for a past date range from current
+employee rows, creation/pension start dates and the employee audit log
+(KPIBackfillService), so trend comparisons have history before snapshots
+were first written. Existing rows in the range are overwritten. Safe to
+re-run.
+
+Usage (from backend/, with the usual env vars set):
+    python -m scripts.backfill_kpi_snapshots --start-date 2025-01-01 --dry-run
+    python -m scripts.backfill_kpi_snapshots --start-date 2025-01-01 --end-date 2025-06-30
+    python -m scripts.backfill_kpi_snapshots --start-date 2025-01-01 --organization-id <uuid>
+"""
+import argparse
+import asyncio
+import logging
+import time
+from datetime import date, timedelta
+from typing import List, Optional
+
+from app.services.database_service import db_service
+from app.services.kpi_backfill_service import kpi_backfill_service
+
+logger = logging.getLogger(__name__)
+
+
+async def organization_ids(organization_id: Optional[str]) -> List[str]:
+    """The requested organization, or every organization"""
+    if organization_id:
+        return [organization_id]
+
+    ids: List[str] = []
+    last_id: Optional[str] = None
+    while True:
+        query = db_service.table("organizations").select("id")
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        result = await query.order("id").limit(1000).execute()
+        ids.extend(row["id"] for row in result.data)
+        if len(result.data) < 1000:
+            return ids
+        last_id = result.data[-1]["id"]
+
+
+async def run(organization_id: Optional[str], start_date: date, end_date: date, dry_run: bool) -> None:
+    try:
+        start = time.perf_counter()
+        failed = 0
+        for org_id in await organization_ids(organization_id):
+            try:
+                result = await kpi_backfill_service.backfill(org_id, start_date, end_date, dry_run)
+            except Exception as e:
+                failed += 1
+                logger.error(f"Backfill failed for org {org_id}: {str(e)}")
+                continue
+            action = "would write" if dry_run else "wrote"
+            print(
+                f"org={org_id} {action}={result['days']} days "
+                f"employees={result['employees_scanned']} audit_events={result['audit_events_replayed']} "
+                f"unrestorable_deletions={result['unrestorable_deletions']}"
+            )
+        print(f"done in {time.perf_counter() - start:.1f}s, {failed} organizations failed")
+    finally:
+        await db_service.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start-date", required=True, type=date.fromisoformat, help="First day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--end-date", type=date.fromisoformat, help="Last day to rebuild (default: yesterday)")
+    parser.add_argument("--organization-id", help="Only backfill one organization")
+    parser.add_argument("--dry-run", action="store_true", help="Compute without writing")
+    args = parser.parse_args()
+
+    end_date = args.end_date or date.today() - timedelta(days=1)
+    if args.start_date > end_date:
+        parser.error("--start-date must be on or before --end-date")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(run(args.organization_id, args.start_date, end_date, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Maintenance script - rewrite stored v1 ciphertexts in the v2 format
+
+v1 values are base64(Fernet token); v2 values are "enc:v2:" + Fernet token.
+The conversion just strips the extra base64 layer (EncryptionService.upgrade_ciphertext),
+so no decryption happens and ENCRYPTION_KEY is not used. Readers accept both
+formats, so the script can run while the app is live and can be re-run safely.
+
+Each table is scanned in id order, batch by batch; rows holding at least one
+v1 value are updated one by one with bounded concurrency. Note that row
+updates fire the tables' updated_at / audit triggers like any other write.
+
+Usage (from backend/, with the usual env vars set):
+    python -m scripts.migrate_ciphertext_v2 --dry-run
+    python -m scripts.migrate_ciphertext_v2 --tables employees change_information
+    python -m scripts.migrate_ciphertext_v2 --batch-size 1000 --concurrency 20
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.services.database_service import db_service
+from app.services.encryption_service import CIPHERTEXT_V1_PREFIX, EncryptionService
+
+logger = logging.getLogger(__name__)
+
+# Encrypted columns per table; json_columns are jsonb and cannot be LIKE-filtered
+ENCRYPTED_COLUMNS: Dict[str, Tuple[List[str], List[str]]] = {
+    "employees": (["ni_number", "pensionable_salary", "date_of_birth"], []),
+    "change_information": (
+        ["new_name", "new_address", "new_salary", "new_employee_contribution", "new_employer_contribution"],
+        [],
+    ),
+    "form_submissions": ([], ["submission_data"]),
+    "audit_logs": (["details"], []),
+}
+
+
+async def migrate_table(table: str, batch_size: int, concurrency: int, dry_run: bool) -> Dict[str, int]:
+    """Upgrade every v1 value in one table; returns scanned/updated/value counts"""
+    text_columns, json_columns = ENCRYPTED_COLUMNS[table]
+    columns = text_columns + json_columns
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"scanned": 0, "updated": 0, "values": 0}
+
+    async def update_row(row_id: str, changes: Dict[str, str]) -> None:
+        async with semaphore:
+            await db_service.table(table).update(changes).eq("id", row_id).execute()
+
+    last_id: Optional[str] = None
+    while True:
+        query = db_service.table(table).select(",".join(["id"] + columns))
+        if not json_columns:
+            # Only rows that still hold a v1 value somewhere
+            query = query.or_(",".join(f"{col}.like.{CIPHERTEXT_V1_PREFIX}*" for col in text_columns))
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        result = await query.order("id").limit(batch_size).execute()
+
+        rows = result.data
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+        stats["scanned"] += len(rows)
+
+        pending = []
+        for row in rows:
+            changes = {}
+            for col in columns:
+                upgraded = EncryptionService.upgrade_ciphertext(row.get(col))
+                if upgraded is not None:
+                    changes[col] = upgraded
+            if changes:
+                stats["updated"] += 1
+                stats["values"] += len(changes)
+                if not dry_run:
+                    pending.append(update_row(row["id"], changes))
+
+        if pending:
+            await asyncio.gather(*pending)
+
+        logger.info(f"{table}: scanned {stats['scanned']}, upgraded {stats['updated']} rows so far")
+
+        if len(rows) < batch_size:
+            break
+
+    return stats
+
+
+async def run(tables: List[str], batch_size: int, concurrency: int, dry_run: bool) -> None:
+    try:
+        for table in tables:
+            start = time.perf_counter()
+            stats = await migrate_table(table, batch_size, concurrency, dry_run)
+            action = "would upgrade" if dry_run else "upgraded"
+            print(
+                f"{table:<20} scanned={stats['scanned']:<8} {action} {stats['values']} values "
+                f"in {stats['updated']} rows ({time.perf_counter() - start:.1f}s)"
+            )
+    finally:
+        await db_service.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", nargs="+", choices=sorted(ENCRYPTED_COLUMNS), default=list(ENCRYPTED_COLUMNS))
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent row updates")
+    parser.add_argument("--dry-run", action="store_true", help="Count v1 values without writing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(run(args.tables, args.batch_size, args.concurrency, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
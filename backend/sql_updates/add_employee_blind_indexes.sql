@@ -0,0 +1,36 @@
+-- Blind index columns for searching encrypted employee fields
+-- ni_number and date_of_birth are Fernet-encrypted (random IV), so they cannot be
+-- matched in SQL. The API stores an organization-scoped HMAC-SHA256 of the
+-- normalized plaintext next to them (see app/services/blind_index_service.py).
+-- After running this, populate existing rows with:
+--   python -m scripts.backfill_blind_indexes
+
+ALTER TABLE public.employees
+ADD COLUMN IF NOT EXISTS ni_number_bidx TEXT NULL,
+ADD COLUMN IF NOT EXISTS email_bidx TEXT NULL,
+ADD COLUMN IF NOT EXISTS dob_bidx TEXT NULL;
+
+-- Exact-match lookups always run inside one organization
+CREATE INDEX IF NOT EXISTS idx_employees_org_ni_number_bidx
+ON public.employees USING btree (organization_id, ni_number_bidx)
+TABLESPACE pg_default
+WHERE ni_number_bidx IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_employees_org_email_bidx
+ON public.employees USING btree (organization_id, email_bidx)
+TABLESPACE pg_default
+WHERE email_bidx IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_employees_org_dob_bidx
+ON public.employees USING btree (organization_id, dob_bidx)
+TABLESPACE pg_default
+WHERE dob_bidx IS NOT NULL;
+
+COMMENT ON COLUMN public.employees.ni_number_bidx IS 'HMAC-SHA256 blind index of normalized NI number (uppercase, no spaces), scoped to organization';
+COMMENT ON COLUMN public.employees.email_bidx IS 'HMAC-SHA256 blind index of normalized email (trimmed, lowercase), scoped to organization';
+COMMENT ON COLUMN public.employees.dob_bidx IS 'HMAC-SHA256 blind index of date of birth (YYYY-MM-DD), scoped to organization';
+
+-- Verify
+SELECT column_name, data_type
+FROM information_schema.columns
+WHERE table_name = 'employees' AND column_name LIKE '%_bidx';
@@ -0,0 +1,38 @@
+-- Keyset pagination indexes for GET /api/employees
+-- The employee list pages with (sort_field, id) > (cursor_value, cursor_id)
+-- inside one organization, so each sort field needs an
+-- (organization_id, sort_field, id) index to seek straight to the next page.
+
+CREATE INDEX IF NOT EXISTS idx_employees_org_created_at_id
+ON public.employees USING btree (organization_id, created_at DESC, id DESC)
+TABLESPACE pg_default;
+
+CREATE INDEX IF NOT EXISTS idx_employees_org_updated_at_id
+ON public.employees USING btree (organization_id, updated_at DESC, id DESC)
+TABLESPACE pg_default;
+
+CREATE INDEX IF NOT EXISTS idx_employees_org_surname_id
+ON public.employees USING btree (organization_id, surname, id)
+TABLESPACE pg_default;
+
+CREATE INDEX IF NOT EXISTS idx_employees_org_first_name_id
+ON public.employees USING btree (organization_id, first_name, id)
+TABLESPACE pg_default;
+
+CREATE INDEX IF NOT EXISTS idx_employees_org_employment_start_date_id
+ON public.employees USING btree (organization_id, employment_start_date, id)
+TABLESPACE pg_default;
+
+CREATE INDEX IF NOT EXISTS idx_employees_org_pension_start_date_id
+ON public.employees USING btree (organization_id, pension_start_date, id)
+TABLESPACE pg_default;
+
+-- Filter used together with the default created_at sort
+CREATE INDEX IF NOT EXISTS idx_employees_org_company_created_at
+ON public.employees USING btree (organization_id, company_id, created_at DESC, id DESC)
+TABLESPACE pg_default;
+
+-- Verify indexes
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename = 'employees' AND indexname LIKE 'idx_employees_org_%';
@@ -0,0 +1,97 @@
+-- Per-organization running KPI aggregates
+-- Maintained incrementally by the API on every employee create/update/delete
+-- (apply_kpi_aggregate_delta) and periodically reconciled against a full
+-- recompute, so today's KPI snapshot is a single-row read.
+
+CREATE TABLE IF NOT EXISTS public.kpi_aggregates (
+    organization_id UUID PRIMARY KEY,
+    
+    -- Active employee counters
+    total_active INTEGER NOT NULL DEFAULT 0,
+    salary_count INTEGER NOT NULL DEFAULT 0,
+    salary_sum NUMERIC NOT NULL DEFAULT 0,
+    
+    -- Coverage counters
+    pension_active_count INTEGER NOT NULL DEFAULT 0,
+    group_life_count INTEGER NOT NULL DEFAULT 0,
+    gci_count INTEGER NOT NULL DEFAULT 0,
+    gip_count INTEGER NOT NULL DEFAULT 0,
+    bupa_count INTEGER NOT NULL DEFAULT 0,
+    
+    -- Demographics counters
+    gender_male_count INTEGER NOT NULL DEFAULT 0,
+    gender_female_count INTEGER NOT NULL DEFAULT 0,
+    gender_other_count INTEGER NOT NULL DEFAULT 0,
+    uk_resident_count INTEGER NOT NULL DEFAULT 0,
+    non_uk_resident_count INTEGER NOT NULL DEFAULT 0,
+    
+    -- Status counters
+    io_uploads_completed INTEGER NOT NULL DEFAULT 0,
+    pension_packs_sent INTEGER NOT NULL DEFAULT 0,
+    
+    -- {"YYYY-MM-DD": count} of active employees per pension_start_date
+    -- (pending activations for any day = sum of counts after that day)
+    pension_start_dates JSONB NOT NULL DEFAULT '{}'::jsonb,
+    
+    -- Bumped by every delta and reconciliation; reconciliation only stores its
+    -- full-scan result if no delta landed while it was scanning
+    version BIGINT NOT NULL DEFAULT 0,
+    
+    reconciled_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Tables created before the version column existed
+ALTER TABLE public.kpi_aggregates ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+
+-- Backend-only table (service role); no client access
+ALTER TABLE public.kpi_aggregates ENABLE ROW LEVEL SECURITY;
+
+-- Atomically add a delta produced by the API. Returns FALSE when the org has
+-- no aggregate row yet (it is built by the first full reconciliation).
+CREATE OR REPLACE FUNCTION public.apply_kpi_aggregate_delta(p_organization_id UUID, p_delta JSONB)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+    UPDATE public.kpi_aggregates SET
+        total_active = total_active + COALESCE((p_delta->>'total_active')::INTEGER, 0),
+        salary_count = salary_count + COALESCE((p_delta->>'salary_count')::INTEGER, 0),
+        salary_sum = salary_sum + COALESCE((p_delta->>'salary_sum')::NUMERIC, 0),
+        pension_active_count = pension_active_count + COALESCE((p_delta->>'pension_active_count')::INTEGER, 0),
+        group_life_count = group_life_count + COALESCE((p_delta->>'group_life_count')::INTEGER, 0),
+        gci_count = gci_count + COALESCE((p_delta->>'gci_count')::INTEGER, 0),
+        gip_count = gip_count + COALESCE((p_delta->>'gip_count')::INTEGER, 0),
+        bupa_count = bupa_count + COALESCE((p_delta->>'bupa_count')::INTEGER, 0),
+        gender_male_count = gender_male_count + COALESCE((p_delta->>'gender_male_count')::INTEGER, 0),
+        gender_female_count = gender_female_count + COALESCE((p_delta->>'gender_female_count')::INTEGER, 0),
+        gender_other_count = gender_other_count + COALESCE((p_delta->>'gender_other_count')::INTEGER, 0),
+        uk_resident_count = uk_resident_count + COALESCE((p_delta->>'uk_resident_count')::INTEGER, 0),
+        non_uk_resident_count = non_uk_resident_count + COALESCE((p_delta->>'non_uk_resident_count')::INTEGER, 0),
+        io_uploads_completed = io_uploads_completed + COALESCE((p_delta->>'io_uploads_completed')::INTEGER, 0),
+        pension_packs_sent = pension_packs_sent + COALESCE((p_delta->>'pension_packs_sent')::INTEGER, 0),
+        pension_start_dates = (
+            SELECT COALESCE(jsonb_object_agg(key, total) FILTER (WHERE total <> 0), '{}'::jsonb)
+            FROM (
+                SELECT key, SUM(value::INTEGER) AS total
+                FROM (
+                    SELECT key, value FROM jsonb_each_text(pension_start_dates)
+                    UNION ALL
+                    SELECT key, value FROM jsonb_each_text(COALESCE(p_delta->'pension_start_dates', '{}'::jsonb))
+                ) AS combined
+                GROUP BY key
+            ) AS totals
+        ),
+        version = version + 1,
+        updated_at = NOW()
+    WHERE organization_id = p_organization_id;
+    
+    RETURN FOUND;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.apply_kpi_aggregate_delta(UUID, JSONB) TO service_role;
+
+COMMENT ON TABLE public.kpi_aggregates IS 'Running per-organization KPI counters for O(1) current snapshots; reconciled periodically against a full recompute';
+COMMENT ON FUNCTION public.apply_kpi_aggregate_delta IS 'Atomically adds an employee-write delta to an organization''s KPI aggregates';
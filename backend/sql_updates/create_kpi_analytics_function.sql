@@ -0,0 +1,84 @@
+-- Server-side distributions for /api/kpi/analytics
+-- Counts active employees per company, nationality, pension approach, gender,
+-- postcode area and coverage/status flag in one GROUPING SETS pass, so the API
+-- receives one row per distinct value instead of every employee row.
+-- Age is not included: date_of_birth is encrypted and bucketed by the API.
+
+-- Supports the organization + status filter
+CREATE INDEX IF NOT EXISTS idx_employees_org_status
+ON public.employees USING btree (organization_id, service_status);
+
+-- Returns (dimension, value, employee_count). Dimensions:
+--   company, nationality, approach, gender, postcode_area
+--   pension, group_life, gci, gip, bupa, uk_resident, io_uploaded  (value 'true'/'false')
+--   total  (value NULL)
+-- Missing labels use the same defaults as the API ('Unknown', 'Not Set',
+-- 'Not Specified'); postcode_area is NULL when the postcode has no letters.
+CREATE OR REPLACE FUNCTION public.kpi_analytics_distributions(p_organization_id UUID)
+RETURNS TABLE(dimension TEXT, value TEXT, employee_count BIGINT)
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+    WITH active AS (
+        SELECT
+            COALESCE(c.name, 'Unknown') AS company,
+            COALESCE(NULLIF(e.nationality, ''), 'Unknown') AS nationality,
+            COALESCE(NULLIF(e.pension_investment_approach, ''), 'Not Set') AS approach,
+            COALESCE(NULLIF(e.legal_gender, ''), 'Not Specified') AS gender,
+            -- First 1-2 letters of the outward code, e.g. 'SW1A 1AA' -> 'SW', 'B1 1AA' -> 'B'
+            NULLIF(UPPER(regexp_replace(LEFT(split_part(btrim(e.postcode), ' ', 1), 2), '[^[:alpha:]]', '', 'g')), '') AS postcode_area,
+            COALESCE(e.is_pension_active, FALSE) AS pension,
+            COALESCE(e.has_group_life, FALSE) AS group_life,
+            COALESCE(e.has_gci, FALSE) AS gci,
+            COALESCE(e.has_gip, FALSE) AS gip,
+            COALESCE(e.has_bupa, FALSE) AS bupa,
+            COALESCE(e.uk_resident, FALSE) AS uk_resident,
+            COALESCE(e.io_upload_status, FALSE) AS io_uploaded
+        FROM public.employees e
+        LEFT JOIN public.companies c ON c.id = e.company_id
+        WHERE e.organization_id = p_organization_id
+          AND e.service_status = 'Active'
+    )
+    SELECT
+        CASE
+            WHEN GROUPING(company) = 0 THEN 'company'
+            WHEN GROUPING(nationality) = 0 THEN 'nationality'
+            WHEN GROUPING(approach) = 0 THEN 'approach'
+            WHEN GROUPING(gender) = 0 THEN 'gender'
+            WHEN GROUPING(postcode_area) = 0 THEN 'postcode_area'
+            WHEN GROUPING(pension) = 0 THEN 'pension'
+            WHEN GROUPING(group_life) = 0 THEN 'group_life'
+            WHEN GROUPING(gci) = 0 THEN 'gci'
+            WHEN GROUPING(gip) = 0 THEN 'gip'
+            WHEN GROUPING(bupa) = 0 THEN 'bupa'
+            WHEN GROUPING(uk_resident) = 0 THEN 'uk_resident'
+            WHEN GROUPING(io_uploaded) = 0 THEN 'io_uploaded'
+            ELSE 'total'
+        END AS dimension,
+        CASE
+            WHEN GROUPING(company) = 0 THEN company
+            WHEN GROUPING(nationality) = 0 THEN nationality
+            WHEN GROUPING(approach) = 0 THEN approach
+            WHEN GROUPING(gender) = 0 THEN gender
+            WHEN GROUPING(postcode_area) = 0 THEN postcode_area
+            WHEN GROUPING(pension) = 0 THEN pension::TEXT
+            WHEN GROUPING(group_life) = 0 THEN group_life::TEXT
+            WHEN GROUPING(gci) = 0 THEN gci::TEXT
+            WHEN GROUPING(gip) = 0 THEN gip::TEXT
+            WHEN GROUPING(bupa) = 0 THEN bupa::TEXT
+            WHEN GROUPING(uk_resident) = 0 THEN uk_resident::TEXT
+            WHEN GROUPING(io_uploaded) = 0 THEN io_uploaded::TEXT
+        END AS value,
+        COUNT(*) AS employee_count
+    FROM active
+    GROUP BY GROUPING SETS (
+        (company), (nationality), (approach), (gender), (postcode_area),
+        (pension), (group_life), (gci), (gip), (bupa), (uk_resident), (io_uploaded),
+        ()
+    );
+$$;
+
+GRANT EXECUTE ON FUNCTION public.kpi_analytics_distributions(UUID) TO service_role;
+
+COMMENT ON FUNCTION public.kpi_analytics_distributions IS 'Per-dimension active employee counts for the analytics dashboard (one GROUPING SETS pass)';
@@ -0,0 +1,55 @@
+-- Daily analytics distribution snapshots
+-- One row per organization per day holding the /api/kpi/analytics histograms
+-- as compact JSON ({label: count}), so past dates are served from a single row
+-- instead of scanning live employee data.
+
+CREATE TABLE IF NOT EXISTS public.kpi_analytics_snapshots (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    organization_id UUID NOT NULL,
+    snapshot_date DATE NOT NULL,
+
+    total_employees INTEGER NOT NULL DEFAULT 0,
+
+    -- {label: count} histograms of active employees
+    company JSONB NOT NULL DEFAULT '{}'::jsonb,
+    nationality JSONB NOT NULL DEFAULT '{}'::jsonb,
+    age JSONB NOT NULL DEFAULT '{}'::jsonb,
+    approach JSONB NOT NULL DEFAULT '{}'::jsonb,
+    gender JSONB NOT NULL DEFAULT '{}'::jsonb,
+    postcode_area JSONB NOT NULL DEFAULT '{}'::jsonb,
+
+    -- {flag: count} for pension, group_life, gci, gip, bupa, uk_resident, io_uploaded
+    flags JSONB NOT NULL DEFAULT '{}'::jsonb,
+
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    CONSTRAINT unique_org_analytics_snapshot_date UNIQUE(organization_id, snapshot_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_kpi_analytics_snapshots_org_date
+ON public.kpi_analytics_snapshots(organization_id, snapshot_date DESC);
+
+-- Enable Row Level Security
+ALTER TABLE public.kpi_analytics_snapshots ENABLE ROW LEVEL SECURITY;
+
+-- Organization isolation (same rule as kpi_snapshots)
+CREATE POLICY kpi_analytics_snapshots_org_isolation ON public.kpi_analytics_snapshots
+    FOR ALL
+    USING (
+        organization_id IN (
+            SELECT organization_id
+            FROM public.user_profiles
+            WHERE id = (SELECT auth.uid())
+        )
+    )
+    WITH CHECK (
+        organization_id IN (
+            SELECT organization_id
+            FROM public.user_profiles
+            WHERE id = (SELECT auth.uid())
+        )
+    );
+
+GRANT SELECT, INSERT, UPDATE ON public.kpi_analytics_snapshots TO authenticated;
+
+COMMENT ON TABLE public.kpi_analytics_snapshots IS 'Daily per-organization distribution histograms (company, nationality, age, approach, gender, postcode area, coverage flags) for historical analytics';
@@ -0,0 +1,167 @@
+-- Weekly and monthly rollups of kpi_snapshots
+-- One row per organization per ISO week (Monday start) and per calendar month
+-- holding the period's last daily snapshot plus min/max/avg of every numeric
+-- KPI column, so long-range charts read a few dozen rows instead of one per day.
+-- Maintained by statement-level triggers on kpi_snapshots: every insert,
+-- upsert (including bulk backfills) or delete refreshes the affected periods.
+
+CREATE TABLE IF NOT EXISTS public.kpi_snapshot_rollups (
+    organization_id UUID NOT NULL,
+    resolution TEXT NOT NULL CHECK (resolution IN ('week', 'month')),
+    period_start DATE NOT NULL,
+    period_end DATE NOT NULL,
+
+    -- Date and number of daily snapshots in the period
+    last_snapshot_date DATE NOT NULL,
+    day_count INTEGER NOT NULL DEFAULT 0,
+
+    -- The last daily snapshot's KPI columns (same keys as kpi_snapshots)
+    last_values JSONB NOT NULL DEFAULT '{}'::jsonb,
+    -- {column: {"min": n, "max": n, "avg": n}} over the period's daily snapshots
+    stats JSONB NOT NULL DEFAULT '{}'::jsonb,
+
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    PRIMARY KEY (organization_id, resolution, period_start)
+);
+
+-- Enable Row Level Security
+ALTER TABLE public.kpi_snapshot_rollups ENABLE ROW LEVEL SECURITY;
+
+-- Organization isolation (same rule as kpi_snapshots)
+CREATE POLICY kpi_snapshot_rollups_org_isolation ON public.kpi_snapshot_rollups
+    FOR SELECT
+    USING (
+        organization_id IN (
+            SELECT organization_id
+            FROM public.user_profiles
+            WHERE id = (SELECT auth.uid())
+        )
+    );
+
+GRANT SELECT ON public.kpi_snapshot_rollups TO authenticated;
+
+-- Recompute one period's rollup from its daily snapshots (deleted if none remain)
+CREATE OR REPLACE FUNCTION public.refresh_kpi_snapshot_rollup(
+    p_organization_id UUID,
+    p_resolution TEXT,
+    p_period_start DATE
+)
+RETURNS VOID
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+    v_period_end DATE;
+BEGIN
+    v_period_end := CASE p_resolution
+        WHEN 'week' THEN p_period_start + 6
+        ELSE (p_period_start + INTERVAL '1 month' - INTERVAL '1 day')::DATE
+    END;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM public.kpi_snapshots
+        WHERE organization_id = p_organization_id
+          AND snapshot_date BETWEEN p_period_start AND v_period_end
+    ) THEN
+        DELETE FROM public.kpi_snapshot_rollups
+        WHERE organization_id = p_organization_id
+          AND resolution = p_resolution
+          AND period_start = p_period_start;
+        RETURN;
+    END IF;
+
+    WITH days AS (
+        SELECT to_jsonb(s) - 'id' - 'organization_id' - 'created_at' AS row_data, s.snapshot_date
+        FROM public.kpi_snapshots s
+        WHERE s.organization_id = p_organization_id
+          AND s.snapshot_date BETWEEN p_period_start AND v_period_end
+    ),
+    metric_stats AS (
+        SELECT
+            metric.key,
+            jsonb_build_object(
+                'min', MIN(metric.value::TEXT::NUMERIC),
+                'max', MAX(metric.value::TEXT::NUMERIC),
+                'avg', ROUND(AVG(metric.value::TEXT::NUMERIC), 2)
+            ) AS summary
+        FROM days, jsonb_each(days.row_data) AS metric
+        WHERE jsonb_typeof(metric.value) = 'number'
+        GROUP BY metric.key
+    )
+    INSERT INTO public.kpi_snapshot_rollups (
+        organization_id, resolution, period_start, period_end,
+        last_snapshot_date, day_count, last_values, stats, updated_at
+    )
+    SELECT
+        p_organization_id,
+        p_resolution,
+        p_period_start,
+        v_period_end,
+        (SELECT MAX(snapshot_date) FROM days),
+        (SELECT COUNT(*) FROM days),
+        (SELECT row_data FROM days ORDER BY snapshot_date DESC LIMIT 1),
+        COALESCE((SELECT jsonb_object_agg(key, summary) FROM metric_stats), '{}'::jsonb),
+        NOW()
+    ON CONFLICT (organization_id, resolution, period_start) DO UPDATE SET
+        period_end = EXCLUDED.period_end,
+        last_snapshot_date = EXCLUDED.last_snapshot_date,
+        day_count = EXCLUDED.day_count,
+        last_values = EXCLUDED.last_values,
+        stats = EXCLUDED.stats,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$;
+
+-- Refresh every week/month touched by a statement (transition table "changed_rows")
+CREATE OR REPLACE FUNCTION public.kpi_snapshots_refresh_rollups()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN
+        SELECT DISTINCT organization_id, 'week' AS resolution, date_trunc('week', snapshot_date)::DATE AS period_start
+        FROM changed_rows
+        UNION
+        SELECT DISTINCT organization_id, 'month', date_trunc('month', snapshot_date)::DATE
+        FROM changed_rows
+    LOOP
+        PERFORM public.refresh_kpi_snapshot_rollup(r.organization_id, r.resolution, r.period_start);
+    END LOOP;
+    RETURN NULL;
+END;
+$$;
+
+-- Transition tables allow only one event per trigger
+DROP TRIGGER IF EXISTS kpi_snapshots_rollups_insert ON public.kpi_snapshots;
+CREATE TRIGGER kpi_snapshots_rollups_insert
+    AFTER INSERT ON public.kpi_snapshots
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.kpi_snapshots_refresh_rollups();
+
+DROP TRIGGER IF EXISTS kpi_snapshots_rollups_update ON public.kpi_snapshots;
+CREATE TRIGGER kpi_snapshots_rollups_update
+    AFTER UPDATE ON public.kpi_snapshots
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.kpi_snapshots_refresh_rollups();
+
+DROP TRIGGER IF EXISTS kpi_snapshots_rollups_delete ON public.kpi_snapshots;
+CREATE TRIGGER kpi_snapshots_rollups_delete
+    AFTER DELETE ON public.kpi_snapshots
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.kpi_snapshots_refresh_rollups();
+
+-- Build rollups for snapshots written before this migration
+SELECT public.refresh_kpi_snapshot_rollup(periods.organization_id, periods.resolution, periods.period_start)
+FROM (
+    SELECT DISTINCT organization_id, 'week' AS resolution, date_trunc('week', snapshot_date)::DATE AS period_start
+    FROM public.kpi_snapshots
+    UNION
+    SELECT DISTINCT organization_id, 'month', date_trunc('month', snapshot_date)::DATE
+    FROM public.kpi_snapshots
+) AS periods;
+
+COMMENT ON TABLE public.kpi_snapshot_rollups IS 'Weekly and monthly rollups of kpi_snapshots (last value plus min/max/avg per KPI column), maintained by triggers, for long-range charts';
@@ -0,0 +1,41 @@
+-- Leases for in-process background jobs
+-- Every API worker runs the daily KPI snapshot scheduler; a lease row per
+-- job run (e.g. 'kpi_daily_snapshots:2026-01-31') makes sure only one worker
+-- performs it. An expired, uncompleted lease (crashed worker) can be taken over.
+
+CREATE TABLE IF NOT EXISTS public.scheduler_leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    acquired_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    details JSONB
+);
+
+-- Backend-only table (service role); no client access
+ALTER TABLE public.scheduler_leases ENABLE ROW LEVEL SECURITY;
+
+-- Atomically take a lease. Returns TRUE if p_holder now holds it.
+CREATE OR REPLACE FUNCTION public.acquire_scheduler_lease(p_name TEXT, p_holder TEXT, p_ttl_seconds INTEGER)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+    INSERT INTO public.scheduler_leases (name, holder, acquired_at, expires_at)
+    VALUES (p_name, p_holder, NOW(), NOW() + make_interval(secs => p_ttl_seconds))
+    ON CONFLICT (name) DO UPDATE
+        SET holder = EXCLUDED.holder,
+            acquired_at = EXCLUDED.acquired_at,
+            expires_at = EXCLUDED.expires_at
+        WHERE public.scheduler_leases.completed_at IS NULL
+          AND public.scheduler_leases.expires_at < NOW();
+    
+    RETURN FOUND;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.acquire_scheduler_lease(TEXT, TEXT, INTEGER) TO service_role;
+
+COMMENT ON TABLE public.scheduler_leases IS 'One row per background job run; prevents duplicate runs across API workers';
+COMMENT ON FUNCTION public.acquire_scheduler_lease IS 'Takes a job lease if it is free or expired and not completed';